@@ -9,9 +9,11 @@ class PCMProcessor extends AudioWorkletProcessor {
     this._chunksSinceMeter = 0;
   }
 
-  _emitChunks() {
+  // endT: AudioContext time just past the newest buffered sample (for capture timestamps)
+  _emitChunks(endT) {
     while (this.buffer.length >= this.chunkSize) {
       const slice = this.buffer.subarray(0, this.chunkSize);
+      const tCtx = endT - (this.buffer.length - this.chunkSize) / sampleRate;
 
       // ---- meter (rms/peak) ----
       this._chunksSinceMeter++;
@@ -36,7 +38,7 @@ class PCMProcessor extends AudioWorkletProcessor {
         let s = Math.max(-1, Math.min(1, slice[i]));
         out[i] = s < 0 ? s * 0x8000 : s * 0x7fff;
       }
-      this.port.postMessage({ type: "pcm-int16", payload: out.buffer }, [out.buffer]);
+      this.port.postMessage({ type: "pcm-int16", payload: out.buffer, tCtx }, [out.buffer]);
 
       this.buffer = this.buffer.subarray(this.chunkSize);
     }
@@ -50,7 +52,7 @@ class PCMProcessor extends AudioWorkletProcessor {
       merged.set(this.buffer, 0);
       merged.set(ch, this.buffer.length);
       this.buffer = merged;
-      this._emitChunks();
+      this._emitChunks(currentTime + ch.length / sampleRate);
     }
     return true;
   }
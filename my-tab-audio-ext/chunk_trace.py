@@ -0,0 +1,102 @@
+# chunk_trace.py
+# Sampled per-chunk span tracing for server.py, exported as Chrome trace / Perfetto JSON.
+#
+# A sampled audio chunk gets an id at ingest (websocket.recv); each pipeline stage then records a
+# (start, end) monotonic pair into a bounded ring:
+#
+#   recv       websocket.recv() returned -> queued (base64 / guard work in between)
+#   queue      queued                    -> feed_worker dequeued it
+#   decode     bytes -> f32 -> 16 kHz (resample)
+#   buffer     appended to the 16 kHz buffer -> its last sample handed to the recorder (pacing wait)
+#   feed_audio recorder.feed_audio() call of the frame that completed the chunk
+#   model      chunk fully fed -> first RealtimeSTT callback after it
+#   send:patch / send:stable   callback -> _ws_send() done
+#
+# Off by default; server.py keeps `_TRACE = None` then, so every site is a single `is not None`
+# check. Span times come from the caller; pass the same clock (sim_clock interface) for t0 / wall_t0. Load the JSON in chrome://tracing or ui.perfetto.dev (async tracks, one per chunk).
+
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Tuple
+
+import sim_clock
+
+MAX_AWAITING_PER_LANE = 256     # fed chunks waiting for a callback (silence -> no callbacks)
+
+
+class ChunkTracer:
+    def __init__(self, capacity: int = 20000, sample_every: int = 10, clock: Any = None):
+        clock = clock or sim_clock.SYSTEM
+        self.capacity = max(100, int(capacity))
+        self.sample_every = max(1, int(sample_every))
+        self.t0 = clock.monotonic()
+        self.wall0 = clock.time()
+        self.spans: Deque[Tuple[str, int, str, float, float]] = deque(maxlen=self.capacity)
+        self._seen = 0
+        self._next_id = 0
+        self._awaiting: Dict[str, Deque[Tuple[int, float]]] = {}
+
+    # ---- recording (event loop thread) ----
+    def begin(self, lane: str, t_recv: float, t_put: float) -> int:
+        """New chunk at ingest; returns its id, or 0 when not sampled."""
+        self._seen += 1
+        if self._seen % self.sample_every:
+            return 0
+        self._next_id += 1
+        cid = self._next_id
+        self.spans.append((lane, cid, "recv", t_recv, t_put))
+        return cid
+
+    def span(self, lane: str, cid: int, stage: str, t0: float, t1: float):
+        if cid:
+            self.spans.append((lane, cid, stage, t0, t1))
+
+    def fed(self, lane: str, cid: int, t: float):
+        """Chunk's last sample was fed: it now waits for the next recorder callback."""
+        if not cid:
+            return
+        q = self._awaiting.get(lane)
+        if q is None:
+            q = self._awaiting[lane] = deque(maxlen=MAX_AWAITING_PER_LANE)
+        q.append((cid, t))
+
+    def delivered(self, lane: str, t_cb: float, t_sent: float, kind: str):
+        """A callback fired at t_cb and its message was sent at t_sent: close chunks fed before t_cb."""
+        q = self._awaiting.get(lane)
+        while q and q[0][1] <= t_cb:
+            cid, t_fed = q.popleft()
+            self.spans.append((lane, cid, "model", t_fed, t_cb))
+            self.spans.append((lane, cid, "send:" + kind, t_cb, t_sent))
+
+    def end_lane(self, lane: str):
+        self._awaiting.pop(lane, None)
+
+    # ---- export ----
+    def chrome_trace(self, spans: List[Tuple[str, int, str, float, float]] = None) -> Dict[str, Any]:
+        """spans: a list(self.spans) copy taken on the recording thread (lets this run in an executor)."""
+        spans = list(self.spans) if spans is None else spans
+        lanes: Dict[str, int] = {}
+        events: List[Dict[str, Any]] = []
+        pid = os.getpid()
+        for lane, cid, stage, a, b in spans:
+            tid = lanes.setdefault(lane, len(lanes) + 1)
+            ts0 = round((a - self.t0) * 1e6, 1)
+            ts1 = round((max(a, b) - self.t0) * 1e6, 1)
+            ident = f"{tid}:{cid}"
+            events.append({"name": stage, "cat": "chunk", "ph": "b", "id": ident, "ts": ts0,
+                           "pid": pid, "tid": tid, "args": {"chunk": cid}})
+            events.append({"name": stage, "cat": "chunk", "ph": "e", "id": ident, "ts": ts1,
+                           "pid": pid, "tid": tid})
+        for lane, tid in lanes.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": lane}})
+        events.sort(key=lambda e: e.get("ts", 0))
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"sample_every": self.sample_every, "spans": len(spans),
+                          "capacity": self.capacity, "wall_t0": self.wall0},
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"spans": len(self.spans), "capacity": self.capacity, "sample_every": self.sample_every,
+                "chunks": self._next_id, "seen": self._seen}
@@ -0,0 +1,124 @@
+# loop_watchdog.py
+# Event-loop lag watchdog for server.py.
+#
+# A daemon thread posts a heartbeat onto the asyncio loop every interval_sec and measures how long it
+# took to run (scheduling lag). If it has not run after stall_ms, the loop thread is blocked in
+# synchronous code right now: its Python stack is captured from sys._current_frames() while the
+# stall is still in progress, and logged once the loop recovers (rate limited).
+#
+#   wd = LoopWatchdog(asyncio.get_running_loop(), threading.get_ident())
+#   wd.start()
+#   wd.hist.summary(), wd.stalls, wd.last_stall
+
+import os
+import sys
+import time
+import logging
+import threading
+import traceback
+from typing import Any, Dict, List, Optional
+
+import latency_hist
+
+logger = logging.getLogger("stt-server")
+
+_ASYNCIO_EVENTS = os.path.join("asyncio", "events.py")
+
+
+class LoopWatchdog:
+    def __init__(
+        self,
+        loop,
+        loop_thread_id: int,
+        interval_sec: float = 0.1,
+        stall_ms: float = 200.0,
+        log_every_sec: float = 30.0,
+        window_sec: float = 30.0,
+        stack_limit: int = 40,
+    ):
+        self.loop = loop
+        self.loop_thread_id = loop_thread_id
+        self.interval_sec = max(0.01, float(interval_sec))
+        self.stall_sec = max(0.005, float(stall_ms) / 1000.0)
+        self.log_every_sec = max(0.0, float(log_every_sec))
+        self.stack_limit = max(1, int(stack_limit))
+
+        self.hist = latency_hist.WindowedHistogram(window_sec)
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+        self.last_stall: Optional[Dict[str, Any]] = None
+
+        self._beat = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_log_t = 0.0
+        self._suppressed = 0
+        self._suppressed_max_ms = 0.0
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._beat.set()
+
+    def _capture_stack(self) -> List[str]:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return []
+        frames = traceback.extract_stack(frame)
+        # drop the asyncio runner frames above the callback/task step that is blocking
+        for i in range(len(frames) - 1, -1, -1):
+            if frames[i].filename.endswith(_ASYNCIO_EVENTS) and frames[i].name == "_run":
+                frames = frames[i + 1:]
+                break
+        return traceback.format_list(frames[-self.stack_limit:])
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._beat.clear()
+            t_post = time.monotonic()
+            try:
+                self.loop.call_soon_threadsafe(self._beat.set)
+            except RuntimeError:
+                return  # loop closed
+
+            stack: Optional[List[str]] = None
+            if not self._beat.wait(self.stall_sec):
+                stack = self._capture_stack()
+                while not self._beat.wait(1.0):
+                    if self._stop.is_set() or self.loop.is_closed():
+                        return
+            lag_ms = (time.monotonic() - t_post) * 1000.0
+            self.hist.record(lag_ms)
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+
+            if stack is not None:
+                self._on_stall(lag_ms, stack)
+
+            self._stop.wait(self.interval_sec)
+
+    def _on_stall(self, lag_ms: float, stack: List[str]):
+        self.stalls += 1
+        self.last_stall = {"t": time.time(), "lag_ms": round(lag_ms, 1), "stack": stack}
+        now = time.monotonic()
+        if self.log_every_sec and now - self._last_log_t < self.log_every_sec:
+            self._suppressed += 1
+            self._suppressed_max_ms = max(self._suppressed_max_ms, lag_ms)
+            return
+        self._last_log_t = now
+        extra = ""
+        if self._suppressed:
+            extra = f" (+{self._suppressed} stalls not logged, max {self._suppressed_max_ms:.0f} ms)"
+            self._suppressed = 0
+            self._suppressed_max_ms = 0.0
+        logger.warning("event loop blocked %.0f ms%s; loop thread stack at +%.0f ms:\n%s",
+                       lag_ms, extra, self.stall_sec * 1000.0, "".join(stack).rstrip())
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"stalls": int(self.stalls), "max_lag_ms": round(self.max_lag_ms, 1), **self.hist.summary()}
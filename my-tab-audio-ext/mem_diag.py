@@ -0,0 +1,230 @@
+# mem_diag.py
+# Opt-in heap diagnostics for the long-running servers (server.py, translator.py).
+#
+#   md = MemoryDiagnostics(interval_sec=300, top_n=15)
+#   md.start()                                   # tracemalloc on + periodic snapshots (daemon thread)
+#   md.track("sess-1", lambda: {"bufq": len(bufq), ...})   # retained objects of a live session
+#   md.untrack("sess-1")
+#   md.add_gauge("rate_last_keys", lambda: len(_rate_last))  # process-level containers
+#   md.report()                                  # JSON-able dict for the admin route
+#   side_http.route("/memory", http_route(md), token=ADMIN_TOKEN)   # metrics_http.SideHTTPServer
+#
+# Every interval a tracemalloc snapshot is taken and diffed against the previous one and against the
+# first (baseline): the top allocation sites by growth are kept in the report and logged, so a slow
+# RSS creep points at file:line instead of "restart it weekly".
+#
+# Cost: tracemalloc itself slows allocations down (roughly 1.3-2x on allocation-heavy Python code, and
+# ~30 bytes of bookkeeping per live block with frames=1). take_snapshot() and compare_to() hold the GIL
+# while they copy/sort the traces, which stalls the event loop for tens to hundreds of ms on a large
+# heap; keep the interval in minutes. Nothing is traced unless start() is called.
+
+import gc
+import json
+import time
+import asyncio
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("mem-diag")
+
+# allocation sites inside these files are bookkeeping of the diagnostics themselves
+_IGNORE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _kb(n: int) -> float:
+    return round(n / 1024.0, 1)
+
+
+def _site(stat) -> str:
+    fr = stat.traceback[0] if len(stat.traceback) else None
+    return f"{fr.filename}:{fr.lineno}" if fr is not None else "?"
+
+
+class MemoryDiagnostics:
+    def __init__(self, interval_sec: float = 300.0, top_n: int = 15, frames: int = 1):
+        self.interval_sec = max(5.0, float(interval_sec))
+        self.top_n = max(1, int(top_n))
+        self.frames = max(1, int(frames))
+        self.key_type = "traceback" if self.frames > 1 else "lineno"
+
+        self.snapshots = 0
+        self.last_snapshot_ms = 0.0
+        self.last: Dict[str, Any] = {}
+
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._prev: Optional[tracemalloc.Snapshot] = None
+        self._t_baseline = 0.0
+        self._sessions: Dict[str, Callable[[], Dict[str, int]]] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()          # snapshot/diff (periodic thread vs admin request)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- lifecycle ----
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop = threading.Event()      # fresh per run: a stopped thread may still be waking up
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="mem-diag", daemon=True)
+        self._thread.start()
+        logger.info("memory diagnostics on: snapshot every %.0fs, top %d, frames=%d",
+                    self.interval_sec, self.top_n, self.frames)
+
+    def stop(self):
+        """Stop snapshots and tracing; drops the stored snapshots (their traces hold a lot of memory)."""
+        self._stop.set()
+        self._thread = None
+        with self._lock:
+            self._baseline = None
+            self._prev = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        logger.info("memory diagnostics off")
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None and tracemalloc.is_tracing()
+
+    def _run(self, stop: threading.Event):
+        self.snapshot_now()
+        while not stop.wait(self.interval_sec):
+            try:
+                rep = self.snapshot_now()
+                top = rep.get("growth_since_prev") or []
+                if top and top[0]["size_diff_kb"] > 0:
+                    logger.info("heap +%.1f KB since last snapshot; top sites: %s",
+                                rep["traced_diff_prev_kb"],
+                                "; ".join(f"{t['site']} {t['size_diff_kb']:+.1f} KB ({t['count_diff']:+d})" for t in top[:5]))
+            except Exception as e:
+                logger.warning("memory snapshot failed: %r", e)
+
+    # ---- probes ----
+    def track(self, name: str, fn: Callable[[], Dict[str, int]]):
+        """fn() -> {container: count} for one live session; called only when a report is built."""
+        self._sessions[name] = fn
+
+    def untrack(self, name: str):
+        self._sessions.pop(name, None)
+
+    def add_gauge(self, name: str, fn: Callable[[], Any]):
+        self._gauges[name] = fn
+
+    # ---- snapshots ----
+    def _diff(self, new: tracemalloc.Snapshot, old: tracemalloc.Snapshot) -> List[Dict[str, Any]]:
+        stats = new.compare_to(old, self.key_type)
+        out = []
+        for st in stats[: self.top_n]:
+            ent = {"site": _site(st), "size_kb": _kb(st.size), "size_diff_kb": _kb(st.size_diff),
+                   "count": st.count, "count_diff": st.count_diff}
+            if self.frames > 1:
+                ent["stack"] = [f"{fr.filename}:{fr.lineno}" for fr in st.traceback]
+            out.append(ent)
+        return out
+
+    def snapshot_now(self) -> Dict[str, Any]:
+        """Take a snapshot and diff it (blocking; call from a worker thread)."""
+        if not tracemalloc.is_tracing():
+            return {"enabled": False}
+        with self._lock:
+            t0 = time.perf_counter()
+            snap = tracemalloc.take_snapshot().filter_traces(_IGNORE)
+            cur, peak = tracemalloc.get_traced_memory()
+            rep: Dict[str, Any] = {
+                "t": round(time.time(), 3),
+                "traced_kb": _kb(cur),
+                "peak_kb": _kb(peak),
+                "tracemalloc_overhead_kb": _kb(tracemalloc.get_tracemalloc_memory()),
+                "top": [{"site": _site(st), "size_kb": _kb(st.size), "count": st.count}
+                        for st in snap.statistics(self.key_type)[: self.top_n]],
+            }
+            if self._prev is not None:
+                rep["growth_since_prev"] = self._diff(snap, self._prev)
+                rep["traced_diff_prev_kb"] = _kb(sum(t.size for t in snap.traces) - sum(t.size for t in self._prev.traces))
+            if self._baseline is None:
+                self._baseline = snap
+                self._t_baseline = time.time()
+            else:
+                rep["growth_since_baseline"] = self._diff(snap, self._baseline)
+                rep["baseline_age_sec"] = round(time.time() - self._t_baseline, 1)
+            self._prev = snap
+            self.snapshots += 1
+            self.last_snapshot_ms = round((time.perf_counter() - t0) * 1000.0, 1)
+            rep["snapshot_ms"] = self.last_snapshot_ms
+            self.last = rep
+            return rep
+
+    def reset_baseline(self):
+        with self._lock:
+            self._baseline = self._prev
+            self._t_baseline = time.time()
+
+    # ---- report ----
+    def retained(self) -> Dict[str, Any]:
+        sessions: Dict[str, Any] = {}
+        for name, fn in list(self._sessions.items()):
+            try:
+                sessions[name] = fn()
+            except Exception as e:
+                sessions[name] = {"error": repr(e)}
+        gauges: Dict[str, Any] = {}
+        for name, fn in list(self._gauges.items()):
+            try:
+                gauges[name] = fn()
+            except Exception as e:
+                gauges[name] = repr(e)
+        return {"sessions": sessions, "gauges": gauges}
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "interval_sec": self.interval_sec,
+            "snapshots": self.snapshots,
+            "last": self.last,
+            **self.retained(),
+        }
+
+
+def gc_type_counts(top_n: int = 25) -> List[List[Any]]:
+    """Live objects per type name (walks gc.get_objects(): O(heap), holds the GIL; admin use only)."""
+    c = Counter(type(o).__name__ for o in gc.get_objects())
+    return [[k, v] for k, v in c.most_common(top_n)]
+
+
+def http_route(diag: MemoryDiagnostics):
+    """
+    GET /memory handler (metrics_http route) over diag.report():
+    ?enable=1|0 toggles tracing, ?baseline=1 resets the baseline, ?snapshot=1 takes one now,
+    ?types=N adds gc type counts. Snapshots and the gc walk run in the default executor.
+    """
+    async def route(req):
+        loop = asyncio.get_running_loop()
+        en = req.query.get("enable")
+        if en is not None:
+            if en.strip().lower() in {"1", "true", "yes"}:
+                diag.start()
+            else:
+                diag.stop()
+        if req.query.get("baseline") == "1":
+            diag.reset_baseline()
+        if req.query.get("snapshot") == "1" and diag.enabled:
+            await loop.run_in_executor(None, diag.snapshot_now)
+        rep = diag.report()
+        if "types" in req.query:
+            try:
+                n = int(req.query["types"] or 25)
+            except ValueError:
+                return 400, "text/plain", "bad types\n"
+            rep["gc_types"] = await loop.run_in_executor(None, gc_type_counts, n)
+        return 200, "application/json", json.dumps(rep, ensure_ascii=False)
+
+    return route
@@ -0,0 +1,244 @@
+# metrics_http.py
+# Prometheus text exposition + a tiny side-port HTTP server for server.py (stdlib only).
+#
+#   M = MetricsRegistry("stt_")
+#   M.counter("frames_fed_total", "Audio frames fed to the recorder")
+#   M.inc("frames_fed_total")                     # event-loop thread only (no lock, see below)
+#   M.add_collector(lambda: [...lines...])        # computed at scrape time
+#
+#   srv = SideHTTPServer("127.0.0.1", 9765)
+#   srv.route("/metrics", lambda req: (200, PROM_CONTENT_TYPE, M.render()))
+#   srv.route("/profile", fn, token=ADMIN_TOKEN)  # requires "Authorization: Bearer <token>"
+#   await srv.start()
+#
+# Values are plain Python numbers updated in place: a scrape only formats what is already
+# aggregated. inc()/set() are not locked; call them from the event loop thread (recorder callback
+# threads hand off through the loop anyway), or use inc_threadsafe() from other threads.
+
+import hmac
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger("stt-metrics")
+
+PROM_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# latency buckets (ms) for the exported histograms
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+_MAX_HEADER_BYTES = 16 * 1024
+_READ_TIMEOUT_SEC = 5.0
+
+
+def _fmt(v: float) -> str:
+    if isinstance(v, bool):
+        return "1" if v else "0"
+    if isinstance(v, int):
+        return str(v)
+    if v != v:
+        return "NaN"
+    return repr(float(v))
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> str:
+    if not labels:
+        return ""
+    esc = lambda s: str(s).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._defs: List[Tuple[str, str, str]] = []       # (name, type, help), render order
+        self._values: Dict[str, float] = {}
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+        self._lock = threading.Lock()
+
+    def _define(self, name: str, typ: str, help_text: str, initial: float = 0):
+        if name not in self._values:
+            self._defs.append((name, typ, help_text))
+            self._values[name] = initial
+
+    def counter(self, name: str, help_text: str):
+        self._define(name, "counter", help_text)
+
+    def gauge(self, name: str, help_text: str, initial: float = 0):
+        self._define(name, "gauge", help_text, initial)
+
+    def inc(self, name: str, n: float = 1):
+        self._values[name] += n
+
+    def inc_threadsafe(self, name: str, n: float = 1):
+        with self._lock:
+            self._values[name] += n
+
+    def set(self, name: str, v: float):
+        self._values[name] = v
+
+    def get(self, name: str) -> float:
+        return self._values.get(name, 0)
+
+    def add_collector(self, fn: Callable[[], Iterable[str]]):
+        """fn() returns extra exposition lines (with their own # HELP/# TYPE) at scrape time."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        out: List[str] = []
+        for name, typ, help_text in self._defs:
+            full = self.prefix + name
+            out.append(f"# HELP {full} {help_text}")
+            out.append(f"# TYPE {full} {typ}")
+            out.append(f"{full} {_fmt(self._values[name])}")
+        for fn in self._collectors:
+            try:
+                out.extend(fn())
+            except Exception as e:
+                logger.debug("collector failed: %r", e)
+        out.append("")
+        return "\n".join(out)
+
+
+def counter_lines(name: str, help_text: str, samples: Iterable[Tuple[Optional[Dict[str, str]], float]]) -> List[str]:
+    out = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    out.extend(f"{name}{_labels(lb)} {_fmt(v)}" for lb, v in samples)
+    return out
+
+
+def gauge_lines(name: str, help_text: str, samples: Iterable[Tuple[Optional[Dict[str, str]], float]]) -> List[str]:
+    out = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    out.extend(f"{name}{_labels(lb)} {_fmt(v)}" for lb, v in samples)
+    return out
+
+
+def histogram_lines(name: str, help_text: str, hists: Dict[str, Any], label: str = "stage",
+                    buckets_ms: Iterable[float] = DEFAULT_BUCKETS_MS) -> List[str]:
+    """Render latency_hist.LatencyHistogram objects (ms) as a Prometheus histogram in seconds."""
+    bounds = list(buckets_ms)
+    out = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, h in hists.items():
+        cum = h.cumulative(bounds)
+        for b, c in zip(bounds, cum):
+            out.append(f'{name}_bucket{{{label}="{key}",le="{_fmt(b / 1000.0)}"}} {c}')
+        out.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {h.n}')
+        out.append(f'{name}_sum{{{label}="{key}"}} {_fmt(h.sum_ms / 1000.0)}')
+        out.append(f'{name}_count{{{label}="{key}"}} {h.n}')
+    return out
+
+
+class HTTPRequest:
+    __slots__ = ("method", "path", "query", "headers", "peer")
+
+    def __init__(self, method: str, path: str, query: Dict[str, str], headers: Dict[str, str], peer: Any):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.peer = peer
+
+
+Response = Tuple[int, str, Union[str, bytes]]
+RouteFn = Callable[[HTTPRequest], Union[Response, Awaitable[Response]]]
+
+_REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+            405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error"}
+
+
+class SideHTTPServer:
+    """
+    Minimal HTTP/1.0-style server (one request per connection, GET/POST without body) on the
+    running event loop. Routes return (status, content_type, body); they may be coroutines.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = int(port)
+        self.routes: Dict[str, RouteFn] = {}
+        self._tokens: Dict[str, str] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def route(self, path: str, fn: RouteFn, token: Optional[str] = None):
+        """token: require "Authorization: Bearer <token>" for this path."""
+        self.routes[path] = fn
+        if token:
+            self._tokens[path] = token
+        else:
+            self._tokens.pop(path, None)
+
+    def _authorized(self, path: str, headers: Dict[str, str]) -> bool:
+        token = self._tokens.get(path)
+        if token is None:
+            return True
+        scheme, _sp, given = headers.get("authorization", "").partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(given.strip().encode(), token.encode())
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._on_conn, self.host, self.port)
+        logger.info("side HTTP on %s:%d (%s)", self.host, self.port, ", ".join(sorted(self.routes)))
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _on_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        status, ctype, body = 500, "text/plain", "error\n"
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=_READ_TIMEOUT_SEC)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                return
+            if len(head) > _MAX_HEADER_BYTES:
+                status, ctype, body = 400, "text/plain", "header too large\n"
+            else:
+                lines = head.decode("latin-1").split("\r\n")
+                parts = lines[0].split()
+                if len(parts) < 2:
+                    status, ctype, body = 400, "text/plain", "bad request\n"
+                else:
+                    method, target = parts[0].upper(), parts[1]
+                    u = urlparse(target)
+                    headers = {}
+                    for ln in lines[1:]:
+                        k, sep, v = ln.partition(":")
+                        if sep:
+                            headers[k.strip().lower()] = v.strip()
+                    fn = self.routes.get(u.path)
+                    if fn is None:
+                        status, ctype, body = 404, "text/plain", "not found\n"
+                    elif method not in {"GET", "POST", "HEAD"}:
+                        status, ctype, body = 405, "text/plain", "method not allowed\n"
+                    elif not self._authorized(u.path, headers):
+                        status, ctype, body = 401, "text/plain", "unauthorized\n"
+                    else:
+                        q = {k: v[-1] for k, v in parse_qs(u.query).items()}
+                        req = HTTPRequest(method, u.path, q, headers, writer.get_extra_info("peername"))
+                        try:
+                            res = fn(req)
+                            if asyncio.iscoroutine(res):
+                                res = await res
+                            status, ctype, body = res
+                        except Exception:
+                            # details stay in the log: exception text can carry paths, tokens or user data
+                            logger.exception("side HTTP %s failed", u.path)
+                            status, ctype, body = 500, "text/plain", "internal error\n"
+                        if method == "HEAD":
+                            body = b""
+            data = body.encode("utf-8") if isinstance(body, str) else body
+            writer.write(
+                (f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+                 f"Content-Type: {ctype}\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n").encode("latin-1")
+                + data
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.debug("side HTTP error: %r", e)
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
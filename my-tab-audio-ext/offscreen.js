@@ -466,6 +466,257 @@
     }
   }
 
+  // Protocol extensions we understand (server echoes the accepted set in "ack").
+  const CLIENT_CAPS = ["patch_batch", "stable_delta", "status_delta", "bin1", "ts1"];
+
+  // status_delta: status carries only changed fields; keep the merged view for downstream
+  let serverStatusDetail = {};
+
+  // bin1: long stables (checkpoints / full text) arrive as binary frames; tables come from
+  // hello.detail.wire (see wire_codec.py). Dict keys are always inline strings (key id 0).
+  let wireDict = null;
+  const utf8Dec = new TextDecoder();
+
+  function decodeBin1(buf) {
+    if (!wireDict) return null;
+    const b = new Uint8Array(buf);
+    let p = 0;
+    const uvarint = () => {
+      let n = 0, mul = 1, c;
+      do { c = b[p++]; n += (c & 0x7F) * mul; mul *= 128; } while (c & 0x80);
+      return n;
+    };
+    const value = () => {
+      const t = b[p++];
+      switch (t) {
+        case 0: return null;
+        case 1: return false;
+        case 2: return true;
+        case 3: return uvarint();
+        case 4: return -uvarint() - 1;
+        case 5: { const v = new DataView(b.buffer, b.byteOffset + p, 8).getFloat64(0, true); p += 8; return v; }
+        case 6: { const n = uvarint(); const v = utf8Dec.decode(b.subarray(p, p + n)); p += n; return v; }
+        case 7: { const n = uvarint(); const a = []; for (let i = 0; i < n; i++) a.push(value()); return a; }
+        case 8: {
+          const n = uvarint(); const o = {};
+          for (let i = 0; i < n; i++) {
+            if (uvarint() !== 0) throw new Error("BIN1_BAD_KEY");
+            const k = value();
+            o[k] = value();
+          }
+          return o;
+        }
+        default: throw new Error("BIN1_BAD_TAG_" + t);
+      }
+    };
+
+    const type = wireDict.types[b[p++]];
+    const fields = wireDict.schemas[type] || [];
+    const mask = uvarint();
+    const obj = { type };
+    for (let i = 0; i < fields.length; i++) {
+      if (Math.floor(mask / 2 ** i) % 2) obj[fields[i]] = value();
+    }
+    if (Math.floor(mask / 2 ** fields.length) % 2) Object.assign(obj, value());
+    return obj;
+  }
+
+  // stable_delta: server sends {off, append, len, base_crc, crc} and periodic {full, ckpt}.
+  // We rebuild the full text here so downstream (SW / overlay / translator) still sees stable.full.
+  let stableText = "";
+  let stableCrc = 0;
+  let stableResyncPending = false;
+
+  const CRC_TABLE = (() => {
+    const t = new Uint32Array(256);
+    for (let n = 0; n < 256; n++) {
+      let c = n;
+      for (let k = 0; k < 8; k++) c = (c & 1) ? (0xEDB88320 ^ (c >>> 1)) : (c >>> 1);
+      t[n] = c >>> 0;
+    }
+    return t;
+  })();
+  const utf8 = new TextEncoder();
+
+  function crc32(str, seed = 0) {
+    const bytes = utf8.encode(str);
+    let c = (seed ^ 0xFFFFFFFF) >>> 0;
+    for (let i = 0; i < bytes.length; i++) c = CRC_TABLE[(c ^ bytes[i]) & 0xFF] ^ (c >>> 8);
+    return (c ^ 0xFFFFFFFF) >>> 0;
+  }
+
+  // server offsets are code points; JS strings index UTF-16 units
+  function cpToUnitIndex(str, cp) {
+    if (!/[\uD800-\uDFFF]/.test(str)) return cp;
+    let i = 0;
+    for (let n = 0; n < cp && i < str.length; n++) {
+      const c = str.charCodeAt(i);
+      i += (c >= 0xD800 && c <= 0xDBFF) ? 2 : 1;
+    }
+    return i;
+  }
+
+  function requestStableResync(reason) {
+    if (stableResyncPending) return;
+    stableResyncPending = true;
+    log("stable resync ->", reason);
+    if (ws && ws.readyState === WebSocket.OPEN) safeSendText(ws, { event: "resync" });
+  }
+
+  // returns payload with .full, or null if the delta cannot be applied (resync requested)
+  function applyStableFrame(obj) {
+    if (typeof obj.full === "string") {
+      stableText = obj.full;
+      stableCrc = Number.isFinite(obj.crc) ? (obj.crc >>> 0) : crc32(stableText);
+      stableResyncPending = false;
+      return obj;
+    }
+    if (typeof obj.append !== "string" || !Number.isFinite(obj.off)) return obj;
+    if (stableResyncPending) return null;
+
+    const cut = cpToUnitIndex(stableText, obj.off);
+    if (cut > stableText.length) { requestStableResync("offset"); return null; }
+    const baseCrc = (cut === stableText.length) ? stableCrc : crc32(stableText.slice(0, cut));
+    if (baseCrc !== (obj.base_crc >>> 0)) { requestStableResync("base_crc"); return null; }
+
+    stableText = stableText.slice(0, cut) + obj.append;
+    stableCrc = (obj.crc >>> 0);
+    return { ...obj, full: stableText };
+  }
+
+  function resetStableState() {
+    stableText = "";
+    stableCrc = 0;
+    stableResyncPending = false;
+  }
+
+  // patch_batch: server sends ONE patch with slices=[[nChars, atMs], ...]; we reveal slices locally.
+  let patchRevealTimers = [];
+  let patchRevealQueue = [];
+
+  function relayPatch(payload) {
+    chrome.runtime.sendMessage({ __cmd: "__TRANSCRIPT_PATCH__", payload });
+  }
+
+  function flushPatchReveal() {
+    for (const t of patchRevealTimers) { try { clearTimeout(t); } catch {} }
+    patchRevealTimers = [];
+    const pending = patchRevealQueue;
+    patchRevealQueue = [];
+    for (const p of pending) relayPatch(p);
+  }
+
+  function relayPatchWithSlices(obj) {
+    // any older reveal must land before this patch (end-diff semantics are order-sensitive)
+    flushPatchReveal();
+    noteDisplayed(obj);
+
+    const insert = String(obj.insert || "");
+    const slices = Array.isArray(obj.slices) ? obj.slices : null;
+    if (!slices || slices.length < 2) {
+      relayPatch(obj);
+      return;
+    }
+
+    let off = 0;
+    const parts = [];
+    slices.forEach((sl, i) => {
+      const n = Math.max(0, Number(sl?.[0]) || 0);
+      const atMs = Math.max(0, Number(sl?.[1]) || 0);
+      const last = i === slices.length - 1;
+      const chunk = last ? insert.slice(off) : insert.slice(off, off + n);
+      off += n;
+      const { slices: _s, ...rest } = obj;
+      parts.push({
+        atMs,
+        payload: { ...rest, delete: i === 0 ? Number(obj.delete || 0) : 0, insert: chunk, ...(i > 0 && obj._dbg ? { _dbg: { cont: true } } : {}) },
+      });
+    });
+
+    relayPatch(parts[0].payload);
+    for (const part of parts.slice(1)) {
+      patchRevealQueue.push(part.payload);
+      patchRevealTimers.push(setTimeout(() => {
+        const p = patchRevealQueue.shift();
+        if (p) relayPatch(p);
+      }, part.atMs));
+    }
+  }
+
+  // ts1: audio frames carry their capture time (b"VTs1" + f64 LE ms, performance clock); the server echoes
+  // cap_ms in patch/stable. NTP-style pings let the server estimate our clock offset, and we report
+  // [cap_ms, disp_ms] pairs ("display" = relayed to the UI; offscreen cannot see the paint itself).
+  const TS1_MAGIC = new Uint8Array([0x56, 0x54, 0x73, 0x31]);
+  const CLOCK_PING_MS = 2000;
+  const CLOCK_QUICK_SAMPLES = 4;
+  const DISP_BATCH_MAX = 64;
+  let ts1Active = false;
+  let clockTimer = null;
+  let clockLast = null;   // [t0, t1, t2, t3] of the last pong, sent with the next ping
+  let clockPongs = 0;
+  let dispStamps = [];
+
+  function nowMs() { return performance.timeOrigin + performance.now(); }
+
+  // AudioContext time -> performance clock (ms) through the context's output timestamp
+  function ctxTimeToMs(tCtx) {
+    try {
+      const ts = audioCtx?.getOutputTimestamp?.();
+      if (ts && ts.performanceTime > 0 && Number.isFinite(tCtx)) {
+        return performance.timeOrigin + ts.performanceTime + (tCtx - ts.contextTime) * 1000;
+      }
+    } catch {}
+    return nowMs();
+  }
+
+  function withCaptureStamp(buf, tCtx) {
+    const out = new Uint8Array(12 + buf.byteLength);
+    out.set(TS1_MAGIC, 0);
+    new DataView(out.buffer).setFloat64(4, ctxTimeToMs(tCtx), true);
+    out.set(new Uint8Array(buf), 12);
+    return out.buffer;
+  }
+
+  function noteDisplayed(obj) {
+    if (!ts1Active || !Number.isFinite(obj?.cap_ms)) return;
+    dispStamps.push([obj.cap_ms, nowMs()]);
+    if (dispStamps.length > DISP_BATCH_MAX) dispStamps.shift();
+  }
+
+  function sendClockPing() {
+    if (!(ws && ws.readyState === WebSocket.OPEN)) return;
+    const msg = { event: "ping", t0: nowMs() };
+    if (clockLast) msg.last = clockLast;
+    if (dispStamps.length) msg.disp = dispStamps;
+    clockLast = null;
+    dispStamps = [];
+    safeSendText(ws, msg);
+  }
+
+  function onClockPong(obj) {
+    const t3 = nowMs();
+    if (![obj.t0, obj.t1, obj.t2].every(Number.isFinite)) return;
+    clockLast = [obj.t0, obj.t1, obj.t2, t3];
+    // a few back-to-back samples first so the offset is usable right away
+    if (++clockPongs < CLOCK_QUICK_SAMPLES) sendClockPing();
+  }
+
+  function startClockSync() {
+    stopClockSync();
+    ts1Active = true;
+    sendClockPing();
+    clockTimer = setInterval(sendClockPing, CLOCK_PING_MS);
+  }
+
+  function stopClockSync() {
+    if (clockTimer) { try { clearInterval(clockTimer); } catch {} }
+    clockTimer = null;
+    ts1Active = false;
+    clockLast = null;
+    clockPongs = 0;
+    dispStamps = [];
+  }
+
   function guessKind(obj) {
     const k = obj?.type ?? obj?.event ?? obj?.kind ?? obj?.op ?? obj?.action ?? "";
     return String(k || "").toLowerCase();
@@ -500,6 +751,10 @@
     } catch {}
 
     ws = null;
+    stopClockSync();
+    flushPatchReveal();
+    resetStableState();
+    wireDict = null;
     clearHandshake();
     clearConnectTimer();
     wsBufferedAmount = 0;
@@ -608,6 +863,17 @@
       return;
     }
 
+    await handleServerObject(obj);
+  }
+
+  async function handleServerBinaryMessage(buf) {
+    let obj = null;
+    try { obj = decodeBin1(buf); } catch (e) { log("bin1 decode failed", e?.message || e); }
+    if (!obj) return;
+    await handleServerObject(obj);
+  }
+
+  async function handleServerObject(obj) {
     const kind = guessKind(obj);
 
     // busy/error
@@ -630,13 +896,24 @@
 
     // hello/status: handshake evidence
     if (kind === "hello") {
+      const { wire: _w, caps: _c, ...helloConst } = obj.detail || {};
+      serverStatusDetail = helloConst;
+      const wire = obj.detail?.wire;
+      wireDict = (wire && wire.format === "bin1" && Array.isArray(wire.types)) ? wire : null;
       sendStatus({ state: "server-hello", detail: obj.detail || obj.data || {} });
       resolveHandshakeIfAny("hello");
       return;
     }
 
     if (kind === "status") {
-      sendStatus({ state: "server-status", detail: obj.detail || obj.data || {}, stage: obj.stage || "" });
+      const d = obj.detail || obj.data || {};
+      if (d.delta) {
+        const { delta: _d, ...changed } = d;
+        serverStatusDetail = { ...serverStatusDetail, ...changed };
+      } else {
+        serverStatusDetail = d;
+      }
+      sendStatus({ state: "server-status", detail: serverStatusDetail, stage: obj.stage || "" });
       resolveHandshakeIfAny("status");
       return;
     }
@@ -648,16 +925,30 @@
       return;
     }
     if (kind === "stable") {
-      chrome.runtime.sendMessage({ __cmd: "__TRANSCRIPT_STABLE__", payload: obj });
+      flushPatchReveal();
+      const payload = applyStableFrame(obj);
+      if (payload) {
+        chrome.runtime.sendMessage({ __cmd: "__TRANSCRIPT_STABLE__", payload });
+        noteDisplayed(obj);
+      }
       resolveHandshakeIfAny("stable");
       return;
     }
     if (kind === "patch") {
-      chrome.runtime.sendMessage({ __cmd: "__TRANSCRIPT_PATCH__", payload: obj });
+      relayPatchWithSlices(obj);
       resolveHandshakeIfAny("patch");
       return;
     }
 
+    if (kind === "pong") {
+      onClockPong(obj);
+      return;
+    }
+    if (kind === "ack") {
+      const caps = obj.detail?.caps;
+      if (Array.isArray(caps) && caps.includes("ts1")) startClockSync();
+    }
+
     // any other JSON message counts as handshake evidence too
     resolveHandshakeIfAny("other");
   }
@@ -709,7 +1000,7 @@
           }
 
           // Explicit start event for server session config
-          safeSendText(socket, { event: "start", sample_rate: sampleRate, dtype });
+          safeSendText(socket, { event: "start", sample_rate: sampleRate, dtype, caps: CLIENT_CAPS });
 
           // allow streaming PCM AFTER start config sent
           wsReadyToStream = true;
@@ -762,6 +1053,10 @@
 
         socket.onmessage = (ev) => {
           (async () => {
+            if (ev.data instanceof ArrayBuffer) {
+              await handleServerBinaryMessage(ev.data);
+              return;
+            }
             const txt = await normalizeWsText(ev.data);
             if (!txt) return;
             await handleServerTextMessage(txt);
@@ -918,7 +1213,7 @@
             return;
           }
           try {
-            ws.send(buf);
+            ws.send(ts1Active ? withCaptureStamp(buf, msg.tCtx) : buf);
             chunksSent++;
             bytesSent += buf.byteLength;
             wsBufferedAmount = Number(ws.bufferedAmount || 0);
@@ -15,13 +15,39 @@
 #   - Binary: PCM int16 LE (default SRC_SAMPLE_RATE)
 #   - JSON: {"event":"start|stop"} or {"audio":base64,"sr":48000,"dtype":"i16|f32"}
 #   - (Optional) auth message: {"type":"auth","token":"..."}  (if AUTH_MODE=message/either)
+#   - (Optional) caps: ?caps=a,b or {"event":"hello|start","caps":["patch_batch", ...]}
 #
 # Output:
 #   - {"type":"hello"...}
 #   - {"type":"auth_ok"...} / {"type":"error", "code":"BUSY|..."}
 #   - {"type":"patch","delete":N,"insert":"..."}  (micro delta)
+#     (caps "patch_batch": single frame + "slices":[[n_chars, at_ms], ...] reveal hints)
 #   - {"type":"stable","full":"..."}
+#     (caps "stable_delta": {"off":N,"append":"...","len":L,"base_crc":C0,"crc":C} + periodic {"full":...,"ckpt":true};
+#      client sends {"event":"resync"} to get a checkpoint now)
+#   - caps "bin1": stables with a long full/append text (>= WIRE_BIN_MIN_CHARS) as binary frames
+#     (wire_codec.py); everything else stays JSON
+#   - caps "ts1": binary audio may start with b"VTs1" + f64 LE client capture time (ms, client clock);
+#     patch/stable carry "cap_ms" = capture time of the newest audio fed before them.
+#     Client clock sync: {"event":"ping","t0":ms,"last":[t0,t1,t2,t3],"disp":[[cap_ms,disp_ms],...]}
+#     -> {"type":"pong","t0":..,"t1":..,"t2":..} (NTP-style; server keeps the min-RTT offset estimate)
 #   - {"type":"status","stage":"FEED","detail":{...}}
+#     (caps "status_delta": only changed fields + "delta":true; constant config is in hello)
+#     detail.latency = {stage: {n,p50,p90,p99,max}} (ms, sliding window; client {"event":"latency_reset"} clears it)
+#
+# Side port (METRICS_HOST:METRICS_PORT, default 127.0.0.1:9765, same event loop):
+#   - GET /metrics  Prometheus text (sessions, frames, bytes, drops/trims, patches/stables, init time, RSS/GPU, latency)
+#   - GET /ready    200 once the recorder class is imported (503 while warming up) + start-up phase timings
+#     (the port opens before RealtimeSTT/torch are imported; sessions arriving earlier wait for it)
+#   - GET /trace    (admin) chunk spans as Chrome trace JSON (?enable=1&sample=N&ring=N starts tracing,
+#     ?enable=0 stops it; TRACE_CHUNKS=1 traces from start-up)
+#   - GET /loop     event-loop lag watchdog: lag summary + last stall (stack captured while it was blocked)
+#   - GET /profile?seconds=N&hz=100&idle=0   (admin, Bearer ADMIN_TOKEN) sample all threads for N s;
+#     returns collapsed stacks (flamegraph.pl / speedscope) and keeps a copy in PROFILE_DIR
+#   - GET /memory[?snapshot=1&baseline=1&types=N&enable=0|1]   (admin) tracemalloc top sites + growth since
+#     the previous snapshot / baseline, retained containers per live session, gc type counts
+#   - GET /sessions[?user=ID]  per-session accounting (bytes, audio seconds in/fed/dropped, inference and
+#     CPU time, TXT bytes) of open sessions + per-user totals   (admin)
 #
 # Notes for WSS:
 # - Production typically terminates TLS at a reverse proxy (Caddy/Nginx) and forwards to this WS server.
@@ -41,12 +67,19 @@ import threading
 import multiprocessing as mp
 import hmac
 import hashlib
+import struct
+import concurrent.futures
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, Literal, List, Tuple, Any, Dict
 from collections import deque
 from urllib.parse import urlparse, parse_qs
 
+import startup_timer
+
+# start-up phases up to "listening" / "ready" (logged, GET /ready, stt_startup_* gauges)
+_STARTUP = startup_timer.StartupTimer()
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Windows DLL bootstrap (MUST be before importing ctranslate2/torch/RealtimeSTT)
 # ──────────────────────────────────────────────────────────────────────────────
@@ -144,6 +177,7 @@ def _win_bootstrap_dlls_early() -> None:
             print(line, file=sys.stderr)
 
 _win_bootstrap_dlls_early()
+_STARTUP.mark("dll_bootstrap")
 
 # ──────────────────────────────────────────────────────────────────────────────
 # LOGGING
@@ -155,6 +189,9 @@ LOG_STDERR = (os.getenv("LOG_STDERR", "1").strip().lower() in {"1", "true", "yes
 LOG_WS_EVERY_N = int(os.getenv("LOG_WS_EVERY_N", "25"))
 LOG_AUDIO_EVERY_N = int(os.getenv("LOG_AUDIO_EVERY_N", "50"))
 LOG_STATUS_EVERY = float(os.getenv("LOG_STATUS_EVERY", "2.0"))
+STATUS_INTERVAL_SEC = float(os.getenv("STATUS_INTERVAL_SEC", "0.5"))     # per-session status message period
+TELEMETRY_SAMPLE_SEC = float(os.getenv("TELEMETRY_SAMPLE_SEC", "1.0"))   # process-wide psutil/NVML sampling period
+LATENCY_WINDOW_SEC = float(os.getenv("LATENCY_WINDOW_SEC", "30"))        # latency histogram window (status p50/p90/p99)
 
 def _setup_logging():
     level = getattr(logging, LOG_LEVEL, logging.DEBUG)
@@ -225,16 +262,34 @@ def _log_system_banner():
         logger.info("ENV: CONDA_PREFIX=%s", os.getenv("CONDA_PREFIX"))
         ph = os.getenv("PATH", "")
         logger.info("ENV: PATH(head)=%s", (ph[:220] + "...") if len(ph) > 220 else ph)
+    except Exception:
+        pass
+
+def _log_package_banner():
+    """
+    Package versions (importlib.metadata scans every sys.path entry) + torch CUDA state.
+    Runs in the warm-up thread after the port is open; torch is only reported if something
+    (RealtimeSTT / silero VAD) already imported it -- server.py never imports it for a log line.
+    """
+    if not _MAIN_PROCESS:
+        return
+    try:
         logger.info("pkg: websockets=%s numpy=%s", _pkg_version("websockets") or "?", _pkg_version("numpy") or "?")
         logger.info("pkg: RealtimeSTT=%s faster-whisper=%s ctranslate2=%s torch=%s",
                     _pkg_version("RealtimeSTT") or "-",
                     _pkg_version("faster-whisper") or "-",
                     _pkg_version("ctranslate2") or "-",
                     _pkg_version("torch") or "-")
+        torch_mod = sys.modules.get("torch")
+        if torch_mod is not None:
+            logger.info("torch loaded | version=%s | cuda_is_available=%s",
+                        getattr(torch_mod, "__version__", "?"),
+                        bool(getattr(torch_mod.cuda, "is_available", lambda: False)()))
     except Exception:
         pass
 
 _log_system_banner()
+_STARTUP.mark("logging")
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Optional uvloop
@@ -257,12 +312,24 @@ try:
 except Exception as e:
     _RESAMPLE_USES_SCIPY = False
     logger.warning("resample_poly unavailable: %r", e)
-    try:
-        import librosa  # type: ignore
-        logger.info("resample: librosa OK")
-    except Exception as e2:
-        librosa = None
-        logger.warning("librosa unavailable: %r", e2)
+    logger.info("resample: librosa fallback (imported on first use) or linear interpolation")
+
+_librosa_mod: Any = None   # None = not tried yet, False = unavailable
+
+def _librosa():
+    """librosa (seconds to import: numba) only serves non-integer ratios without scipy: load on first use."""
+    global _librosa_mod
+    if _librosa_mod is None:
+        try:
+            import librosa  # type: ignore
+            _librosa_mod = librosa
+            logger.info("resample: librosa OK")
+        except Exception as e:
+            _librosa_mod = False
+            logger.warning("librosa unavailable: %r", e)
+    return _librosa_mod or None
+
+_STARTUP.mark("resampler")
 
 # HF/cache behavior
 os.environ.setdefault("HF_HUB_OFFLINE", os.getenv("HF_HUB_OFFLINE", "0"))
@@ -270,6 +337,29 @@ os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
 
 import numpy as np
 import websockets
+_STARTUP.mark("numpy_websockets")
+
+import wire_codec
+import txt_journal
+import txt_archive
+import txt_compact
+import latency_hist
+import metrics_http
+import chunk_trace
+import loop_watchdog
+import sampling_profiler
+import session_acct
+import mem_diag
+import traffic_capture
+from transcript_text import (SentenceCommitter, StableDeltaEncoder, TranscriptStore,
+                             norm_spaces as _norm_spaces, lcp_len as _lcp_len)
+import sim_clock
+
+# time source of the streaming path (pacer, patch/rewrite rate limits, idle/status timers, TXT throttles);
+# tools/sim_stream.py swaps in a sim_clock.VirtualClock to run hours of audio in seconds
+_CLOCK = sim_clock.SYSTEM
+_CLOCK_REF = sim_clock.ClockRef(lambda: _CLOCK)   # for helper objects created before a swap
+_STARTUP.mark("local_modules")
 
 # ──────────────────────────────────────────────────────────────────────────────
 # WS Server config
@@ -277,6 +367,44 @@ import websockets
 WS_HOST = os.getenv("WS_HOST", "0.0.0.0")
 WS_PORT = int(os.getenv("WS_PORT", "8765"))
 
+# side port (same event loop): GET /metrics (Prometheus text). METRICS_PORT=0 disables it.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9765"))
+
+# sampled per-chunk span tracing (chunk_trace.py); can also be switched on at runtime via GET /trace?enable=1 (admin)
+TRACE_CHUNKS = (os.getenv("TRACE_CHUNKS", "0").strip().lower() in {"1", "true", "yes"})
+TRACE_SAMPLE_EVERY = int(os.getenv("TRACE_SAMPLE_EVERY", "10"))   # trace 1 of N received audio chunks
+TRACE_RING_SPANS = int(os.getenv("TRACE_RING_SPANS", "20000"))    # spans kept (oldest dropped)
+TRACE_RING_MAX = int(os.getenv("TRACE_RING_MAX", "500000"))        # cap on /trace?ring=N
+
+# event-loop lag watchdog (loop_watchdog.py): heartbeat every interval; a heartbeat late by more than
+# STALL_MS captures the loop thread's stack (logged at most once per LOG_EVERY_SEC)
+LOOP_WATCHDOG_ENABLE = (os.getenv("LOOP_WATCHDOG_ENABLE", "1").strip().lower() in {"1", "true", "yes"})
+LOOP_WATCHDOG_INTERVAL_SEC = float(os.getenv("LOOP_WATCHDOG_INTERVAL_SEC", "0.1"))
+LOOP_WATCHDOG_STALL_MS = float(os.getenv("LOOP_WATCHDOG_STALL_MS", "200"))
+LOOP_WATCHDOG_LOG_EVERY_SEC = float(os.getenv("LOOP_WATCHDOG_LOG_EVERY_SEC", "30"))
+
+# admin routes on the side port (e.g. /profile) need "Authorization: Bearer $ADMIN_TOKEN"; unset = not served
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "").strip()
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles")).expanduser()
+PROFILE_MAX_SEC = float(os.getenv("PROFILE_MAX_SEC", "120"))
+
+# per-session accounting (session_acct.py): live on GET /sessions, one summary record per closed session
+# (logged; also appended as a JSON line to SESSION_ACCT_LOG when set)
+SESSION_ACCT_LOG = os.getenv("SESSION_ACCT_LOG", "").strip()
+
+# heap diagnostics (mem_diag.py): tracemalloc snapshots every interval, diffed against the previous one
+# and the first; admin GET /memory (also ?enable=1 at runtime). Slows allocations while on.
+MEM_DIAG = (os.getenv("MEM_DIAG", "0").strip().lower() in {"1", "true", "yes"})
+MEM_DIAG_INTERVAL_SEC = float(os.getenv("MEM_DIAG_INTERVAL_SEC", "300"))
+MEM_DIAG_TOP = int(os.getenv("MEM_DIAG_TOP", "15"))
+MEM_DIAG_FRAMES = int(os.getenv("MEM_DIAG_FRAMES", "1"))       # >1 groups sites by call stack
+
+# traffic capture (traffic_capture.py): every session's inbound frames (audio included) and outbound
+# messages with timestamps, one .vtcap file per session; replay/diff with tools/replay_capture.py. Empty = off.
+TRAFFIC_CAPTURE_DIR = os.getenv("TRAFFIC_CAPTURE_DIR", "").strip()
+TRAFFIC_CAPTURE_MAX_MB = float(os.getenv("TRAFFIC_CAPTURE_MAX_MB", "200"))
+
 # IMPORTANT: idle timeout to release single-user slot if client stalls
 IDLE_TIMEOUT_SEC = float(os.getenv("IDLE_TIMEOUT_SEC", "20"))  # seconds without any message => close
 
@@ -294,6 +422,10 @@ STT_LANGUAGE = (os.getenv("STT_LANGUAGE", "en") or "").strip() or None
 
 REQUIRE_GPU = os.getenv("REQUIRE_GPU", "1").strip().lower() in {"1","true","yes"}
 
+# "module:Class" used instead of RealtimeSTT.AudioToTextRecorder (same constructor kwargs / feed_audio API),
+# e.g. tools.stub_recorder:StubRecorder for benchmarks without a GPU; ctranslate2 is then not required
+STT_RECORDER_FACTORY = os.getenv("STT_RECORDER_FACTORY", "").strip()
+
 WEBRTC_SENSITIVITY = int(os.getenv("WEBRTC_SENSITIVITY", "3"))
 SILERO_SENSITIVITY = float(os.getenv("SILERO_SENSITIVITY", "0.6"))
 SILERO_DEACTIVITY = os.getenv("SILERO_DEACTIVITY", "0").strip().lower() in {"1","true","yes"}
@@ -326,6 +458,11 @@ UI_MICRO_DELTA_ENABLE = os.getenv("UI_MICRO_DELTA_ENABLE", "1").strip().lower()
 UI_MICRO_DELTA_MAX_CHARS = int(os.getenv("UI_MICRO_DELTA_MAX_CHARS", "48"))
 UI_MICRO_DELTA_MIN_SLICE_CHARS = int(os.getenv("UI_MICRO_DELTA_MIN_SLICE_CHARS", "12"))
 
+# batched patch frame (negotiated via client caps): one "patch" carries all slices + suggested reveal offsets,
+# the client does the smooth reveal. Legacy clients keep receiving one frame per micro-delta slice.
+UI_PATCH_BATCH_ENABLE = os.getenv("UI_PATCH_BATCH_ENABLE", "1").strip().lower() in {"1","true","yes"}
+UI_PATCH_BATCH_SLICE_MS = int(os.getenv("UI_PATCH_BATCH_SLICE_MS", "35"))  # suggested delay between slices
+
 # patch/stable tracing (debug overlay jumps)
 TRACE_PATCH = os.getenv("TRACE_PATCH", "0").strip().lower() in {"1", "true", "yes"}
 TRACE_PATCH_EVERY = int(os.getenv("TRACE_PATCH_EVERY", "1"))   # log every N updates
@@ -335,13 +472,42 @@ TRACE_PATCH_MAX_TAIL = int(os.getenv("TRACE_PATCH_MAX_TAIL", "80"))  # tail char
 # STABILIZER (YouTube-like: append-mostly, confirm rewrites, rate-limit patches)
 # ──────────────────────────────────────────────────────────────────────────────
 STAB_ENABLE = os.getenv("STAB_ENABLE", "1").strip().lower() in {"1","true","yes"}
-PATCH_MAX_HZ = float(os.getenv("PATCH_MAX_HZ", "15"))  # max patch sends per second
+PATCH_MAX_HZ = float(os.getenv("PATCH_MAX_HZ", "15"))  # max patch sends per second (start rate when adaptive)
+
+# per-connection adaptive patch rate (RTT from ping/pong + transport write backlog)
+PATCH_ADAPTIVE = os.getenv("PATCH_ADAPTIVE", "1").strip().lower() in {"1","true","yes"}
+PATCH_ADAPT_MIN_HZ = float(os.getenv("PATCH_ADAPT_MIN_HZ", "3"))     # slowest rate on a bad link
+PATCH_ADAPT_MAX_HZ = float(os.getenv("PATCH_ADAPT_MAX_HZ", "30"))    # fastest rate on a good link
+PATCH_RTT_MULT = float(os.getenv("PATCH_RTT_MULT", "1.5"))           # patch interval >= RTT * mult
+PATCH_RTT_PROBE_SEC = float(os.getenv("PATCH_RTT_PROBE_SEC", "2.0")) # ping period for RTT
+PATCH_LINK_SAMPLE_SEC = float(os.getenv("PATCH_LINK_SAMPLE_SEC", "0.25"))
+PATCH_BACKLOG_HIGH_BYTES = int(os.getenv("PATCH_BACKLOG_HIGH_BYTES", str(32 * 1024)))  # back off + skip patches above this
 REWRITE_CONFIRM_N = int(os.getenv("REWRITE_CONFIRM_N", "2"))
 MAX_ROLLBACK_CHARS = int(os.getenv("MAX_ROLLBACK_CHARS", "18"))
 MIN_REWRITE_INTERVAL_MS = int(os.getenv("MIN_REWRITE_INTERVAL_MS", "120"))
 IGNORE_SHRINK = os.getenv("IGNORE_SHRINK", "1").strip().lower() in {"1","true","yes"}
 ALLOW_PUNCT_STRIP_APPEND = os.getenv("ALLOW_PUNCT_STRIP_APPEND", "1").strip().lower() in {"1","true","yes"}
 
+# incremental stable (caps "stable_delta"): {off, append, len, base_crc, crc} + full checkpoint every N deltas
+STABLE_DELTA_ENABLE = os.getenv("STABLE_DELTA_ENABLE", "1").strip().lower() in {"1","true","yes"}
+STABLE_CKPT_EVERY = int(os.getenv("STABLE_CKPT_EVERY", "50"))
+
+# bounded live transcript (long sessions): text older than the live tail is frozen into compressed chunks;
+# stabilizer / last patch / stable snapshot / TXT writer only hold the tail (offsets stay absolute)
+TRANSCRIPT_LIVE_MAX_CHARS = int(os.getenv("TRANSCRIPT_LIVE_MAX_CHARS", "32768"))  # 0 = keep everything live
+TRANSCRIPT_LIVE_KEEP_CHARS = int(os.getenv("TRANSCRIPT_LIVE_KEEP_CHARS", "8192"))  # tail left live after a freeze
+
+# binary frames for long stables (caps "bin1", tables in hello.detail.wire; see wire_codec.py): skips
+# json.dumps' escape scan over checkpoint / legacy full texts; shorter frames are as cheap as JSON
+WIRE_BIN_ENABLE = os.getenv("WIRE_BIN_ENABLE", "1").strip().lower() in {"1","true","yes"}
+WIRE_BIN_MIN_CHARS = int(os.getenv("WIRE_BIN_MIN_CHARS", str(wire_codec.MIN_TEXT_CHARS)))
+
+# client capture timestamps + clock sync (caps "ts1"): capture->server and capture->display latency
+CAPTURE_TS_ENABLE = os.getenv("CAPTURE_TS_ENABLE", "1").strip().lower() in {"1","true","yes"}
+CLOCK_FILTER_N = int(os.getenv("CLOCK_FILTER_N", "8"))   # ping samples kept; the min-RTT one sets the offset
+TS1_MAGIC = b"VTs1"
+_F64_LE = struct.Struct("<d")
+
 # ──────────────────────────────────────────────────────────────────────────────
 # TXT SAVE (for translator.py consumption)
 # ──────────────────────────────────────────────────────────────────────────────
@@ -357,6 +523,31 @@ TXT_SAVE_MIN_DRAFT_INTERVAL_MS = int(os.getenv("TXT_SAVE_MIN_DRAFT_INTERVAL_MS",
 TXT_SAVE_FLUSH_TAIL_ON_END = os.getenv("TXT_SAVE_FLUSH_TAIL_ON_END", "1").strip().lower() in {"1","true","yes"}
 TXT_SAVE_QUEUE_MAX = int(os.getenv("TXT_SAVE_QUEUE_MAX", "256"))
 TXT_SAVE_MAX_CHARS_LATEST = int(os.getenv("TXT_SAVE_MAX_CHARS_LATEST", "0"))  # 0 = unlimited; else keep last N chars
+# latest text: journal = append-only en_journal.jsonl (+ .idx), en_latest materialized on session end
+#              rewrite = atomically rewrite en_latest on every stable (legacy) | both
+# rewrite/both (and drafts with the journal off) stay O(transcript) per write: each one reads the frozen
+# prefix back and writes the whole file. Their interval grows with the text so that at most
+# TXT_SAVE_REWRITE_CHARS_PER_SEC chars/s are rewritten (0 = only the MIN_*_INTERVAL_MS limits).
+TXT_SAVE_LATEST_MODE = os.getenv("TXT_SAVE_LATEST_MODE", "journal").strip().lower()
+TXT_SAVE_LATEST_ON_END = os.getenv("TXT_SAVE_LATEST_ON_END", "1").strip().lower() in {"1","true","yes"}
+TXT_SAVE_REWRITE_CHARS_PER_SEC = int(os.getenv("TXT_SAVE_REWRITE_CHARS_PER_SEC", "2000000"))
+TXT_SAVE_JOURNAL_INDEX_EVERY = int(os.getenv("TXT_SAVE_JOURNAL_INDEX_EVERY", "64"))  # stable records per index line
+# writer thread: commit = fsync every group commit | interval = fsync dirty files every N ms | none = let the OS flush
+TXT_SAVE_DURABILITY = os.getenv("TXT_SAVE_DURABILITY", "interval").strip().lower()
+TXT_SAVE_FSYNC_INTERVAL_MS = int(os.getenv("TXT_SAVE_FSYNC_INTERVAL_MS", "1000"))
+TXT_SAVE_GROUP_COMMIT_MS = int(os.getenv("TXT_SAVE_GROUP_COMMIT_MS", "25"))  # gather ops this long before committing
+TXT_SAVE_MAX_OPEN_FILES = int(os.getenv("TXT_SAVE_MAX_OPEN_FILES", "64"))
+# archive index (TXT_SAVE_DIR/archive.sqlite3): session manifest + word index over committed feed lines
+TXT_SAVE_ARCHIVE_INDEX = os.getenv("TXT_SAVE_ARCHIVE_INDEX", "1").strip().lower() in {"1","true","yes"}
+# finished session dirs -> one compressed session.vtz (see txt_compact.py); retention 0 = keep forever
+TXT_SAVE_COMPACT = os.getenv("TXT_SAVE_COMPACT", "1").strip().lower() in {"1","true","yes"}
+TXT_SAVE_COMPACT_CODEC = os.getenv("TXT_SAVE_COMPACT_CODEC", "zlib").strip().lower()  # zlib|lzma
+TXT_SAVE_COMPACT_BLOCK_KB = int(os.getenv("TXT_SAVE_COMPACT_BLOCK_KB", "64"))
+TXT_SAVE_COMPACT_KEEP_JOURNAL = os.getenv("TXT_SAVE_COMPACT_KEEP_JOURNAL", "1").strip().lower() in {"1","true","yes"}
+TXT_SAVE_COMPACT_SWEEP_SEC = float(os.getenv("TXT_SAVE_COMPACT_SWEEP_SEC", "600"))
+TXT_SAVE_COMPACT_GRACE_SEC = float(os.getenv("TXT_SAVE_COMPACT_GRACE_SEC", "300"))  # sweep: idle time before a leftover dir is packed
+TXT_SAVE_RETAIN_MAX_MB = float(os.getenv("TXT_SAVE_RETAIN_MAX_MB", "0"))
+TXT_SAVE_RETAIN_MAX_DAYS = float(os.getenv("TXT_SAVE_RETAIN_MAX_DAYS", "0"))
 
 def _iso_local(ts: Optional[float] = None) -> str:
     try:
@@ -365,6 +556,249 @@ def _iso_local(ts: Optional[float] = None) -> str:
     except Exception:
         return str(ts if ts is not None else time.time())
 
+class _TxtWriterThread:
+    """
+    One long-lived writer thread per process for TXT_SAVE.
+      - append(): lines go to a kept-open handle (no open/close per write)
+      - replace(): atomic tmp+fsync+rename (no fsync with "none"); several replaces of one path inside
+        a group collapse to the last, so at most one fsync per path per group
+      - write(): truncate + write (session start)
+      - barrier(): concurrent Future resolved once everything before it is written (and fsynced unless "none")
+      - call(): run fn() on the writer thread, in order with the file ops (archive index updates)
+    Ops are gathered for TXT_SAVE_GROUP_COMMIT_MS and committed together (group commit).
+    """
+    def __init__(self, durability: str, fsync_interval_ms: int, group_ms: int, max_open: int):
+        self.durability = durability if durability in {"commit", "interval", "none"} else "interval"
+        self.fsync_interval_s = max(0.0, fsync_interval_ms / 1000.0)
+        self.group_s = max(0.0, group_ms / 1000.0)
+        self.max_open = max(2, int(max_open))
+
+        self._ops: deque = deque()
+        self._cv = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._files: Dict[str, Any] = {}     # path -> open append handle (insertion order = LRU)
+        self._dirty: set = set()             # paths written since last fsync
+        self._last_fsync = time.monotonic()
+        self._on_commit: List[Any] = []      # fn() after each group (e.g. archive index transaction commit)
+
+        self.commits = 0
+        self.fsyncs = 0
+        self.ops_total = 0
+
+    # ---- producer side (any thread) ----
+    def _put(self, op: tuple):
+        with self._cv:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="txt-writer", daemon=True)
+                self._thread.start()
+            self._ops.append(op)
+            self._cv.notify()
+
+    def append(self, path: Optional[Path], lines: List[str]):
+        if path is not None and lines:
+            self._put(("append", str(path), list(lines)))
+
+    def replace(self, path: Optional[Path], text: str):
+        if path is not None:
+            self._put(("replace", str(path), text))
+
+    def write(self, path: Optional[Path], text: str):
+        if path is not None:
+            self._put(("write", str(path), text))
+
+    def close(self, path: Optional[Path]):
+        if path is not None:
+            self._put(("close", str(path), None))
+
+    def call(self, fn, *args):
+        self._put(("call", "", (fn, args)))
+
+    def add_commit_hook(self, fn):
+        self._on_commit.append(fn)
+
+    def barrier(self) -> concurrent.futures.Future:
+        fut: concurrent.futures.Future = concurrent.futures.Future()
+        self._put(("barrier", "", fut))
+        return fut
+
+    # ---- writer thread ----
+    def _handle(self, path: str):
+        f = self._files.pop(path, None)
+        if f is None:
+            try:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+            except Exception:
+                pass
+            f = open(path, "a", encoding="utf-8", newline="\n")
+            while len(self._files) >= self.max_open:
+                old_path, old_f = next(iter(self._files.items()))
+                self._close(old_path, old_f)
+        self._files[path] = f
+        return f
+
+    def _close(self, path: str, f=None):
+        f = f if f is not None else self._files.get(path)
+        self._files.pop(path, None)
+        if f is None:
+            return
+        try:
+            f.flush()
+            if path in self._dirty and self.durability != "none":
+                os.fsync(f.fileno())
+                self.fsyncs += 1
+        except Exception:
+            pass
+        self._dirty.discard(path)
+        try:
+            f.close()
+        except Exception:
+            pass
+
+    def _atomic_replace(self, path: str, text: str):
+        p = Path(path)
+        try:
+            p.parent.mkdir(parents=True, exist_ok=True)
+        except Exception:
+            pass
+        tmp = Path(path + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+                f.write(text)
+                if not text.endswith("\n"):
+                    f.write("\n")
+                f.flush()
+                # the rename must not reach disk before the data, or a crash leaves an empty/short file
+                if self.durability != "none":
+                    os.fsync(f.fileno())
+                    self.fsyncs += 1
+            os.replace(tmp, p)
+        except Exception:
+            try:
+                if tmp.exists():
+                    tmp.unlink()
+            except Exception:
+                pass
+
+    def _fsync_dirty(self):
+        for path in list(self._dirty):
+            f = self._files.get(path)
+            if f is None:
+                continue
+            try:
+                os.fsync(f.fileno())
+                self.fsyncs += 1
+            except Exception:
+                pass
+        self._dirty.clear()
+        self._last_fsync = time.monotonic()
+
+    def _commit(self, batch: List[tuple]):
+        # last replace per path wins inside one group
+        last_replace: Dict[str, int] = {}
+        for i, op in enumerate(batch):
+            if op[0] == "replace":
+                last_replace[op[1]] = i
+
+        barriers = []
+        for i, (kind, path, arg) in enumerate(batch):
+            try:
+                if kind == "append":
+                    f = self._handle(path)
+                    for ln in arg:
+                        ln = (ln or "").rstrip("\r\n")
+                        if ln:
+                            f.write(ln + "\n")
+                    self._dirty.add(path)
+                elif kind == "replace":
+                    if last_replace.get(path) == i:
+                        self._atomic_replace(path, arg)
+                elif kind == "write":
+                    self._close(path)
+                    f = self._handle(path)
+                    f.truncate(0)
+                    f.write(arg)
+                    self._dirty.add(path)
+                elif kind == "close":
+                    self._close(path)
+                elif kind == "call":
+                    arg[0](*arg[1])
+                elif kind == "barrier":
+                    barriers.append(arg)
+            except Exception as e:
+                logger.debug("txt writer %s %s failed: %r", kind, path, e)
+
+        for f in self._files.values():
+            try:
+                f.flush()
+            except Exception:
+                pass
+        for fn in self._on_commit:
+            try:
+                fn()
+            except Exception as e:
+                logger.debug("txt writer commit hook failed: %r", e)
+
+        if self.durability == "commit" or (barriers and self.durability != "none"):
+            self._fsync_dirty()
+        elif self.durability == "none":
+            self._dirty.clear()
+        self.commits += 1
+        self.ops_total += len(batch)
+
+        for fut in barriers:
+            try:
+                fut.set_result(True)
+            except Exception:
+                pass
+
+    def _run(self):
+        while True:
+            with self._cv:
+                if not self._ops:
+                    timeout = None
+                    if self._dirty and self.durability == "interval":
+                        timeout = max(0.0, self.fsync_interval_s - (time.monotonic() - self._last_fsync))
+                    self._cv.wait(timeout)
+            if self.group_s > 0:
+                time.sleep(self.group_s)  # let concurrent producers join this group
+            with self._cv:
+                batch = list(self._ops)
+                self._ops.clear()
+            if batch:
+                self._commit(batch)
+            if self._dirty and self.durability == "interval" and (time.monotonic() - self._last_fsync) >= self.fsync_interval_s:
+                self._fsync_dirty()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"durability": self.durability, "commits": int(self.commits), "fsyncs": int(self.fsyncs),
+                "ops": int(self.ops_total), "open_files": len(self._files)}
+
+_TXT_IO = _TxtWriterThread(TXT_SAVE_DURABILITY, TXT_SAVE_FSYNC_INTERVAL_MS, TXT_SAVE_GROUP_COMMIT_MS, TXT_SAVE_MAX_OPEN_FILES)
+
+# archive index is only touched from the writer thread; one sqlite transaction per write group
+_TXT_ARCHIVE: Optional[txt_archive.ArchiveIndex] = None
+if TXT_SAVE_ENABLE and TXT_SAVE_ARCHIVE_INDEX:
+    _TXT_ARCHIVE = txt_archive.ArchiveIndex(TXT_SAVE_DIR)
+    _TXT_IO.add_commit_hook(_TXT_ARCHIVE.commit)
+
+def _txt_archive_forget(tag: str):
+    if _TXT_ARCHIVE is not None:
+        _TXT_IO.call(_TXT_ARCHIVE.forget_session, tag)
+
+_TXT_COMPACTOR: Optional[txt_compact.SessionCompactor] = None
+if TXT_SAVE_ENABLE and TXT_SAVE_COMPACT:
+    _TXT_COMPACTOR = txt_compact.SessionCompactor(
+        TXT_SAVE_DIR,
+        codec=TXT_SAVE_COMPACT_CODEC,
+        block_bytes=TXT_SAVE_COMPACT_BLOCK_KB * 1024,
+        keep_journal=TXT_SAVE_COMPACT_KEEP_JOURNAL,
+        max_total_bytes=int(TXT_SAVE_RETAIN_MAX_MB * 1024 * 1024),
+        max_age_sec=TXT_SAVE_RETAIN_MAX_DAYS * 86400.0,
+        sweep_sec=TXT_SAVE_COMPACT_SWEEP_SEC,
+        grace_sec=TXT_SAVE_COMPACT_GRACE_SEC,
+        on_delete=_txt_archive_forget,
+    )
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Optional AUTH (disabled by default)
 # ──────────────────────────────────────────────────────────────────────────────
@@ -404,19 +838,59 @@ def _jwt_hs256_verify(token: str, secret: bytes) -> Optional[dict]:
     except Exception:
         return None
 
-def _extract_query_ticket(websocket) -> str:
+def _ws_path(websocket) -> str:
     path = getattr(websocket, "path", None)
     req = getattr(websocket, "request", None)
     if not path and req is not None:
         path = getattr(req, "path", None)
+    return path or ""
+
+def _extract_query_param(websocket, name: str) -> str:
+    path = _ws_path(websocket)
     if not path:
         return ""
     try:
         q = parse_qs(urlparse(path).query)
-        return (q.get("ticket", [""])[0] or "").strip()
+        return (q.get(name, [""])[0] or "").strip()
     except Exception:
         return ""
 
+def _extract_query_ticket(websocket) -> str:
+    return _extract_query_param(websocket, "ticket")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Client capabilities (opt-in protocol extensions)
+#   - advertised in hello.detail.caps
+#   - client opts in via ?caps=a,b or {"event":"hello|start","caps":[...]}; accepted set is echoed in ack
+# ──────────────────────────────────────────────────────────────────────────────
+def _server_caps() -> List[str]:
+    caps = []
+    if UI_PATCH_BATCH_ENABLE:
+        caps.append("patch_batch")
+    if STABLE_DELTA_ENABLE:
+        caps.append("stable_delta")
+    caps.append("status_delta")
+    if WIRE_BIN_ENABLE:
+        caps.append(wire_codec.WIRE_FORMAT)
+    if CAPTURE_TS_ENABLE:
+        caps.append("ts1")
+    return caps
+
+def _parse_caps(v: Any) -> set:
+    if isinstance(v, str):
+        items = v.split(",")
+    elif isinstance(v, (list, tuple, set)):
+        items = list(v)
+    else:
+        return set()
+    out = set()
+    for x in items:
+        if isinstance(x, str) and x.strip():
+            out.add(x.strip().lower())
+    return out
+
+_STARTUP.mark("config_txt_io")
+
 # ──────────────────────────────────────────────────────────────────────────────
 # psutil / nvml (optional)
 # ──────────────────────────────────────────────────────────────────────────────
@@ -428,26 +902,36 @@ except Exception as e:
     psutil = None
     _PROC = None
     logger.warning("psutil unavailable: %r", e)
+_STARTUP.mark("psutil")
 
-_nvml_ok = False
+# NVML is initialised on first use (telemetry thread / warm-up), not at import: nvmlInit probes the driver
+pynvml = None
+_nvml_ok: Optional[bool] = None   # None = not tried yet
 _nvml_handle = None
-try:
-    import pynvml  # type: ignore
-    pynvml.nvmlInit()
-    _nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(int(os.getenv("GPU_ID", "0")))
-    _nvml_ok = True
-    try:
-        name = pynvml.nvmlDeviceGetName(_nvml_handle)
-        drv = pynvml.nvmlSystemGetDriverVersion()
-        logger.info("pynvml OK | name=%s | driver=%s", name, drv)
-    except Exception:
-        logger.info("pynvml OK")
-except Exception as e:
-    _nvml_ok = False
-    logger.warning("pynvml unavailable: %r", e)
+_nvml_lock = threading.Lock()
+
+def _nvml_init() -> bool:
+    global pynvml, _nvml_ok, _nvml_handle
+    with _nvml_lock:
+        if _nvml_ok is None:
+            try:
+                import pynvml as _nv  # type: ignore
+                _nv.nvmlInit()
+                _nvml_handle = _nv.nvmlDeviceGetHandleByIndex(int(os.getenv("GPU_ID", "0")))
+                pynvml = _nv
+                _nvml_ok = True
+                try:
+                    logger.info("pynvml OK | name=%s | driver=%s",
+                                _nv.nvmlDeviceGetName(_nvml_handle), _nv.nvmlSystemGetDriverVersion())
+                except Exception:
+                    logger.info("pynvml OK")
+            except Exception as e:
+                _nvml_ok = False
+                logger.warning("pynvml unavailable: %r", e)
+        return bool(_nvml_ok)
 
 def _nvml_mem_mb():
-    if not _nvml_ok or _nvml_handle is None:
+    if not _nvml_init() or _nvml_handle is None:
         return None
     try:
         info = pynvml.nvmlDeviceGetMemoryInfo(_nvml_handle)
@@ -455,6 +939,172 @@ def _nvml_mem_mb():
     except Exception:
         return None
 
+class _TelemetrySampler:
+    """
+    Process-wide psutil/NVML sampler thread.
+    Sessions only read .snapshot (rebound atomically), so no blocking syscalls run on the event loop.
+    """
+    def __init__(self, interval_sec: float):
+        self.interval_sec = max(0.05, float(interval_sec))
+        self.snapshot: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample_once(self) -> Dict[str, Any]:
+        snap: Dict[str, Any] = {}
+        if _PROC is not None:
+            try:
+                snap["rss_mb"] = float(round(_PROC.memory_info().rss / (1024.0*1024.0), 1))
+            except Exception:
+                pass
+        pair = _nvml_mem_mb()
+        if pair is not None:
+            snap["gpu_nvml_mb"] = {"used": float(round(pair[0])), "total": float(round(pair[1]))}
+        self.snapshot = snap
+        return snap
+
+    def _run(self):
+        while True:
+            try:
+                self.sample_once()
+            except Exception:
+                pass
+            if self._stop.wait(self.interval_sec):
+                return
+
+    def ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+_TELEMETRY = _TelemetrySampler(TELEMETRY_SAMPLE_SEC)
+
+# pipeline latency stages (ms): audio enqueued -> fed to recorder, newest fed audio -> realtime callback,
+# callback -> websocket send done; with caps "ts1" also client capture -> server recv (clock-offset corrected)
+# and client capture -> client display (client clock only).
+# Each session records into its own set and into this process-wide one.
+LATENCY_STAGES = ("enqueue_feed", "feed_callback", "callback_send", "capture_recv", "capture_display")
+_LATENCY = latency_hist.LatencySet(list(LATENCY_STAGES), LATENCY_WINDOW_SEC, clock=_CLOCK_REF)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Metrics (pre-aggregated; updated on the event loop, /metrics only formats them)
+# ──────────────────────────────────────────────────────────────────────────────
+_METRICS = metrics_http.MetricsRegistry("stt_")
+_METRICS.gauge("active_sessions", "Sessions holding the server slot")
+_METRICS.counter("sessions_total", "Sessions accepted")
+_METRICS.counter("sessions_rejected_total", "Connections rejected because the slot was busy")
+_METRICS.counter("ws_messages_received_total", "WebSocket messages received")
+_METRICS.counter("ws_bytes_received_total", "WebSocket payload bytes received")
+_METRICS.counter("frames_fed_total", "Audio frames fed to the recorder")
+_METRICS.counter("queue_drops_total", "Queued audio items dropped (queue guard / byte cap)")
+_METRICS.counter("buffer_trims_total", "Times the 16 kHz buffer was trimmed to DROP_BUF_TO_MS")
+_METRICS.counter("buffer_trimmed_seconds_total", "Audio seconds discarded by buffer trims")
+_METRICS.counter("patches_sent_total", "Patch messages sent")
+_METRICS.counter("stables_sent_total", "Stable messages sent")
+_METRICS.counter("recorder_inits_total", "Recorder initializations")
+_METRICS.counter("recorder_init_failures_total", "Recorder initializations that failed")
+_METRICS.counter("recorder_init_seconds_total", "Total recorder initialization time")
+_METRICS.gauge("recorder_init_seconds_last", "Last recorder initialization time")
+_METRICS.gauge("start_time_seconds", "Process start time (unix)", initial=round(time.time(), 3))
+_METRICS.gauge("startup_listen_seconds", "Module import start -> WebSocket port listening")
+_METRICS.gauge("startup_ready_seconds", "Module import start -> recorder class imported (warm-up done)")
+
+
+def _collect_process_metrics() -> List[str]:
+    snap = _TELEMETRY.snapshot
+    out: List[str] = metrics_http.counter_lines("stt_process_cpu_seconds_total", "Process CPU time (all threads)",
+                                                [(None, round(time.process_time(), 4))])
+    if "rss_mb" in snap:
+        out += metrics_http.gauge_lines("stt_process_resident_memory_bytes", "Resident memory (psutil)",
+                                        [(None, int(snap["rss_mb"] * 1024 * 1024))])
+    gpu = snap.get("gpu_nvml_mb")
+    if gpu:
+        out += metrics_http.gauge_lines("stt_gpu_memory_bytes", "GPU memory (NVML)",
+                                        [({"kind": "used"}, int(gpu["used"] * 1024 * 1024)),
+                                         ({"kind": "total"}, int(gpu["total"] * 1024 * 1024))])
+    return out
+
+
+def _collect_latency_metrics() -> List[str]:
+    return metrics_http.histogram_lines(
+        "stt_latency_seconds", "Pipeline stage latency (cumulative)",
+        {s: h.cumulative() for s, h in _LATENCY.h.items()},
+    )
+
+
+_WATCHDOG: Optional[loop_watchdog.LoopWatchdog] = None   # started in main() (needs the running loop)
+
+
+def _collect_loop_metrics() -> List[str]:
+    wd = _WATCHDOG
+    if wd is None:
+        return []
+    return (
+        metrics_http.histogram_lines("stt_event_loop_lag_seconds", "Event loop scheduling lag (watchdog heartbeat)",
+                                     {"main": wd.hist.cumulative()}, label="loop")
+        + metrics_http.counter_lines("stt_event_loop_stalls_total",
+                                     "Heartbeats late by more than LOOP_WATCHDOG_STALL_MS", [(None, wd.stalls)])
+    )
+
+
+_METRICS.add_collector(_collect_process_metrics)
+_METRICS.add_collector(_collect_latency_metrics)
+_METRICS.add_collector(_collect_loop_metrics)
+
+# None = tracing off: every trace site is one `is not None` check
+_TRACE: Optional[chunk_trace.ChunkTracer] = (
+    chunk_trace.ChunkTracer(TRACE_RING_SPANS, TRACE_SAMPLE_EVERY, _CLOCK_REF) if TRACE_CHUNKS else None
+)
+
+_ACCOUNTS = session_acct.SessionAccounts(clock=_CLOCK_REF)
+_CAPTURES: Dict[int, traffic_capture.CaptureWriter] = {}     # id(websocket) -> capture (TRAFFIC_CAPTURE_DIR)
+
+
+def _capture_open(websocket, sess_id: str) -> Optional[traffic_capture.CaptureWriter]:
+    if not TRAFFIC_CAPTURE_DIR:
+        return None
+    path = Path(TRAFFIC_CAPTURE_DIR) / f"{time.strftime('%Y%m%d_%H%M%S')}_{re.sub(r'[^A-Za-z0-9_.-]+', '_', sess_id)}.vtcap"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        cap = traffic_capture.CaptureWriter(str(path), {
+            "sess_id": sess_id, "path": _ws_path(websocket), "server_caps": _server_caps(),
+            "recorder": STT_RECORDER_FACTORY or STT_MODEL, "src_sr": DEFAULT_SRC_SR,
+            "force_realtime_pace": bool(FORCE_REALTIME_PACE), "max_buf_ms": float(MAX_BUF_MS),
+        }, max_bytes=int(TRAFFIC_CAPTURE_MAX_MB * 1024 * 1024), clock=_CLOCK_REF)
+    except OSError as e:
+        logger.warning("[%s] traffic capture unavailable: %r", sess_id, e)
+        return None
+    _CAPTURES[id(websocket)] = cap
+    logger.info("[%s] capturing traffic -> %s", sess_id, path)
+    return cap
+
+# always constructed (session probes are just dict entries); tracing starts only via start()
+_MEMDIAG = mem_diag.MemoryDiagnostics(MEM_DIAG_INTERVAL_SEC, MEM_DIAG_TOP, MEM_DIAG_FRAMES)
+_MEMDIAG.add_gauge("accounts_open", lambda: len(_ACCOUNTS.active))
+_MEMDIAG.add_gauge("accounts_users", lambda: len(_ACCOUNTS.users))
+_MEMDIAG.add_gauge("txt_io", lambda: _TXT_IO.stats())
+_MEMDIAG.add_gauge("trace_spans", lambda: len(_TRACE.spans) if _TRACE is not None else 0)
+
+
+def _queued_item_sec(item: Any) -> float:
+    """Audio seconds in a queued (not yet decoded) audio item; "auto" dtype counted as int16."""
+    if not isinstance(item, dict):
+        return 0.0
+    bps = 4 if item.get("dtype") == "f32" else 2
+    return int(item.get("nbytes", 0)) / float(bps * max(1, int(item.get("sr") or DEFAULT_SRC_SR)))
+
+def _status_delta(prev: Dict[str, Any], cur: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level fields of cur that differ from prev (nested dicts compared as a whole)."""
+    return {k: v for k, v in cur.items() if k not in prev or prev[k] != v}
+
+def _utf8_len(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
 def _human_bytes(n: int) -> str:
     try:
         n = int(n)
@@ -468,6 +1118,8 @@ def _human_bytes(n: int) -> str:
         s += 1
     return f"{f:.2f} {units[s]}"
 
+_STARTUP.mark("metrics_sessions")
+
 # ──────────────────────────────────────────────────────────────────────────────
 # CTranslate2 GPU PROBE
 # ──────────────────────────────────────────────────────────────────────────────
@@ -501,21 +1153,10 @@ except Exception as e:
     if _MAIN_PROCESS:
         logger.error("Fix Windows: ensure torch\\lib + conda Library\\bin are in PATH or set WIN_DLL_BOOTSTRAP=1.")
 
-# torch (optional)
+_STARTUP.mark("ctranslate2")
+
+# torch is not imported here (it only ever fed a log line; _log_package_banner reports it once loaded)
 GPU_NAME = "cpu"
-_torch_available = False
-_torch_err = None
-try:
-    import torch as _torch  # type: ignore
-    import torch.nn.functional as _F  # type: ignore
-    _torch_available = True
-    logger.info("torch OK | version=%s | cuda_is_available=%s",
-                getattr(_torch, "__version__", "?"),
-                bool(getattr(_torch.cuda, "is_available", lambda: False)()))
-except Exception as e:
-    _torch_available = False
-    _torch_err = repr(e)
-    logger.warning("torch unavailable (OK): %s", _torch_err)
 
 def _init_gpu_or_fail():
     """
@@ -536,10 +1177,13 @@ def _init_gpu_or_fail():
     logger.info("AUTH: REQUIRE_AUTH=%s AUTH_MODE=%s", REQUIRE_AUTH, AUTH_MODE)
     logger.info("STAB: enable=%s patch_max_hz=%s rewrite_confirm_n=%s max_rollback_chars=%s min_rewrite_ms=%s ignore_shrink=%s",
                 STAB_ENABLE, PATCH_MAX_HZ, REWRITE_CONFIRM_N, MAX_ROLLBACK_CHARS, MIN_REWRITE_INTERVAL_MS, IGNORE_SHRINK)
-    logger.info("TXT_SAVE: enable=%s dir=%s current=%s draft=%s",
-                TXT_SAVE_ENABLE, str(TXT_SAVE_DIR), TXT_SAVE_WRITE_CURRENT, TXT_SAVE_DRAFT)
+    logger.info("PATCH: adaptive=%s min_hz=%s max_hz=%s rtt_mult=%s backlog_high=%s",
+                PATCH_ADAPTIVE, PATCH_ADAPT_MIN_HZ, PATCH_ADAPT_MAX_HZ, PATCH_RTT_MULT, PATCH_BACKLOG_HIGH_BYTES)
+    logger.info("TXT_SAVE: enable=%s dir=%s current=%s draft=%s durability=%s fsync_interval_ms=%s group_ms=%s archive=%s",
+                TXT_SAVE_ENABLE, str(TXT_SAVE_DIR), TXT_SAVE_WRITE_CURRENT, TXT_SAVE_DRAFT,
+                TXT_SAVE_DURABILITY, TXT_SAVE_FSYNC_INTERVAL_MS, TXT_SAVE_GROUP_COMMIT_MS, _TXT_ARCHIVE is not None)
 
-    if not _CT2_OK:
+    if not _CT2_OK and not STT_RECORDER_FACTORY:
         logger.error("ctranslate2 is required for faster-whisper. Import failed: %s", _CT2_ERR)
         sys.exit(1)
 
@@ -556,21 +1200,70 @@ def _init_gpu_or_fail():
 
     STT_DEVICE = want
     if STT_DEVICE == "cuda":
-        GPU_NAME = "cuda"
-        if _nvml_ok and _nvml_handle is not None:
-            try:
-                GPU_NAME = str(pynvml.nvmlDeviceGetName(_nvml_handle))
-            except Exception:
-                GPU_NAME = "cuda"
-        logger.info("STT will run on GPU via ctranslate2 | cuda_device_count=%d | gpu_name=%s",
-                    _CT2_CUDA_COUNT, GPU_NAME)
+        GPU_NAME = "cuda"     # NVML device name filled in by the warm-up thread (_resolve_gpu_name)
+        logger.info("STT will run on GPU via ctranslate2 | cuda_device_count=%d", _CT2_CUDA_COUNT)
     else:
         GPU_NAME = "cpu"
 
+def _resolve_gpu_name():
+    global GPU_NAME
+    if STT_DEVICE == "cuda" and _nvml_init() and _nvml_handle is not None:
+        try:
+            GPU_NAME = str(pynvml.nvmlDeviceGetName(_nvml_handle))
+            logger.info("gpu_name=%s", GPU_NAME)
+        except Exception:
+            pass
+
 _init_gpu_or_fail()
+_STARTUP.mark("gpu_check")
 
-# Import RealtimeSTT after bootstrap
-from RealtimeSTT import AudioToTextRecorder  # type: ignore
+# ──────────────────────────────────────────────────────────────────────────────
+# Warm-up (off the critical path): the port opens first, then a thread imports the recorder class
+# (RealtimeSTT -> faster-whisper, torch, ...), resolves the GPU name and logs the package banner.
+# Sessions that arrive earlier wait for the recorder class; GET /ready says when it is loaded.
+# ──────────────────────────────────────────────────────────────────────────────
+_RECORDER_CLS: "concurrent.futures.Future" = concurrent.futures.Future()
+_WARMUP_THREAD: Optional[threading.Thread] = None
+_WARMUP_LOCK = threading.Lock()
+
+def _load_recorder_class():
+    # imported after the DLL bootstrap (module top), never before
+    if STT_RECORDER_FACTORY:
+        import importlib
+        _rf_mod, _rf_sep, _rf_attr = STT_RECORDER_FACTORY.partition(":")
+        cls = getattr(importlib.import_module(_rf_mod), _rf_attr or "AudioToTextRecorder")
+        logger.warning("recorder factory override: %s (not RealtimeSTT)", STT_RECORDER_FACTORY)
+        return cls
+    from RealtimeSTT import AudioToTextRecorder  # type: ignore
+    return AudioToTextRecorder
+
+def _warmup():
+    with _STARTUP.phase("recorder_import"):
+        try:
+            _RECORDER_CLS.set_result(_load_recorder_class())
+        except BaseException as e:
+            logger.error("recorder import failed: %r\n%s", e, traceback.format_exc())
+            _RECORDER_CLS.set_exception(e)
+    if not _RESAMPLE_USES_SCIPY:
+        with _STARTUP.phase("librosa"):
+            _librosa()
+    with _STARTUP.phase("nvml"):
+        _resolve_gpu_name()
+    with _STARTUP.phase("package_banner"):
+        _log_package_banner()
+    ready = _STARTUP.milestone("ready")
+    _METRICS.set("startup_ready_seconds", round(ready / 1000.0, 3))
+    logger.info("startup: %s in %.0f ms | %s", "ready" if _RECORDER_CLS.exception() is None else "recorder FAILED",
+                ready, _STARTUP.format())
+
+def _ensure_warmup() -> "concurrent.futures.Future":
+    """Start the warm-up thread once; returns the recorder-class future."""
+    global _WARMUP_THREAD
+    with _WARMUP_LOCK:
+        if _WARMUP_THREAD is None:
+            _WARMUP_THREAD = threading.Thread(target=_warmup, name="startup-warmup", daemon=True)
+            _WARMUP_THREAD.start()
+    return _RECORDER_CLS
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Tokenizer (still used for chunking inserts)
@@ -593,9 +1286,38 @@ except Exception:
             out.append((tok + ws, tok))
         return out
 
-async def _ws_send(ws, obj: dict):
+def _split_insert_slices(insert_text: str) -> List[str]:
+    """Split an insert into token-aligned slices (micro delta) of ~UI_MICRO_DELTA_MAX_CHARS (lossless)."""
+    maxc = max(8, int(UI_MICRO_DELTA_MAX_CHARS))
+    minc = max(1, min(int(UI_MICRO_DELTA_MIN_SLICE_CHARS), maxc))
+
+    slices: List[str] = []
+    start = 0
+    for m in _TK.finditer(insert_text or ""):
+        cut = m.start()
+        if (m.end() - start) > maxc and (cut - start) >= minc:
+            slices.append(insert_text[start:cut])
+            start = cut
+    if start < len(insert_text or ""):
+        slices.append(insert_text[start:])
+    return slices
+
+async def _ws_send(ws, obj: dict, binary: bool = False):
     try:
-        await ws.send(json.dumps(obj, ensure_ascii=False))
+        if binary and wire_codec.prefer_binary(obj, WIRE_BIN_MIN_CHARS):
+            data = wire_codec.encode(obj)
+            n = len(data)
+        else:
+            data = json.dumps(obj, ensure_ascii=False)
+            n = _utf8_len(data)
+        await ws.send(data)
+        cap = _CAPTURES.get(id(ws))
+        if cap is not None:
+            cap.outbound(data)
+        acct = _ACCOUNTS.for_ws(ws)
+        if acct is not None:
+            acct.bytes_out += n
+            acct.msgs_out += 1
     except websockets.exceptions.ConnectionClosed:
         logger.debug("ws_send: connection closed")
     except Exception as e:
@@ -624,14 +1346,15 @@ def _resample_cpu_to_16k(f32: np.ndarray, src_sr: int) -> np.ndarray:
     elif _RESAMPLE_USES_SCIPY and src_sr % TGT_SR == 0:
         y = resample_poly(f32, up=1, down=src_sr // TGT_SR).astype(np.float32, copy=False)
     else:
-        if 'librosa' not in globals() or globals().get("librosa") is None:
+        librosa = _librosa()
+        if librosa is None:
             r = TGT_SR / float(src_sr)
             tgt_len = max(1, int(round(len(f32) * r)))
             xp = np.linspace(0, 1, len(f32), endpoint=False)
             xq = np.linspace(0, 1, tgt_len, endpoint=False)
             y = np.interp(xq, xp, f32).astype(np.float32, copy=False)
         else:
-            y = globals()["librosa"].resample(f32, orig_sr=src_sr, target_sr=TGT_SR).astype(np.float32, copy=False)
+            y = librosa.resample(f32, orig_sr=src_sr, target_sr=TGT_SR).astype(np.float32, copy=False)
 
     return np.nan_to_num(y, nan=0.0, posinf=1.0, neginf=-1.0)
 
@@ -670,35 +1393,14 @@ def _f32_to_bytes_i16(x: np.ndarray) -> bytes:
     x = np.nan_to_num(x, nan=0.0, posinf=1.0, neginf=-1.0)
     return (np.clip(x, -1.0, 1.0) * 32767.0).astype(np.int16, copy=False).tobytes()
 
-# history sentences splitter
-SENT_RE = re.compile(r'[^.!?…]*[.!?…]+(?:["”’\']+)?(?:\s+|$)')
-def split_sentences_and_tail(text: str):
-    sents = []
-    last_end = 0
-    for m in SENT_RE.finditer(text):
-        sents.append(m.group(0))
-        last_end = m.end()
-    tail = text[last_end:]
-    return sents, tail
-
 # ──────────────────────────────────────────────────────────────────────────────
 # Stabilizer helpers
 # ──────────────────────────────────────────────────────────────────────────────
 _TRAIL_PUNCT = " \t\r\n.,!?;:"
 
-def _norm_spaces(s: str) -> str:
-    return " ".join((s or "").strip().split())
-
 def _strip_trailing_punct(s: str) -> str:
     return (s or "").rstrip(_TRAIL_PUNCT)
 
-def _lcp_len(a: str, b: str) -> int:
-    n = min(len(a), len(b))
-    i = 0
-    while i < n and a[i] == b[i]:
-        i += 1
-    return i
-
 def _make_end_patch(old: str, new: str) -> Tuple[int, str, int]:
     c = _lcp_len(old, new)
     delete_n = len(old) - c
@@ -706,7 +1408,7 @@ def _make_end_patch(old: str, new: str) -> Tuple[int, str, int]:
     return delete_n, insert, c
 
 def _now_ms() -> int:
-    return int(time.time() * 1000)
+    return int(_CLOCK.time() * 1000)
 
 @dataclass
 class StabilizerDecision:
@@ -814,7 +1516,7 @@ _active_client: Optional[str] = None
 class _RealTimePacer:
     def __init__(self, sr: int):
         self.sr = sr
-        self.t0 = time.perf_counter()
+        self.t0 = _CLOCK.perf_counter()
         self.playhead = self.t0
 
     async def sleep_for_samples(self, nsamp: int):
@@ -822,13 +1524,106 @@ class _RealTimePacer:
             return
         dur = float(nsamp) / float(self.sr)
         self.playhead += dur
-        now = time.perf_counter()
+        now = _CLOCK.perf_counter()
         delay = self.playhead - now
         if delay > 0:
             await asyncio.sleep(delay)
         else:
             self.playhead = now
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Adaptive patch rate (per connection)
+# ──────────────────────────────────────────────────────────────────────────────
+def _ws_write_backlog(ws) -> int:
+    """Bytes waiting in the transport write buffer (0 if unknown)."""
+    try:
+        tr = getattr(ws, "transport", None)
+        if tr is None:
+            return 0
+        return int(tr.get_write_buffer_size())
+    except Exception:
+        return 0
+
+class _PatchRateController:
+    """
+    Patch interval within [1/max_hz, 1/min_hz]:
+      - target follows RTT (EWMA) * PATCH_RTT_MULT, never faster than max_hz
+      - write backlog above PATCH_BACKLOG_HIGH_BYTES doubles the interval (multiplicative back-off)
+      - otherwise the interval decays back towards the target
+    """
+    def __init__(self, start_hz: float, min_hz: float, max_hz: float):
+        max_hz = max(0.1, float(max_hz))
+        min_hz = max(0.1, min(float(min_hz), max_hz))
+        self.min_interval_ms = int(1000.0 / max_hz)
+        self.max_interval_ms = int(1000.0 / min_hz)
+        start_hz = min(max(float(start_hz), min_hz), max_hz) if start_hz > 0 else max_hz
+        self.interval_ms = int(1000.0 / start_hz)
+        self.rtt_ms: Optional[float] = None
+        self.backlog_bytes = 0
+        self.backoffs = 0
+
+    def on_rtt(self, rtt_ms: float):
+        rtt_ms = max(0.0, float(rtt_ms))
+        self.rtt_ms = rtt_ms if self.rtt_ms is None else (0.8 * self.rtt_ms + 0.2 * rtt_ms)
+
+    def on_backlog(self, nbytes: int) -> int:
+        self.backlog_bytes = max(0, int(nbytes))
+        target = float(self.min_interval_ms)
+        if self.rtt_ms is not None:
+            target = max(target, self.rtt_ms * PATCH_RTT_MULT)
+
+        if PATCH_BACKLOG_HIGH_BYTES > 0 and self.backlog_bytes > PATCH_BACKLOG_HIGH_BYTES:
+            nxt = max(target, self.interval_ms * 2.0)
+            self.backoffs += 1
+        else:
+            nxt = max(target, self.interval_ms * 0.75 + target * 0.25)
+
+        self.interval_ms = int(min(max(nxt, self.min_interval_ms), self.max_interval_ms))
+        return self.interval_ms
+
+    def congested(self) -> bool:
+        return PATCH_BACKLOG_HIGH_BYTES > 0 and self.backlog_bytes > PATCH_BACKLOG_HIGH_BYTES
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "adaptive": True,
+            "rtt_ms": (float(round(self.rtt_ms, 2)) if self.rtt_ms is not None else None),
+            "backlog_bytes": int(self.backlog_bytes),
+            "patch_interval_ms": int(self.interval_ms),
+            "patch_hz": float(round(1000.0 / max(1, self.interval_ms), 2)),
+            "backoffs": int(self.backoffs),
+        }
+
+class _ClockOffsetEstimator:
+    """
+    NTP-style client clock offset from ping exchanges (t0/t3 client clock, t1/t2 server clock, ms):
+      offset = ((t1 - t0) + (t2 - t3)) / 2   (server - client)
+      rtt    = (t3 - t0) - (t2 - t1)
+    The sample with the smallest RTT among the last n wins (least queueing -> least asymmetry error).
+    """
+    def __init__(self, n: int = 8):
+        self.samples: deque = deque(maxlen=max(1, int(n)))
+        self.offset_ms: Optional[float] = None
+        self.rtt_ms: Optional[float] = None
+
+    def add(self, t0: float, t1: float, t2: float, t3: float) -> bool:
+        rtt = (t3 - t0) - (t2 - t1)
+        if rtt < 0 or rtt > 60_000:
+            return False
+        self.samples.append((rtt, ((t1 - t0) + (t2 - t3)) / 2.0))
+        self.rtt_ms, self.offset_ms = min(self.samples)
+        return True
+
+    def to_server_ms(self, client_ms: float) -> Optional[float]:
+        return None if self.offset_ms is None else client_ms + self.offset_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "offset_ms": (float(round(self.offset_ms, 2)) if self.offset_ms is not None else None),
+            "rtt_ms": (float(round(self.rtt_ms, 2)) if self.rtt_ms is not None else None),
+            "n": len(self.samples),
+        }
+
 async def handler(websocket):
     global _active_client, _client_lock
 
@@ -843,11 +1638,16 @@ async def handler(websocket):
     async with _client_lock:
         if _active_client is not None:
             logger.warning("[%s] reject: busy (active=%s)", sess_id, _active_client)
+            _METRICS.inc("sessions_rejected_total")
             await _ws_send(websocket, {"type": "error", "error": "Hệ thống bận", "code": "BUSY"})
             await websocket.close(code=1013, reason="busy")
             return
         _active_client = sess_id
+        _METRICS.inc("active_sessions")
+        _METRICS.inc("sessions_total")
 
+    acct = _ACCOUNTS.open(sess_id, websocket)
+    capture = _capture_open(websocket, sess_id)
     loop = asyncio.get_running_loop()
 
     # helper to schedule async safely from callback threads
@@ -933,23 +1733,36 @@ async def handler(websocket):
         ok = await _authenticate()
         if not ok:
             return
+        acct.user = authed_user
+
+        # negotiated protocol extensions (query caps now, hello/start caps later)
+        session_caps: set = _parse_caps(_extract_query_param(websocket, "caps")) & set(_server_caps())
 
-        # transcript state (append-mostly)
+        # transcript state (append-mostly); both hold the live tail after transcript.base
         last_emitted: str = ""
         stable_snapshot: str = ""
+        transcript = TranscriptStore(TRANSCRIPT_LIVE_MAX_CHARS, TRANSCRIPT_LIVE_KEEP_CHARS)
 
         # debug counters for transcript behavior
         patch_seq = 0
         stable_seq = 0
-        last_update_ts = time.monotonic()
+        last_update_ts = _CLOCK.monotonic()
 
-        # patch rate limiting
+        # patch rate limiting (adaptive: updated by _link_monitor)
         patch_min_interval_ms = int(1000.0 / max(1e-6, float(PATCH_MAX_HZ))) if PATCH_MAX_HZ > 0 else 0
         last_patch_send_ms = 0
+        patch_rate: Optional[_PatchRateController] = None
+        if PATCH_ADAPTIVE:
+            patch_rate = _PatchRateController(PATCH_MAX_HZ, PATCH_ADAPT_MIN_HZ, PATCH_ADAPT_MAX_HZ)
+            patch_min_interval_ms = patch_rate.interval_ms
+        patch_skipped_backlog = 0
 
         # thread-safety (callbacks come from RealtimeSTT threads)
         patch_lock = threading.Lock()
 
+        # incremental stable frames (only used when the client negotiated "stable_delta")
+        stable_enc = StableDeltaEncoder(STABLE_CKPT_EVERY)
+
         # stabilizer (per session)
         stabilizer = TranscriptStabilizer(
             rewrite_confirm_n=REWRITE_CONFIRM_N,
@@ -959,12 +1772,15 @@ async def handler(websocket):
             allow_punct_strip_append=ALLOW_PUNCT_STRIP_APPEND,
         )
 
-        ui_e2e_samples: List[float] = []
         ui_e2e_last_ms: float = 0.0
         last_audio_enq_ts: Optional[float] = None
         fed_enq_watermark_ts: Optional[float] = None
+        fed_last_ts: Optional[float] = None
+        fed_cap_ms: Optional[float] = None      # "ts1": client capture time of the newest fed audio
+        clock = _ClockOffsetEstimator(CLOCK_FILTER_N)
+        latency = latency_hist.LatencySet(list(LATENCY_STAGES), LATENCY_WINDOW_SEC, parent=_LATENCY, clock=_CLOCK_REF)
 
-        warming_until_ts = time.monotonic() + max(0.0, WARMUP_SILENCE_SEC)
+        warming_until_ts = _CLOCK.monotonic() + max(0.0, WARMUP_SILENCE_SEC)
 
         # ──────────────────────────────────────────────────────────────────────
         # TXT SAVE (for translator.py) — stable commits + current latest (atomic)
@@ -980,6 +1796,12 @@ async def handler(websocket):
         txt_sess_latest: Optional[Path] = None
         txt_sess_feed: Optional[Path] = None
         txt_sess_draft: Optional[Path] = None
+        txt_sess_journal: Optional[Path] = None
+        txt_sess_journal_idx: Optional[Path] = None
+        txt_cur_journal: Optional[Path] = None
+        txt_journal_on = TXT_SAVE_LATEST_MODE in {"journal", "both"}
+        txt_archive_tag: Optional[str] = None
+        txt_rewrite_latest = TXT_SAVE_LATEST_MODE in {"rewrite", "both"} or not txt_journal_on
 
         # Producer-side throttling for draft pushes (called from STT thread)
         _draft_last_push_ms = 0
@@ -995,130 +1817,107 @@ async def handler(websocket):
                 pass
 
             sid = _safe_id(str(authed_user or sess_id))
-            sess_tag = f"{int(time.time())}_{sid}"
+            # millisecond tag, bumped past an existing dir: the same user reconnecting within a second
+            # (or a virtual clock) must not share a session dir
+            t_tag = int(_CLOCK.time() * 1000)
+            while (TXT_SAVE_DIR / f"session_{t_tag}_{sid}").exists():
+                t_tag += 1
+            sess_tag = f"{t_tag}_{sid}"
             txt_session_dir = TXT_SAVE_DIR / f"session_{sess_tag}"
             try:
                 txt_session_dir.mkdir(parents=True, exist_ok=True)
             except Exception:
                 txt_session_dir = TXT_SAVE_DIR
+            if _TXT_ARCHIVE is not None and txt_session_dir != TXT_SAVE_DIR:
+                txt_archive_tag = sess_tag
+                _TXT_IO.call(_TXT_ARCHIVE.begin_session, sess_tag, str(txt_session_dir),
+                             str(authed_user or "-"), sess_id, _now_ms())
+            if _TXT_COMPACTOR is not None and txt_session_dir != TXT_SAVE_DIR:
+                _TXT_COMPACTOR.hold(sess_tag)
 
             # session-scoped files
             txt_sess_latest = (txt_session_dir / "en_latest.txt") if txt_session_dir else None
             txt_sess_feed = (txt_session_dir / "en_feed.txt") if txt_session_dir else None
             txt_sess_draft = (txt_session_dir / "en_draft.txt") if txt_session_dir else None
+            if txt_journal_on:
+                txt_sess_journal = (txt_session_dir / "en_journal.jsonl") if txt_session_dir else None
+                txt_sess_journal_idx = (txt_session_dir / "en_journal.idx") if txt_session_dir else None
 
             # stable "current" files (constant paths for translator.py to read)
             if TXT_SAVE_WRITE_CURRENT:
                 txt_cur_latest = TXT_SAVE_DIR / f"en_latest_current_{sid}.txt"
                 txt_cur_feed = TXT_SAVE_DIR / f"en_feed_current_{sid}.txt"
                 txt_cur_draft = TXT_SAVE_DIR / f"en_draft_current_{sid}.txt"
+                if txt_journal_on:
+                    txt_cur_journal = TXT_SAVE_DIR / f"en_journal_current_{sid}.jsonl"
 
             txt_q = asyncio.Queue(maxsize=max(1, int(TXT_SAVE_QUEUE_MAX)))
 
             # init / truncate current feed on start (so translator can tail from fresh session)
-            def _init_files_sync():
-                header = f"# session_start={_iso_local()} | sess_id={sess_id} | user={authed_user or '-'}\n"
-                # session feed always starts fresh
-                if txt_sess_feed is not None:
-                    try:
-                        with open(txt_sess_feed, "w", encoding="utf-8", newline="\n") as f:
-                            f.write(header)
-                            f.flush()
-                            try:
-                                os.fsync(f.fileno())
-                            except Exception:
-                                pass
-                    except Exception:
-                        pass
-                if TXT_SAVE_WRITE_CURRENT and TXT_SAVE_TRUNCATE_CURRENT_ON_START and txt_cur_feed is not None:
-                    try:
-                        with open(txt_cur_feed, "w", encoding="utf-8", newline="\n") as f:
-                            f.write(header)
-                            f.flush()
-                            try:
-                                os.fsync(f.fileno())
-                            except Exception:
-                                pass
-                    except Exception:
-                        pass
-                # clear drafts on start (optional)
-                if TXT_SAVE_DRAFT:
-                    for p in [txt_sess_draft, txt_cur_draft]:
-                        if p is None:
-                            continue
-                        try:
-                            with open(p, "w", encoding="utf-8", newline="\n") as f:
-                                f.write("")
-                                f.flush()
-                                try:
-                                    os.fsync(f.fileno())
-                                except Exception:
-                                    pass
-                        except Exception:
-                            pass
-
-            try:
-                await asyncio.to_thread(_init_files_sync)
-            except Exception:
-                pass
-
-            async def _txt_atomic_write(path: Path, text: str):
-                if path is None:
-                    return
-                def _sync():
-                    try:
-                        path.parent.mkdir(parents=True, exist_ok=True)
-                    except Exception:
-                        pass
-                    tmp = Path(str(path) + ".tmp")
-                    try:
-                        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
-                            f.write(text)
-                            if not text.endswith("\n"):
-                                f.write("\n")
-                            f.flush()
-                            try:
-                                os.fsync(f.fileno())
-                            except Exception:
-                                pass
-                        os.replace(tmp, path)
-                    except Exception:
-                        try:
-                            if tmp.exists():
-                                tmp.unlink()
-                        except Exception:
-                            pass
-                await asyncio.to_thread(_sync)
-
-            async def _txt_append_lines(path: Path, lines: List[str]):
-                if path is None or not lines:
-                    return
-                def _sync():
-                    try:
-                        path.parent.mkdir(parents=True, exist_ok=True)
-                    except Exception:
-                        pass
-                    try:
-                        with open(path, "a", encoding="utf-8", newline="\n") as f:
-                            for ln in lines:
-                                ln = (ln or "").rstrip("\r\n")
-                                if ln:
-                                    f.write(ln + "\n")
-                            f.flush()
-                            try:
-                                os.fsync(f.fileno())
-                            except Exception:
-                                pass
-                    except Exception:
-                        pass
-                await asyncio.to_thread(_sync)
+            header = f"# session_start={_iso_local()} | sess_id={sess_id} | user={authed_user or '-'}\n"
+            # session feed always starts fresh
+            _TXT_IO.write(txt_sess_feed, header)
+            acct.txt_bytes += _utf8_len(header)
+            if TXT_SAVE_WRITE_CURRENT and TXT_SAVE_TRUNCATE_CURRENT_ON_START:
+                _TXT_IO.write(txt_cur_feed, header)
+                acct.txt_bytes += _utf8_len(header)
+            # journal: header record resets replay state (current journal may span sessions if not truncated)
+            txt_journal_bytes = 0
+            if txt_journal_on:
+                jhdr = txt_journal.header_record(_now_ms(), sess_id, str(authed_user or "-")) + "\n"
+                txt_journal_bytes = len(jhdr.encode("utf-8"))
+                acct.txt_bytes += 2 * txt_journal_bytes
+                _TXT_IO.write(txt_sess_journal, jhdr)
+                _TXT_IO.write(txt_sess_journal_idx, "")
+                if TXT_SAVE_WRITE_CURRENT and TXT_SAVE_TRUNCATE_CURRENT_ON_START:
+                    _TXT_IO.write(txt_cur_journal, jhdr)
+                else:
+                    _TXT_IO.append(txt_cur_journal, [jhdr])
+            # clear drafts on start (optional)
+            if TXT_SAVE_DRAFT:
+                for p in [txt_sess_draft, txt_cur_draft]:
+                    _TXT_IO.write(p, "")
+                    _TXT_IO.close(p)
+
+            def _txt_atomic_write(path: Optional[Path], text: str):
+                if path is not None:
+                    acct.txt_bytes += _utf8_len(text)
+                _TXT_IO.replace(path, text)
+
+            def _txt_rewrite_due(last_ms: int, now_ms: int, min_ms: int, n_chars: int) -> bool:
+                """Whole-file rewrite allowed now? The gap grows with the text (TXT_SAVE_REWRITE_CHARS_PER_SEC)."""
+                gap = max(0, int(min_ms))
+                if TXT_SAVE_REWRITE_CHARS_PER_SEC > 0:
+                    gap = max(gap, n_chars * 1000 // TXT_SAVE_REWRITE_CHARS_PER_SEC)
+                return now_ms - last_ms >= gap
+
+            def _txt_append_lines(path: Optional[Path], lines: List[str]):
+                if path is not None:
+                    acct.txt_bytes += sum(_utf8_len(ln) for ln in lines)
+                _TXT_IO.append(path, lines)
+
+            def _txt_journal_append(line: str, index_seq: Optional[int] = None, t_ms: int = 0, length: int = 0):
+                nonlocal txt_journal_bytes
+                if index_seq is not None:
+                    _TXT_IO.append(txt_sess_journal_idx, [txt_journal.index_line(index_seq, t_ms, txt_journal_bytes, length)])
+                n = len(line.encode("utf-8")) + 1
+                for p in [txt_sess_journal, txt_cur_journal]:
+                    if p is not None:
+                        _TXT_IO.append(p, [line])
+                        acct.txt_bytes += n
+                txt_journal_bytes += n
 
             async def _txt_writer():
-                written_sent_count = 0
+                committer = SentenceCommitter()
+                committer_rewrites_logged = 0
+                journal_enc = StableDeltaEncoder(ckpt_every=1 << 30)  # journal: checkpoint only at start / full rewrite
+                journal_seq = 0
+                journal_draft = ""      # live tail of the draft after journal_draft_base
+                journal_draft_base = 0
                 last_latest_write_ms = 0
                 last_draft_write_ms = 0
-                last_seen_full = ""
-                last_seen_draft = ""
+                last_draft_rewrite_ms = 0
+                last_seen_draft = ("", 0)
 
                 try:
                     while True:
@@ -1132,75 +1931,112 @@ async def handler(websocket):
                         t_ms = int(item.get("t_ms") or _now_ms())
 
                         if kind in {"stable", "final"}:
-                            full = _norm_spaces(item.get("full") or "")
-                            if not full:
+                            # stable/final snapshots are already space-normalized by the producer;
+                            # only the live tail travels, text before `base` is frozen in `transcript`
+                            live = item.get("live") or ""
+                            base = int(item.get("base") or 0)
+                            if not live:
                                 continue
-                            last_seen_full = full
-
-                            # limit latest length if configured
-                            latest_out = full
-                            if TXT_SAVE_MAX_CHARS_LATEST and TXT_SAVE_MAX_CHARS_LATEST > 0 and len(latest_out) > TXT_SAVE_MAX_CHARS_LATEST:
-                                latest_out = latest_out[-TXT_SAVE_MAX_CHARS_LATEST:]
 
-                            # rate-limit latest writes
+                            # journal: O(delta) append per stable
+                            if txt_journal_on:
+                                journal_enc.rebase(base, transcript.frozen)
+                                delta = journal_enc.update(live, prefix=transcript.frozen)
+                                if "full" in delta or delta["append"] or delta["off"] != delta["len"]:
+                                    journal_seq += 1
+                                    every = max(1, TXT_SAVE_JOURNAL_INDEX_EVERY)
+                                    _txt_journal_append(
+                                        txt_journal.stable_record(journal_seq, t_ms, delta),
+                                        index_seq=(journal_seq if (journal_seq - 1) % every == 0 else None),
+                                        t_ms=t_ms, length=int(delta["len"]),
+                                    )
+                                if kind == "final":
+                                    _txt_journal_append(txt_journal.final_record(t_ms))
+
+                            # rate-limit latest writes (journal mode: materialize once on session end)
                             nowm = _now_ms()
-                            do_latest = (nowm - last_latest_write_ms) >= max(0, int(TXT_SAVE_MIN_LATEST_INTERVAL_MS))
+                            if txt_rewrite_latest:
+                                do_latest = kind == "final" or _txt_rewrite_due(
+                                    last_latest_write_ms, nowm, TXT_SAVE_MIN_LATEST_INTERVAL_MS, base + len(live))
+                            else:
+                                do_latest = kind == "final" and TXT_SAVE_LATEST_ON_END
                             if do_latest:
                                 last_latest_write_ms = nowm
+                                # limit latest length if configured (the frozen prefix is only read back when needed)
+                                lim = TXT_SAVE_MAX_CHARS_LATEST if TXT_SAVE_MAX_CHARS_LATEST and TXT_SAVE_MAX_CHARS_LATEST > 0 else 0
+                                if lim and len(live) >= lim:
+                                    latest_out = live[-lim:]
+                                else:
+                                    latest_out = transcript.frozen(max(0, base + len(live) - lim) if lim else 0, base) + live
                                 for p in [txt_sess_latest, txt_cur_latest]:
                                     if p is not None:
-                                        await _txt_atomic_write(p, latest_out)
-
-                            # commit sentences: keep last tail uncommitted during streaming; flush on final
-                            sents, tail = split_sentences_and_tail(full)
-                            if kind == "final" and TXT_SAVE_FLUSH_TAIL_ON_END:
-                                target = len(sents)
-                            else:
-                                target = max(0, len(sents) - 1)
-
-                            if target > written_sent_count:
-                                new_sents = sents[written_sent_count:target]
-                                lines = []
-                                for s in new_sents:
-                                    s = (s or "").strip()
-                                    if not s:
-                                        continue
-                                    if TXT_SAVE_LINE_TS:
-                                        lines.append(f"{t_ms}\t{s}")
-                                    else:
-                                        lines.append(s)
-                                if lines:
-                                    for p in [txt_sess_feed, txt_cur_feed]:
-                                        if p is not None:
-                                            await _txt_append_lines(p, lines)
-                                written_sent_count = target
-
-                            # on final: also flush tail (even without punctuation) as a last line
-                            if kind == "final" and TXT_SAVE_FLUSH_TAIL_ON_END:
-                                tail_line = (tail or "").strip()
-                                if tail_line:
-                                    ln = f"{t_ms}\t{tail_line}" if TXT_SAVE_LINE_TS else tail_line
-                                    for p in [txt_sess_feed, txt_cur_feed]:
-                                        if p is not None:
-                                            await _txt_append_lines(p, [ln])
+                                        _txt_atomic_write(p, latest_out)
+
+                            # commit sentences: keep last sentence uncommitted during streaming; flush tail on final
+                            c_text, c_base = live, base
+                            if committer.off < base:
+                                # the last uncommitted sentence got frozen: read it back
+                                c_text, c_base = transcript.frozen(committer.off, base) + live, committer.off
+                            new_sents = committer.update(c_text, final=(kind == "final" and TXT_SAVE_FLUSH_TAIL_ON_END), base=c_base)
+                            if new_sents:
+                                lines = [f"{t_ms}\t{x}" for x in new_sents] if TXT_SAVE_LINE_TS else new_sents
+                                for p in [txt_sess_feed, txt_cur_feed]:
+                                    if p is not None:
+                                        _txt_append_lines(p, lines)
+                                if txt_archive_tag is not None:
+                                    _TXT_IO.call(_TXT_ARCHIVE.add_lines, txt_archive_tag, t_ms, new_sents)
+                            if committer.rewrites != committer_rewrites_logged:
+                                committer_rewrites_logged = committer.rewrites
+                                logger.debug("[%s] txt commit: rewrite before committed offset (n=%d lost_anchor=%d off=%d)",
+                                             sess_id, committer.rewrites, committer.lost_anchor, committer.off)
 
                         elif kind == "draft" and TXT_SAVE_DRAFT:
                             draft = _norm_spaces(item.get("text") or "")
+                            dbase = int(item.get("base") or 0)
                             if not draft:
                                 continue
-                            if draft == last_seen_draft:
+                            if (draft, dbase) == last_seen_draft:
                                 continue
                             nowm = _now_ms()
                             if (nowm - last_draft_write_ms) < max(0, int(TXT_SAVE_MIN_DRAFT_INTERVAL_MS)):
                                 continue
                             last_draft_write_ms = nowm
-                            last_seen_draft = draft
-                            for p in [txt_sess_draft, txt_cur_draft]:
-                                if p is not None:
-                                    await _txt_atomic_write(p, draft)
+                            last_seen_draft = (draft, dbase)
+                            if txt_journal_on:
+                                if dbase > journal_draft_base:
+                                    n = dbase - journal_draft_base
+                                    moved = transcript.frozen(journal_draft_base, dbase)
+                                    if journal_draft[:n] == moved:
+                                        journal_draft = journal_draft[n:]
+                                    else:
+                                        # journaled draft diverged from what got frozen: replace its tail
+                                        _txt_journal_append(txt_journal.patch_record(t_ms, len(journal_draft), moved))
+                                        journal_draft = ""
+                                    journal_draft_base = dbase
+                                d_del, d_ins, _ = _make_end_patch(journal_draft, draft)
+                                journal_draft = draft
+                                _txt_journal_append(txt_journal.patch_record(t_ms, d_del, d_ins))
+                            if txt_rewrite_latest and _txt_rewrite_due(last_draft_rewrite_ms, nowm, 0, dbase + len(draft)):
+                                last_draft_rewrite_ms = nowm
+                                for p in [txt_sess_draft, txt_cur_draft]:
+                                    if p is not None:
+                                        _txt_atomic_write(p, transcript.frozen(0, dbase) + draft)
 
                 except Exception as e:
                     logger.debug("[%s] txt_writer crashed: %r", sess_id, e)
+                finally:
+                    # release handles and make the session durable before the slot is freed
+                    for p in [txt_sess_feed, txt_cur_feed, txt_sess_journal, txt_sess_journal_idx, txt_cur_journal]:
+                        _TXT_IO.close(p)
+                    if txt_archive_tag is not None:
+                        _TXT_IO.call(_TXT_ARCHIVE.end_session, txt_archive_tag, _now_ms())
+                    try:
+                        await asyncio.wait_for(asyncio.wrap_future(_TXT_IO.barrier()), timeout=3.0)
+                    except Exception:
+                        pass
+                    # files are closed and durable: hand the dir to the compactor
+                    if _TXT_COMPACTOR is not None and txt_session_dir != TXT_SAVE_DIR:
+                        _TXT_COMPACTOR.release(sess_tag, txt_session_dir)
 
             txt_task = asyncio.create_task(_txt_writer())
 
@@ -1224,82 +2060,103 @@ async def handler(websocket):
         # ──────────────────────────────────────────────────────────────────────
         # Patch emitter (end-diff) + optional chunking
         # ──────────────────────────────────────────────────────────────────────
-        async def _emit_patch_insert_chunked(delete_chars: int, insert_text: str, seq: int, dbg: Optional[Dict[str, Any]] = None):
+        async def _emit_patch_insert_chunked(delete_chars: int, insert_text: str, seq: int, dbg: Optional[Dict[str, Any]] = None,
+                                             cap_ms: Optional[float] = None):
             """
             Send patch using end-diff semantics: delete N chars from end, then insert.
-            We optionally chunk insert_text into smaller pieces (micro delta) to smooth UI.
+            We optionally chunk insert_text into smaller pieces (micro delta) to smooth UI:
+              - "patch_batch" clients: ONE frame with slices=[[n_chars, at_ms], ...] (client-side reveal)
+              - legacy clients: one frame per slice
             """
-            t_ms = int(time.time() * 1000)
+            t_ms = int(_CLOCK.time() * 1000)
+            ext = {"cap_ms": cap_ms} if cap_ms is not None else {}
 
             if not insert_text:
                 if delete_chars:
-                    msg = {"type": "patch", "delete": int(delete_chars), "insert": "", "seq": int(seq), "t_ms": t_ms}
+                    msg = {"type": "patch", "delete": int(delete_chars), "insert": "", "seq": int(seq), "t_ms": t_ms, **ext}
                     if dbg:
                         msg["_dbg"] = dbg
                     await _ws_send(websocket, msg)
                 return
 
             if not UI_MICRO_DELTA_ENABLE:
-                msg = {"type": "patch", "delete": int(delete_chars), "insert": insert_text, "seq": int(seq), "t_ms": t_ms}
+                msg = {"type": "patch", "delete": int(delete_chars), "insert": insert_text, "seq": int(seq), "t_ms": t_ms, **ext}
                 if dbg:
                     msg["_dbg"] = dbg
                 await _ws_send(websocket, msg)
                 return
 
-            maxc = max(8, int(UI_MICRO_DELTA_MAX_CHARS))
-            minc = max(1, min(int(UI_MICRO_DELTA_MIN_SLICE_CHARS), maxc))
+            slices = _split_insert_slices(insert_text)
 
-            units = _token_units(insert_text)  # list[(emit, core)]
-            buf = []
-            cur_len = 0
-            first = True
-
-            for emit, _core in units:
-                l = len(emit)
-                if buf and (cur_len + l > maxc) and (cur_len >= minc):
-                    chunk = "".join(x[0] for x in buf)
-                    msg = {"type": "patch", "delete": int(delete_chars if first else 0), "insert": chunk, "seq": int(seq), "t_ms": t_ms}
-                    if dbg:
-                        msg["_dbg"] = dbg if first else {"cont": True}
-                    await _ws_send(websocket, msg)
-                    first = False
-                    buf = [(emit, _core)]
-                    cur_len = l
-                else:
-                    buf.append((emit, _core))
-                    cur_len += l
+            if "patch_batch" in session_caps:
+                msg = {"type": "patch", "delete": int(delete_chars), "insert": insert_text, "seq": int(seq), "t_ms": t_ms, **ext}
+                if len(slices) > 1:
+                    # spread the reveal inside one patch interval so it never lags behind the next patch
+                    step = max(0, int(UI_PATCH_BATCH_SLICE_MS))
+                    if patch_min_interval_ms > 0:
+                        step = min(step, patch_min_interval_ms // len(slices))
+                    msg["slices"] = [[len(x), i * step] for i, x in enumerate(slices)]
+                if dbg:
+                    msg["_dbg"] = dbg
+                await _ws_send(websocket, msg)
+                return
 
-            if buf:
-                chunk = "".join(x[0] for x in buf)
-                msg = {"type": "patch", "delete": int(delete_chars if first else 0), "insert": chunk, "seq": int(seq), "t_ms": t_ms}
+            first = True
+            for chunk in slices:
+                msg = {"type": "patch", "delete": int(delete_chars if first else 0), "insert": chunk, "seq": int(seq), "t_ms": t_ms, **ext}
                 if dbg:
                     msg["_dbg"] = dbg if first else {"cont": True}
                 await _ws_send(websocket, msg)
+                first = False
+
+        async def _send_timed(coro, t_cb: float, kind: str):
+            """Await a send scheduled from a recorder callback; record callback->send latency, counters, trace."""
+            await coro
+            t_sent = _CLOCK.monotonic()
+            latency.record("callback_send", (t_sent - t_cb) * 1000.0)
+            _METRICS.inc("patches_sent_total" if kind == "patch" else "stables_sent_total")
+            if _TRACE is not None:
+                _TRACE.delivered(sess_id, t_cb, t_sent, kind)
+
+        def _record_capture_recv(cap_ms: float):
+            srv_ms = clock.to_server_ms(cap_ms)
+            if srv_ms is not None:
+                latency.record("capture_recv", _CLOCK.time() * 1000.0 - srv_ms)
 
         def _patch_from_model_text(raw_text: str):
             """
             Called from RealtimeSTT thread.
             We stabilize raw_text -> shown_text, then do end-diff patch against last_emitted.
             """
-            nonlocal last_emitted, patch_seq, last_update_ts, last_patch_send_ms
-            nonlocal ui_e2e_last_ms, last_audio_enq_ts, ui_e2e_samples, fed_enq_watermark_ts, warming_until_ts
+            nonlocal last_emitted, patch_seq, last_update_ts, last_patch_send_ms, patch_skipped_backlog
+            nonlocal ui_e2e_last_ms, last_audio_enq_ts, fed_enq_watermark_ts, warming_until_ts
             nonlocal _draft_last_push_ms, _draft_last_text
 
-            if time.monotonic() < warming_until_ts:
+            if _CLOCK.monotonic() < warming_until_ts:
                 return
 
-            raw = _norm_spaces(raw_text or "")
-            if not raw:
+            if not (raw_text or "").strip():
                 return
 
-            # e2e sample for debug
+            # e2e (last value, for debug) + feed->callback histogram
+            t_cb = _CLOCK.monotonic()
             _ref_ts = fed_enq_watermark_ts if fed_enq_watermark_ts is not None else last_audio_enq_ts
             if _ref_ts is not None:
-                ui_e2e_last_ms = (time.monotonic() - _ref_ts) * 1000.0
-                if 0.0 < ui_e2e_last_ms < 3000.0:
-                    ui_e2e_samples.append(ui_e2e_last_ms)
+                ui_e2e_last_ms = (t_cb - _ref_ts) * 1000.0
+            if fed_last_ts is not None:
+                latency.record("feed_callback", (t_cb - fed_last_ts) * 1000.0)
 
             with patch_lock:
+                # only the live tail is normalized / compared (older text is frozen in `transcript`)
+                misses = transcript.mismatches
+                raw = transcript.live_of(raw_text, "update")
+                if transcript.mismatches != misses:
+                    logger.warning("[%s] realtime text restarted after %d frozen chars -> new live tail",
+                                   sess_id, transcript.base)
+                if not raw:
+                    return
+                live_base = transcript.base
+
                 # Stabilize
                 if STAB_ENABLE:
                     dec = stabilizer.update(raw)
@@ -1311,15 +2168,18 @@ async def handler(websocket):
                 if shown == last_emitted:
                     return
 
-                # rate limit patch output
+                # rate limit patch output (congested link: skip, next patch carries the full end-diff)
                 now_ms = _now_ms()
-                if patch_min_interval_ms > 0 and (now_ms - last_patch_send_ms) < patch_min_interval_ms:
+                congested = patch_rate is not None and patch_rate.congested()
+                if congested:
+                    patch_skipped_backlog += 1
+                if congested or (patch_min_interval_ms > 0 and (now_ms - last_patch_send_ms) < patch_min_interval_ms):
                     # still allow optional draft saving (throttled separately)
                     if txt_enable and TXT_SAVE_DRAFT:
                         if (now_ms - _draft_last_push_ms) >= max(0, int(TXT_SAVE_MIN_DRAFT_INTERVAL_MS)) and shown != _draft_last_text:
                             _draft_last_push_ms = now_ms
                             _draft_last_text = shown
-                            _txt_enqueue_from_thread({"kind":"draft","text":shown,"t_ms":now_ms})
+                            _txt_enqueue_from_thread({"kind":"draft","text":shown,"base":live_base,"t_ms":now_ms})
                     return
 
                 # compute end-diff
@@ -1338,10 +2198,10 @@ async def handler(websocket):
                     if (now_ms - _draft_last_push_ms) >= max(0, int(TXT_SAVE_MIN_DRAFT_INTERVAL_MS)) and shown != _draft_last_text:
                         _draft_last_push_ms = now_ms
                         _draft_last_text = shown
-                        _txt_enqueue_from_thread({"kind":"draft","text":shown,"t_ms":now_ms})
+                        _txt_enqueue_from_thread({"kind":"draft","text":shown,"base":live_base,"t_ms":now_ms})
 
             # tracing outside lock
-            now_ts = time.monotonic()
+            now_ts = _CLOCK.monotonic()
             dt_ms = (now_ts - last_update_ts) * 1000.0
             last_update_ts = now_ts
 
@@ -1359,14 +2219,15 @@ async def handler(websocket):
                 "action": dec.action,
                 "rollback": int(dec.rollback_chars),
                 "lcp": int(lcp),
-                "raw_len": int(len(dec.raw)),
-                "shown_len": int(len(shown)),
+                "raw_len": int(live_base + len(dec.raw)),
+                "shown_len": int(live_base + len(shown)),
                 "del": int(delete_chars),
                 "ins_len": int(len(insert_text)),
                 "pending_n": int(dec.pending_count),
             }
 
-            _submit(_emit_patch_insert_chunked(int(delete_chars), insert_text, int(seq), dbg))
+            cap = fed_cap_ms if "ts1" in session_caps else None
+            _submit(_send_timed(_emit_patch_insert_chunked(int(delete_chars), insert_text, int(seq), dbg, cap), t_cb, "patch"))
 
         # Callbacks (called from RealtimeSTT threads!)
         def _on_update_cb(text: str):
@@ -1375,43 +2236,78 @@ async def handler(websocket):
         def _on_stable_cb(text: str):
             nonlocal stable_snapshot, warming_until_ts, stable_seq, last_emitted, last_patch_send_ms
 
-            if time.monotonic() < warming_until_ts:
+            if _CLOCK.monotonic() < warming_until_ts:
                 return
-            t = _norm_spaces(text or "")
-            if not t:
+            if not (text or "").strip():
                 return
 
-            # stable should be monotonic
-            if len(t) >= len(stable_snapshot):
-                stable_snapshot = t
+            t_cb = _CLOCK.monotonic()
+            t_ms = int(_CLOCK.time() * 1000)
+            msg = {"type": "stable", "t_ms": t_ms}
+            with patch_lock:
+                misses = transcript.mismatches
+                t = transcript.live_of(text, "stable")
+                if transcript.mismatches != misses:
+                    logger.warning("[%s] stable text restarted after %d frozen chars -> new live tail",
+                                   sess_id, transcript.base)
+                if not t:
+                    return
 
-            stable_seq += 1
-            t_ms = int(time.time() * 1000)
+                # stable should be monotonic
+                if len(t) >= len(stable_snapshot):
+                    stable_snapshot = t
 
-            # Reset stabilizer to stable snapshot, and also sync last_emitted (avoid extra jumps)
-            with patch_lock:
-                stabilizer.reset(stable_snapshot)
-                last_emitted = stable_snapshot
+                # long session: freeze the head of the live tail (bounded hot strings)
+                cut = transcript.freeze(stable_snapshot)
+                if cut:
+                    stable_snapshot = stable_snapshot[cut:]
+                live_base = transcript.base
+                snap = stable_snapshot
+
+                stable_seq += 1
+                msg["seq"] = int(stable_seq)
+
+                # Reset stabilizer to stable snapshot, and also sync last_emitted (avoid extra jumps)
+                stabilizer.reset(snap)
+                last_emitted = snap
                 last_patch_send_ms = _now_ms()
 
-            if TRACE_PATCH and (stable_seq % max(1, TRACE_PATCH_EVERY) == 0):
-                logger.info("[%s] STABLE#%d len=%d tail=%r", sess_id, stable_seq, len(stable_snapshot), stable_snapshot[-TRACE_PATCH_MAX_TAIL:])
+                if "stable_delta" in session_caps:
+                    stable_enc.rebase(live_base, transcript.frozen)
+                    msg.update(stable_enc.update(snap, prefix=transcript.frozen))
+
+            if TRACE_PATCH and (msg["seq"] % max(1, TRACE_PATCH_EVERY) == 0):
+                logger.info("[%s] STABLE#%d len=%d tail=%r", sess_id, msg["seq"], live_base + len(snap), snap[-TRACE_PATCH_MAX_TAIL:])
 
             # enqueue stable snapshot for txt saving (thread-safe)
             if txt_enable:
-                _txt_enqueue_from_thread({"kind":"stable","full":stable_snapshot,"t_ms":t_ms})
+                _txt_enqueue_from_thread({"kind":"stable","live":snap,"base":live_base,"t_ms":t_ms})
+
+            if "stable_delta" not in session_caps:
+                # legacy clients: the whole transcript on every stable (O(n) on the wire anyway; the
+                # extension negotiates stable_delta, which only reads frozen text for checkpoints)
+                msg["full"] = transcript.full_text(snap)
+            if "ts1" in session_caps and fed_cap_ms is not None:
+                msg["cap_ms"] = fed_cap_ms
+            _submit(_send_timed(_ws_send(websocket, msg, binary=wire_codec.WIRE_FORMAT in session_caps), t_cb, "stable"))
+
+        async def _send_stable_checkpoint():
+            """Client asked for a resync: send a full checkpoint of the current stable text now."""
+            nonlocal stable_seq
+            with patch_lock:
+                stable_enc.request_checkpoint()
+                stable_enc.rebase(transcript.base, transcript.frozen)
+                stable_seq += 1
+                msg = {"type": "stable", "seq": int(stable_seq), "t_ms": _now_ms()}
+                msg.update(stable_enc.update(stable_snapshot, prefix=transcript.frozen))
+            await _ws_send(websocket, msg, binary=wire_codec.WIRE_FORMAT in session_caps)
 
-            _submit(_ws_send(websocket, {
-                "type": "stable",
-                "full": stable_snapshot,
-                "seq": int(stable_seq),
-                "t_ms": t_ms,
-            }))
+        recorder_cls: Any = None
 
-        def _make_recorder(ct: str) -> AudioToTextRecorder:
+        def _make_recorder(ct: str):
             logger.info("[%s] init recorder: model=%s device=%s compute_type=%s lang=%s",
                         sess_id, STT_MODEL, STT_DEVICE, ct, STT_LANGUAGE)
-            return AudioToTextRecorder(
+            return recorder_cls(
                 use_microphone=False,
                 device=STT_DEVICE,
                 model=STT_MODEL,
@@ -1431,7 +2327,14 @@ async def handler(websocket):
         # ──────────────────────────────────────────────────────────────────────
         # Init recorder
         # ──────────────────────────────────────────────────────────────────────
+        _METRICS.inc("recorder_inits_total")
         try:
+            cls_fut = _ensure_warmup()
+            if not cls_fut.done():
+                logger.info("[%s] waiting for recorder import (start-up warm-up)", sess_id)
+                await asyncio.wrap_future(cls_fut)
+            recorder_cls = cls_fut.result()
+            t_init = _CLOCK.monotonic()
             try:
                 recorder = _make_recorder(STT_COMPUTE_TYPE)
             except ValueError as e:
@@ -1442,6 +2345,11 @@ async def handler(websocket):
             if hasattr(recorder, "start"):
                 recorder.start()
                 logger.info("[%s] recorder.start OK", sess_id)
+            init_sec = _CLOCK.monotonic() - t_init
+            if not session_acct.time_inference(recorder, acct):
+                logger.debug("[%s] recorder has no realtime model to time; inference_sec stays 0", sess_id)
+            _METRICS.inc("recorder_init_seconds_total", init_sec)
+            _METRICS.set("recorder_init_seconds_last", round(init_sec, 4))
 
             if WARMUP_SILENCE_SEC > 0:
                 logger.info("[%s] warmup silence %.3fs", sess_id, WARMUP_SILENCE_SEC)
@@ -1454,6 +2362,7 @@ async def handler(websocket):
 
         except Exception as e:
             logger.error("[%s] INIT FAILED: %r\n%s", sess_id, e, traceback.format_exc())
+            _METRICS.inc("recorder_init_failures_total")
             await _ws_send(websocket, {"type": "error", "error": f"Init lỗi: {e}", "code":"INIT_FAILED"})
             await websocket.close(code=1011, reason="init failed")
             return
@@ -1476,15 +2385,30 @@ async def handler(websocket):
         # Float buffer + segment timestamps for e2e watermark
         bufq: deque = deque()
         buf_samples: int = 0
-        pending_segments = deque()  # each: [nsamp, enq_ts]
+        pending_segments = deque()  # each: [nsamp, enq_ts, trace_id, append_ts, capture_ms]
+
+        def _retained() -> Dict[str, Any]:
+            return {
+                "queue_items": queue.qsize(),
+                "queue_bytes": int(queue_bytes_total),
+                "buf_chunks": len(bufq),
+                "buf_samples": int(buf_samples),
+                "pending_segments": len(pending_segments),
+                "live_chars": len(stable_snapshot) + len(last_emitted),
+                "transcript": transcript.stats(),
+                "txt_queue": txt_q.qsize() if txt_q is not None else 0,
+            }
 
-        def _bufq_append(arr: np.ndarray, enq_ts: float):
+        _MEMDIAG.track(sess_id, _retained)
+
+        def _bufq_append(arr: np.ndarray, enq_ts: float, tid: int = 0, t_app: float = 0.0,
+                         cap_ms: Optional[float] = None):
             nonlocal buf_samples
             if arr.size == 0:
                 return
             bufq.append(arr)
             buf_samples += int(arr.size)
-            pending_segments.append([int(arr.size), float(enq_ts)])
+            pending_segments.append([int(arr.size), float(enq_ts), tid, t_app, cap_ms])
 
         def _bufq_available() -> int:
             return buf_samples
@@ -1508,22 +2432,42 @@ async def handler(websocket):
                 buf_samples -= take
             return out
 
-        def _consume_segments(samples_to_consume: int):
-            nonlocal fed_enq_watermark_ts
+        def _consume_segments(samples_to_consume: int, fed: bool = True, t_feed: float = 0.0):
+            """
+            fed=False: samples were dropped (buffer trim), not given to the recorder.
+            t_feed: when the recorder.feed_audio() call for these samples started (traced chunks only).
+            """
+            nonlocal fed_enq_watermark_ts, fed_last_ts, fed_cap_ms
             remain = int(max(0, samples_to_consume))
             last_ts = None
+            now = _CLOCK.monotonic()
             while remain > 0 and pending_segments:
-                seg_len, seg_ts = pending_segments[0]
+                seg_len, seg_ts, seg_tid, seg_app, seg_cap = pending_segments[0]
                 if seg_len <= remain:
                     remain -= seg_len
                     last_ts = seg_ts
                     pending_segments.popleft()
+                    if fed:
+                        # one sample per received chunk: enqueue -> its last sample fed
+                        latency.record("enqueue_feed", (now - seg_ts) * 1000.0)
+                        if seg_cap is not None:
+                            fed_cap_ms = seg_cap
+                    if seg_tid and _TRACE is not None:
+                        if fed:
+                            _TRACE.span(sess_id, seg_tid, "buffer", seg_app, t_feed or now)
+                            if t_feed:
+                                _TRACE.span(sess_id, seg_tid, "feed_audio", t_feed, now)
+                            _TRACE.fed(sess_id, seg_tid, now)
+                        else:
+                            _TRACE.span(sess_id, seg_tid, "dropped", seg_app, now)
                 else:
                     pending_segments[0][0] = seg_len - remain
                     last_ts = seg_ts
                     remain = 0
             if last_ts is not None:
                 fed_enq_watermark_ts = last_ts
+                if fed:
+                    fed_last_ts = now
 
         def _buf_ms_now() -> float:
             return (_bufq_available() / float(TGT_SR)) * 1000.0
@@ -1536,6 +2480,9 @@ async def handler(websocket):
             if cur <= target_samples:
                 return
             drop = cur - target_samples
+            _METRICS.inc("buffer_trims_total")
+            _METRICS.inc("buffer_trimmed_seconds_total", drop / float(TGT_SR))
+            acct.dropped_trim_sec += drop / float(TGT_SR)
             while drop > 0 and bufq:
                 head = bufq[0]
                 take = min(drop, head.size)
@@ -1545,15 +2492,41 @@ async def handler(websocket):
                     bufq[0] = head[take:]
                 drop -= take
                 buf_samples -= take
-                _consume_segments(take)
+                _consume_segments(take, fed=False)
+
+        # constant part of status (legacy clients get it merged into every status; "status_delta" clients read hello)
+        status_const = {
+            "device": STT_DEVICE,
+            "gpu_name": GPU_NAME,
+            "ct2_cuda_device_count": int(_CT2_CUDA_COUNT),
+            "qbytes_cap": int(QBYTES_HARD_CAP),
+            "force_realtime_pace": bool(FORCE_REALTIME_PACE),
+            "max_buf_ms": float(MAX_BUF_MS),
+            "drop_buf_to_ms": float(DROP_BUF_TO_MS),
+            "stabilizer": {
+                "enable": bool(STAB_ENABLE),
+                "patch_max_hz": float(PATCH_MAX_HZ),
+                "rewrite_confirm_n": int(REWRITE_CONFIRM_N),
+                "max_rollback_chars": int(MAX_ROLLBACK_CHARS),
+                "min_rewrite_interval_ms": int(MIN_REWRITE_INTERVAL_MS),
+                "ignore_shrink": bool(IGNORE_SHRINK),
+            },
+            "txt_save": {
+                "enable": bool(txt_enable),
+                "dir": str(TXT_SAVE_DIR),
+                "write_current": bool(TXT_SAVE_WRITE_CURRENT),
+                "draft": bool(TXT_SAVE_DRAFT),
+            },
+        }
 
         # Feed worker (real-time pacing)
         async def feed_worker():
             nonlocal queue_bytes_total, qbytes_max, items_processed, frames_fed_total
 
             pacer = _RealTimePacer(TGT_SR)
-            last_log_t = time.monotonic()
-            last_status_t = time.monotonic()
+            last_log_t = _CLOCK.monotonic()
+            last_status_t = _CLOCK.monotonic()
+            status_last_sent: Dict[str, Any] = {}
 
             try:
                 while True:
@@ -1562,9 +2535,12 @@ async def handler(websocket):
                         hop = FRAME_SAMPLES_BASE
                         while _bufq_available() >= hop:
                             frame = _bufq_consume_samples(hop)
+                            t_feed = _CLOCK.monotonic() if _TRACE is not None else 0.0
                             recorder.feed_audio(_f32_to_bytes_i16(frame))
-                            _consume_segments(hop)
+                            _consume_segments(hop, t_feed=t_feed)
                             frames_fed_total += 1
+                            _METRICS.inc("frames_fed_total")
+                            acct.audio_fed_sec += hop / float(TGT_SR)
                             await pacer.sleep_for_samples(hop)
 
                         tail = np.zeros(int(TAIL_SILENCE_SEC * TGT_SR), dtype=np.float32)
@@ -1573,6 +2549,7 @@ async def handler(websocket):
                             frame = tail[t0:t0+hop]
                             recorder.feed_audio(_f32_to_bytes_i16(frame))
                             frames_fed_total += 1
+                            _METRICS.inc("frames_fed_total")
                             await pacer.sleep_for_samples(hop)
                             t0 += hop
 
@@ -1580,7 +2557,12 @@ async def handler(websocket):
                         break
 
                     nbytes_item = int(item.get("nbytes", 0))
-                    enq_ts = float(item.get("enq_ts", time.monotonic()))
+                    enq_ts = float(item.get("enq_ts", _CLOCK.monotonic()))
+                    tid = item.get("tid", 0)
+                    cap_ms = item.get("cap_ms")
+                    if tid and _TRACE is not None:
+                        t_deq = _CLOCK.monotonic()
+                        _TRACE.span(sess_id, tid, "queue", enq_ts, t_deq)
                     if nbytes_item > 0:
                         queue_bytes_total = max(0, queue_bytes_total - nbytes_item)
                     qbytes_max = max(qbytes_max, queue_bytes_total)
@@ -1596,9 +2578,14 @@ async def handler(websocket):
                     else:
                         f32_src = np.empty(0, dtype=np.float32)
 
+                    acct.audio_in_sec += f32_src.size / float(max(1, sr))
                     f32_16k = _resample_to_16k(f32_src, sr) if f32_src.size else f32_src
+                    t_app = 0.0
+                    if tid and _TRACE is not None:
+                        t_app = _CLOCK.monotonic()
+                        _TRACE.span(sess_id, tid, "decode", t_deq, t_app)
                     if f32_16k.size:
-                        _bufq_append(f32_16k, enq_ts)
+                        _bufq_append(f32_16k, enq_ts, tid, t_app, cap_ms)
 
                     if MAX_BUF_MS > 0 and _buf_ms_now() > MAX_BUF_MS:
                         _buf_drop_oldest_to_ms(DROP_BUF_TO_MS)
@@ -1606,9 +2593,12 @@ async def handler(websocket):
                     hop = FRAME_SAMPLES_BASE
                     while _bufq_available() >= hop:
                         frame = _bufq_consume_samples(hop)
+                        t_feed = _CLOCK.monotonic() if _TRACE is not None else 0.0
                         recorder.feed_audio(_f32_to_bytes_i16(frame))
-                        _consume_segments(hop)
+                        _consume_segments(hop, t_feed=t_feed)
                         frames_fed_total += 1
+                        _METRICS.inc("frames_fed_total")
+                        acct.audio_fed_sec += hop / float(TGT_SR)
 
                         await pacer.sleep_for_samples(hop)
 
@@ -1617,52 +2607,40 @@ async def handler(websocket):
 
                     items_processed += 1
 
-                    now_m = time.monotonic()
+                    now_m = _CLOCK.monotonic()
                     if now_m - last_log_t >= LOG_STATUS_EVERY:
                         logger.info("[%s] feed: q=%d bytes=%s buf_ms=%.1f frames=%d ui_e2e=%.1f",
                                     sess_id, queue.qsize(), _human_bytes(queue_bytes_total),
                                     _buf_ms_now(), frames_fed_total, ui_e2e_last_ms)
                         last_log_t = now_m
 
-                    if now_m - last_status_t >= float(os.getenv("STATUS_INTERVAL_SEC", "0.5")):
-                        rss_mb = (_PROC.memory_info().rss / (1024.0*1024.0)) if _PROC else None
-                        nvml_pair = _nvml_mem_mb()
-
+                    if now_m - last_status_t >= STATUS_INTERVAL_SEC:
                         detail = {
-                            "device": STT_DEVICE,
-                            "gpu_name": GPU_NAME,
-                            "ct2_cuda_device_count": int(_CT2_CUDA_COUNT),
                             "frames_total": int(frames_fed_total),
                             "queue": int(queue.qsize()),
                             "bytes_in_queue": int(queue_bytes_total),
-                            "qbytes_cap": int(QBYTES_HARD_CAP),
                             "qbytes_max": int(qbytes_max),
                             "buf_ms": float(round(_buf_ms_now(), 2)),
                             "ui_e2e_ms_last": float(round(ui_e2e_last_ms, 3)),
-                            "force_realtime_pace": bool(FORCE_REALTIME_PACE),
-                            "max_buf_ms": float(MAX_BUF_MS),
-                            "drop_buf_to_ms": float(DROP_BUF_TO_MS),
-                            "stabilizer": {
-                                "enable": bool(STAB_ENABLE),
-                                "patch_max_hz": float(PATCH_MAX_HZ),
-                                "rewrite_confirm_n": int(REWRITE_CONFIRM_N),
-                                "max_rollback_chars": int(MAX_ROLLBACK_CHARS),
-                                "min_rewrite_interval_ms": int(MIN_REWRITE_INTERVAL_MS),
-                                "ignore_shrink": bool(IGNORE_SHRINK),
-                            },
-                            "txt_save": {
-                                "enable": bool(txt_enable),
-                                "dir": str(TXT_SAVE_DIR),
-                                "write_current": bool(TXT_SAVE_WRITE_CURRENT),
-                                "draft": bool(TXT_SAVE_DRAFT),
-                            }
+                            "latency": latency.summary(),
+                            **({"clock": clock.snapshot()} if "ts1" in session_caps else {}),
+                            "link": (dict(patch_rate.snapshot(), skipped_backlog=int(patch_skipped_backlog))
+                                     if patch_rate is not None else
+                                     {"adaptive": False, "patch_interval_ms": int(patch_min_interval_ms)}),
                         }
-                        if rss_mb is not None:
-                            detail["rss_mb"] = float(rss_mb)
-                        if nvml_pair is not None:
-                            detail["gpu_nvml_mb"] = {"used": nvml_pair[0], "total": nvml_pair[1]}
-
-                        await _ws_send(websocket, {"type": "status", "stage": "FEED", "detail": detail})
+                        detail.update(_TELEMETRY.snapshot)
+
+                        if "status_delta" in session_caps:
+                            # constant config went out in hello; only changed fields here
+                            changed = _status_delta(status_last_sent, detail)
+                            status_last_sent = detail
+                            if changed:
+                                changed["delta"] = True
+                                await _ws_send(websocket, {"type": "status", "stage": "FEED", "detail": changed})
+                        else:
+                            full = dict(status_const)
+                            full.update(detail)
+                            await _ws_send(websocket, {"type": "status", "stage": "FEED", "detail": full})
                         last_status_t = now_m
 
             except Exception as e:
@@ -1670,6 +2648,42 @@ async def handler(websocket):
 
         worker_task = asyncio.create_task(feed_worker())
 
+        # Link monitor: RTT via ping/pong + transport backlog -> per-connection patch interval
+        async def _link_monitor():
+            nonlocal patch_min_interval_ms
+            ping_task: Optional[asyncio.Task] = None
+            last_probe_t = 0.0
+
+            async def _probe_rtt():
+                t0 = _CLOCK.perf_counter()
+                try:
+                    waiter = await websocket.ping()
+                    await asyncio.wait_for(waiter, timeout=max(1.0, PATCH_RTT_PROBE_SEC * 4))
+                    patch_rate.on_rtt((_CLOCK.perf_counter() - t0) * 1000.0)
+                except asyncio.TimeoutError:
+                    # no pong in time: treat as a (very) slow link
+                    patch_rate.on_rtt((_CLOCK.perf_counter() - t0) * 1000.0)
+                except Exception:
+                    pass
+
+            try:
+                while True:
+                    now_m = _CLOCK.monotonic()
+                    if (ping_task is None or ping_task.done()) and (now_m - last_probe_t) >= PATCH_RTT_PROBE_SEC:
+                        last_probe_t = now_m
+                        ping_task = asyncio.create_task(_probe_rtt())
+                    patch_min_interval_ms = patch_rate.on_backlog(_ws_write_backlog(websocket))
+                    await asyncio.sleep(max(0.02, PATCH_LINK_SAMPLE_SEC))
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.debug("[%s] link_monitor crashed: %r", sess_id, e)
+            finally:
+                if ping_task is not None and not ping_task.done():
+                    ping_task.cancel()
+
+        link_task: Optional[asyncio.Task] = asyncio.create_task(_link_monitor()) if patch_rate is not None else None
+
         # hello
         await _ws_send(websocket, {
             "type": "hello",
@@ -1692,10 +2706,16 @@ async def handler(websocket):
                 "max_buf_ms": float(MAX_BUF_MS),
                 "drop_buf_to_ms": float(DROP_BUF_TO_MS),
                 "idle_timeout_sec": float(IDLE_TIMEOUT_SEC),
+                "status_interval_sec": float(STATUS_INTERVAL_SEC),
                 "auth_required": bool(REQUIRE_AUTH),
+                "caps": _server_caps(),
+                "wire": wire_codec.dictionary() if WIRE_BIN_ENABLE else None,
                 "stabilizer": {
                     "enable": bool(STAB_ENABLE),
                     "patch_max_hz": float(PATCH_MAX_HZ),
+                    "patch_adaptive": bool(PATCH_ADAPTIVE),
+                    "patch_adapt_min_hz": float(PATCH_ADAPT_MIN_HZ),
+                    "patch_adapt_max_hz": float(PATCH_ADAPT_MAX_HZ),
                     "rewrite_confirm_n": int(REWRITE_CONFIRM_N),
                     "max_rollback_chars": int(MAX_ROLLBACK_CHARS),
                     "min_rewrite_interval_ms": int(MIN_REWRITE_INTERVAL_MS),
@@ -1710,6 +2730,10 @@ async def handler(websocket):
                     "draft": bool(TXT_SAVE_DRAFT),
                     "line_ts": bool(TXT_SAVE_LINE_TS),
                     "flush_tail_on_end": bool(TXT_SAVE_FLUSH_TAIL_ON_END),
+                    "durability": _TXT_IO.durability,
+                    "latest_mode": TXT_SAVE_LATEST_MODE,
+                    "archive_index": _TXT_ARCHIVE is not None,
+                    "compact": _TXT_COMPACTOR.codec if _TXT_COMPACTOR is not None else None,
                 }
             }
         })
@@ -1723,6 +2747,8 @@ async def handler(websocket):
             try:
                 while queue_bytes_total >= cap and not queue.empty():
                     old = queue.get_nowait()
+                    _METRICS.inc("queue_drops_total")
+                    acct.dropped_queue_sec += _queued_item_sec(old)
                     if isinstance(old, dict):
                         queue_bytes_total = max(0, queue_bytes_total - int(old.get("nbytes", 0)))
             except Exception:
@@ -1736,6 +2762,14 @@ async def handler(websocket):
                     # IMPORTANT: idle timeout so single-user slot is released
                     msg = await asyncio.wait_for(websocket.recv(), timeout=IDLE_TIMEOUT_SEC)
                     ws_recv_count += 1
+                    _METRICS.inc("ws_messages_received_total")
+                    n_in = len(msg) if isinstance(msg, (bytes, bytearray)) else _utf8_len(msg)
+                    _METRICS.inc("ws_bytes_received_total", n_in)
+                    acct.msgs_in += 1
+                    acct.bytes_in += n_in
+                    if capture is not None:
+                        capture.inbound(msg)
+                    t_recv = _CLOCK.monotonic() if _TRACE is not None else 0.0
                 except asyncio.TimeoutError:
                     logger.info("[%s] idle-timeout (%ss) -> close", sess_id, IDLE_TIMEOUT_SEC)
                     await _ws_send(websocket, {"type":"error","error":"Hết thời gian chờ (idle)","code":"IDLE_TIMEOUT"})
@@ -1765,6 +2799,11 @@ async def handler(websocket):
                             continue
 
                     raw = bytes(msg)
+                    cap_ms = None
+                    if "ts1" in session_caps and raw[:4] == TS1_MAGIC and len(raw) >= 12:
+                        cap_ms = _F64_LE.unpack_from(raw, 4)[0]
+                        raw = raw[12:]
+                        _record_capture_recv(cap_ms)
 
                     if raw and (items_enqueued % max(1, LOG_AUDIO_EVERY_N) == 0):
                         logger.debug("[%s] binary audio len=%d q=%d bytes_in_q=%s",
@@ -1773,17 +2812,21 @@ async def handler(websocket):
                     if DROP_OLDEST_ON_FULL and queue.qsize() >= DROP_GUARD_Q:
                         try:
                             old = queue.get_nowait()
+                            _METRICS.inc("queue_drops_total")
+                            acct.dropped_queue_sec += _queued_item_sec(old)
                             if isinstance(old, dict):
                                 queue_bytes_total = max(0, queue_bytes_total - int(old.get("nbytes", 0)))
                         except Exception:
                             pass
 
                     nbytes = len(raw)
+                    enq_ts = _CLOCK.monotonic()
                     await queue.put({
                         "kind":"audio","buf":raw,"sr":session_src_sr,"dtype":session_force_dtype,
-                        "nbytes": nbytes, "enq_ts": time.monotonic()
+                        "nbytes": nbytes, "enq_ts": enq_ts, "cap_ms": cap_ms,
+                        "tid": _TRACE.begin(sess_id, t_recv or enq_ts, enq_ts) if _TRACE is not None else 0,
                     })
-                    last_audio_enq_ts = time.monotonic()
+                    last_audio_enq_ts = _CLOCK.monotonic()
                     queue_bytes_total += nbytes
 
                     if QBYTES_HARD_CAP > 0 and queue_bytes_total >= QBYTES_HARD_CAP:
@@ -1803,6 +2846,14 @@ async def handler(websocket):
 
                     event = (obj.get("event") or "").lower().strip()
 
+                    if event in {"hello", "start"} and "caps" in obj:
+                        session_caps = _parse_caps(obj.get("caps")) & set(_server_caps())
+                        logger.info("[%s] caps negotiated: %s", sess_id, sorted(session_caps) or "-")
+
+                    if event == "hello":
+                        await _ws_send(websocket, {"type":"ack","detail":{"caps": sorted(session_caps)}})
+                        continue
+
                     if event == "start":
                         if "sample_rate" in obj:
                             session_src_sr = int(obj["sample_rate"])
@@ -1813,11 +2864,35 @@ async def handler(websocket):
                         await _ws_send(websocket, {"type":"ack","detail":{
                             "src_sr": session_src_sr,
                             "dtype": session_force_dtype or "auto",
-                            "auto_started": False
+                            "auto_started": False,
+                            "caps": sorted(session_caps),
                         }})
                         logger.info("[%s] start event | sr=%d dtype=%s", sess_id, session_src_sr, session_force_dtype or "auto")
                         continue
 
+                    if event == "ping" and "ts1" in session_caps:
+                        t1 = _CLOCK.time() * 1000.0
+                        last = obj.get("last")
+                        if isinstance(last, list) and len(last) == 4 and all(isinstance(x, (int, float)) for x in last):
+                            clock.add(*last)
+                        for pair in (obj.get("disp") or [])[:256]:
+                            if isinstance(pair, list) and len(pair) == 2 and all(isinstance(x, (int, float)) for x in pair):
+                                # both stamps are client clock: no offset needed
+                                latency.record("capture_display", pair[1] - pair[0])
+                        await _ws_send(websocket, {"type": "pong", "t0": obj.get("t0"), "t1": t1,
+                                                   "t2": _CLOCK.time() * 1000.0})
+                        continue
+
+                    if event == "latency_reset":
+                        latency.reset(window_only=True)
+                        continue
+
+                    if event == "resync":
+                        logger.info("[%s] stable resync requested", sess_id)
+                        if "stable_delta" in session_caps:
+                            await _send_stable_checkpoint()
+                        continue
+
                     if event in {"stop","eos","end"}:
                         logger.info("[%s] stop event=%s", sess_id, event)
                         break
@@ -1837,6 +2912,11 @@ async def handler(websocket):
 
                         try:
                             raw = base64.b64decode(obj["audio"])
+                            cap_ms = obj.get("cap_ms") if "ts1" in session_caps else None
+                            if isinstance(cap_ms, (int, float)):
+                                _record_capture_recv(float(cap_ms))
+                            else:
+                                cap_ms = None
                             sr = int(obj.get("sr", session_src_sr))
                             dt = obj.get("dtype", session_force_dtype)
                             dt = (dt.lower() if isinstance(dt, str) else None)
@@ -1848,18 +2928,22 @@ async def handler(websocket):
                             if DROP_OLDEST_ON_FULL and queue.qsize() >= DROP_GUARD_Q:
                                 try:
                                     old = queue.get_nowait()
+                                    _METRICS.inc("queue_drops_total")
+                                    acct.dropped_queue_sec += _queued_item_sec(old)
                                     if isinstance(old, dict):
                                         queue_bytes_total = max(0, queue_bytes_total - int(old.get("nbytes", 0)))
                                 except Exception:
                                     pass
 
                             nbytes = len(raw)
+                            enq_ts = _CLOCK.monotonic()
                             await queue.put({
                                 "kind":"audio","buf":raw,"sr":sr,
                                 "dtype": (dt if dt in {"i16","f32"} else None),
-                                "nbytes": nbytes, "enq_ts": time.monotonic()
+                                "nbytes": nbytes, "enq_ts": enq_ts, "cap_ms": cap_ms,
+                                "tid": _TRACE.begin(sess_id, t_recv or enq_ts, enq_ts) if _TRACE is not None else 0,
                             })
-                            last_audio_enq_ts = time.monotonic()
+                            last_audio_enq_ts = _CLOCK.monotonic()
                             queue_bytes_total += nbytes
 
                             if QBYTES_HARD_CAP > 0 and queue_bytes_total >= QBYTES_HARD_CAP:
@@ -1874,16 +2958,24 @@ async def handler(websocket):
 
         finally:
             logger.info("[%s] closing session...", sess_id)
+            if transcript.freezes:
+                logger.info("[%s] transcript: %s", sess_id, transcript.stats())
+            logger.info("[%s] latency (session): %s", sess_id, latency.summary(window=False))
+            if _TRACE is not None:
+                _TRACE.end_lane(sess_id)
 
             # Flush TXT files (final tail) BEFORE stopping writer
             if txt_enable and txt_q is not None:
                 final_text = stable_snapshot or last_emitted
                 if final_text:
                     try:
-                        await txt_q.put({"kind":"final","full":final_text,"t_ms":_now_ms()})
+                        await txt_q.put({"kind":"final","live":final_text,"base":transcript.base,"t_ms":_now_ms()})
                     except Exception:
                         pass
 
+            if link_task is not None:
+                link_task.cancel()
+
             try:
                 await queue.put(None)
             except Exception:
@@ -1922,13 +3014,125 @@ async def handler(websocket):
         async with _client_lock:
             if _active_client == sess_id:
                 _active_client = None
+                _METRICS.inc("active_sessions", -1)
+        _MEMDIAG.untrack(sess_id)
+        if capture is not None:
+            _CAPTURES.pop(id(websocket), None)
+            capture.close("closed")
+        summary = _ACCOUNTS.close(sess_id, websocket)
+        if summary is not None:
+            rec = json.dumps({"event": "session_summary", **summary}, ensure_ascii=False)
+            logger.info("[%s] session summary: %s", sess_id, rec)
+            if SESSION_ACCT_LOG:
+                _TXT_IO.append(Path(SESSION_ACCT_LOG), [rec])
         logger.info("[%s] disconnected/cleanup done (slot released)", sess_id)
 
+async def _trace_route(req: metrics_http.HTTPRequest):
+    """GET /trace: Chrome trace JSON of the span ring; ?enable=1[&sample=N&ring=N] / ?enable=0 toggles tracing."""
+    global _TRACE
+    en = req.query.get("enable")
+    if en is not None:
+        if en.strip().lower() in {"1", "true", "yes"}:
+            try:
+                ring = min(max(1, int(req.query.get("ring", TRACE_RING_SPANS))), TRACE_RING_MAX)
+                sample = max(1, int(req.query.get("sample", TRACE_SAMPLE_EVERY)))
+            except ValueError:
+                return 400, "text/plain", "bad ring/sample\n"
+            _TRACE = chunk_trace.ChunkTracer(ring, sample, _CLOCK_REF)
+        else:
+            _TRACE = None
+        logger.info("chunk tracing %s", "on" if _TRACE is not None else "off")
+        return 200, "application/json", json.dumps({"enabled": _TRACE is not None,
+                                                    **(_TRACE.stats() if _TRACE is not None else {})})
+    tr = _TRACE
+    if tr is None:
+        return 409, "application/json", json.dumps({"enabled": False, "hint": "/trace?enable=1"})
+    spans = list(tr.spans)   # copied on the loop thread; formatting runs off-loop
+    body = await asyncio.get_running_loop().run_in_executor(None, lambda: json.dumps(tr.chrome_trace(spans)))
+    return 200, "application/json", body
+
+
+_PROFILE_BUSY = False
+
+async def _profile_route(req: metrics_http.HTTPRequest):
+    """GET /profile: run sampling_profiler for ?seconds (default 10) in a worker thread, return collapsed stacks."""
+    global _PROFILE_BUSY
+    if _PROFILE_BUSY:
+        return 409, "text/plain", "a profile is already running\n"
+    try:
+        seconds = min(max(0.5, float(req.query.get("seconds", "10"))), PROFILE_MAX_SEC)
+        hz = float(req.query.get("hz", "100"))
+    except ValueError:
+        return 400, "text/plain", "bad seconds/hz\n"
+    idle = req.query.get("idle", "0").strip().lower() in {"1", "true", "yes"}
+
+    _PROFILE_BUSY = True
+    try:
+        prof = sampling_profiler.SamplingProfiler(hz=hz, include_idle=idle)
+        logger.info("profile: %.1fs at %.0f Hz (idle=%s) requested by %s", seconds, hz, idle, req.peer)
+        text = await asyncio.get_running_loop().run_in_executor(None, prof.run, seconds)
+    finally:
+        _PROFILE_BUSY = False
+
+    path = PROFILE_DIR / time.strftime("profile_%Y%m%d_%H%M%S.collapsed")
+    try:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    except OSError as e:
+        logger.warning("profile: cannot save %s: %r", path, e)
+    logger.info("profile done: %s -> %s", prof.stats(), path)
+    return 200, "text/plain; charset=utf-8", text
+
+
+def _ready_route(req: metrics_http.HTTPRequest):
+    """200 once the recorder class is imported (sessions start without waiting), else 503."""
+    err = _RECORDER_CLS.exception() if _RECORDER_CLS.done() else None
+    ready = _RECORDER_CLS.done() and err is None
+    body = {"ready": ready, "listening": "listening" in _STARTUP.milestones,
+            "error": (repr(err) if err is not None else None), "startup": _STARTUP.summary()}
+    return (200 if ready else 503), "application/json", json.dumps(body)
+
+_STARTUP.mark("module_rest")
+
 async def main():
+    global _WATCHDOG
     host = WS_HOST
     port = WS_PORT
     logger.info("Serving WS on %s:%d", host, port)
 
+    if LOOP_WATCHDOG_ENABLE:
+        _WATCHDOG = loop_watchdog.LoopWatchdog(
+            asyncio.get_running_loop(), threading.get_ident(),
+            interval_sec=LOOP_WATCHDOG_INTERVAL_SEC, stall_ms=LOOP_WATCHDOG_STALL_MS,
+            log_every_sec=LOOP_WATCHDOG_LOG_EVERY_SEC, window_sec=LATENCY_WINDOW_SEC,
+        )
+        _WATCHDOG.start()
+
+    _TELEMETRY.ensure_started()
+    if MEM_DIAG:
+        _MEMDIAG.start()
+    if _TXT_COMPACTOR is not None:
+        _TXT_COMPACTOR.ensure_started()
+
+    side_http = None
+    if METRICS_PORT > 0:
+        side_http = metrics_http.SideHTTPServer(METRICS_HOST, METRICS_PORT)
+        side_http.route("/metrics", lambda req: (200, metrics_http.PROM_CONTENT_TYPE, _METRICS.render()))
+        side_http.route("/ready", _ready_route)
+        side_http.route("/loop", lambda req: (200, "application/json", json.dumps(
+            {**_WATCHDOG.snapshot(), "last_stall": _WATCHDOG.last_stall} if _WATCHDOG is not None else {"enabled": False})))
+        if ADMIN_TOKEN:
+            side_http.route("/trace", _trace_route, token=ADMIN_TOKEN)
+            side_http.route("/sessions", lambda req: (200, "application/json", json.dumps(
+                _ACCOUNTS.snapshot(req.query.get("user")), ensure_ascii=False)), token=ADMIN_TOKEN)
+            side_http.route("/profile", _profile_route, token=ADMIN_TOKEN)
+            side_http.route("/memory", mem_diag.http_route(_MEMDIAG), token=ADMIN_TOKEN)
+        try:
+            await side_http.start()
+        except OSError as e:
+            logger.warning("metrics port %s:%d unavailable: %r", METRICS_HOST, METRICS_PORT, e)
+            side_http = None
+
     compression = os.getenv("WS_COMPRESSION", "deflate").strip().lower()
     compression = None if compression in {"0","none","off","false"} else "deflate"
 
@@ -1938,6 +3142,10 @@ async def main():
         ping_interval=20, ping_timeout=20,
         compression=compression,
     ):
+        listen = _STARTUP.milestone("listening")
+        _METRICS.set("startup_listen_seconds", round(listen / 1000.0, 3))
+        logger.info("startup: listening in %.0f ms | %s", listen, _STARTUP.format())
+        _ensure_warmup()
         await asyncio.Future()
 
 if __name__ == "__main__":
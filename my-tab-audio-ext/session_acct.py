@@ -0,0 +1,172 @@
+# session_acct.py
+# Per-session resource accounting for server.py.
+#
+#   acct = ACCOUNTS.open(sess_id, websocket)       # slot acquired
+#   acct.user = authed_user                        # once auth is done
+#   acct.bytes_in += len(msg); acct.audio_in_sec += n / sr; ...
+#   ACCOUNTS.close(sess_id) -> summary dict        # folded into per-user totals
+#   ACCOUNTS.snapshot()                            # live view (side port /sessions)
+#
+# Durations and timestamps come from the accounts' clock (sim_clock interface; server.py passes one that
+# follows server._CLOCK), CPU and inference time are always real.
+#
+# Fields are plain numbers bumped in place from the event loop thread, except inference_sec /
+# inference_calls which the recorder's realtime worker thread updates (single writer each).
+#
+# What is measured where:
+#   bytes_in / bytes_out   WebSocket payload bytes (recv / _ws_send), msgs_in / msgs_out counts
+#   audio_in_sec           decoded client audio (source rate), i.e. what the client sent
+#   audio_fed_sec          16 kHz audio handed to recorder.feed_audio() (warmup / EOS tail silence excluded)
+#   dropped_queue_sec      queued items discarded by the queue guard / byte cap (estimated from bytes)
+#   dropped_trim_sec       16 kHz buffer trims (MAX_BUF_MS -> DROP_BUF_TO_MS)
+#   inference_sec          wall time inside the realtime model's transcribe() including the lazy
+#                          segment decoding (see time_inference); RealtimeSTT's final-transcription
+#                          process is not visible from here
+#   cpu_sec                process CPU time while the session held the slot (server is single-session,
+#                          so this is attributable; includes every thread of this process)
+#   txt_bytes              UTF-8 bytes queued to the TXT writer for this session
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import sim_clock
+
+MAX_USERS = 1000    # per-user totals kept (least recently closed evicted)
+
+_SUM_FIELDS = (
+    "bytes_in", "bytes_out", "msgs_in", "msgs_out", "audio_in_sec", "audio_fed_sec",
+    "dropped_queue_sec", "dropped_trim_sec", "inference_sec", "inference_calls", "cpu_sec", "txt_bytes",
+)
+
+
+class SessionAccount:
+    __slots__ = ("sess_id", "user", "started", "_clock", "_t0", "_cpu0", "closed_sec", "closed_cpu") + _SUM_FIELDS
+
+    def __init__(self, sess_id: str, clock: Any = None):
+        self.sess_id = sess_id
+        self.user: Optional[str] = None
+        self._clock = clock or sim_clock.SYSTEM
+        self.started = self._clock.time()
+        self._t0 = self._clock.monotonic()
+        self._cpu0 = time.process_time()
+        self.closed_sec: Optional[float] = None
+        self.closed_cpu: Optional[float] = None
+        for f in _SUM_FIELDS:
+            setattr(self, f, 0)
+
+    def finish(self):
+        if self.closed_sec is None:
+            self.closed_sec = self._clock.monotonic() - self._t0
+            self.closed_cpu = time.process_time() - self._cpu0
+
+    def snapshot(self) -> Dict[str, Any]:
+        dur = self.closed_sec if self.closed_sec is not None else self._clock.monotonic() - self._t0
+        cpu = self.closed_cpu if self.closed_cpu is not None else time.process_time() - self._cpu0
+        out: Dict[str, Any] = {"sess_id": self.sess_id, "user": self.user or "-",
+                               "started": round(self.started, 3), "duration_sec": round(dur, 3)}
+        for f in _SUM_FIELDS:
+            v = getattr(self, f)
+            out[f] = round(v, 3) if isinstance(v, float) else v
+        out["cpu_sec"] = round(cpu, 3)
+        out["dropped_sec"] = round(self.dropped_queue_sec + self.dropped_trim_sec, 3)
+        out["rt_factor"] = round(self.inference_sec / self.audio_fed_sec, 4) if self.audio_fed_sec else None
+        return out
+
+
+def _timed_segments(segments, acct: SessionAccount, t_first: float):
+    # faster-whisper decodes lazily while the caller iterates the segments
+    spent = t_first
+    it = iter(segments)
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                seg = next(it)
+            except StopIteration:
+                return
+            finally:
+                spent += time.perf_counter() - t0
+            yield seg
+    finally:
+        acct.inference_sec += spent
+
+
+def time_inference(recorder, acct: SessionAccount) -> bool:
+    """
+    Wrap the recorder's realtime model transcribe() (RealtimeSTT attribute realtime_model_type) to add
+    its wall time to acct.inference_sec. Returns False when the recorder does not expose one.
+    """
+    model = getattr(recorder, "realtime_model_type", None)
+    fn = getattr(model, "transcribe", None)
+    if fn is None or not callable(fn):
+        return False
+
+    def transcribe(*args, **kwargs):
+        t0 = time.perf_counter()
+        res = fn(*args, **kwargs)
+        dt = time.perf_counter() - t0
+        acct.inference_calls += 1
+        if isinstance(res, tuple) and len(res) == 2 and hasattr(res[0], "__iter__") and not isinstance(res[0], (str, list)):
+            return _timed_segments(res[0], acct, dt), res[1]
+        acct.inference_sec += dt
+        return res
+
+    try:
+        model.transcribe = transcribe
+    except (AttributeError, TypeError):
+        return False
+    return True
+
+
+class SessionAccounts:
+    """Open sessions (by sess_id and by websocket) + per-user totals of closed ones."""
+
+    def __init__(self, max_users: int = MAX_USERS, clock: Any = None):
+        self.max_users = max(1, int(max_users))
+        self.clock = clock or sim_clock.SYSTEM
+        self.active: Dict[str, SessionAccount] = {}
+        self._by_ws: Dict[int, SessionAccount] = {}
+        self.users: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, sess_id: str, ws: Any = None) -> SessionAccount:
+        acct = SessionAccount(sess_id, self.clock)
+        with self._lock:
+            self.active[sess_id] = acct
+            if ws is not None:
+                self._by_ws[id(ws)] = acct
+        return acct
+
+    def for_ws(self, ws: Any) -> Optional[SessionAccount]:
+        return self._by_ws.get(id(ws))
+
+    def close(self, sess_id: str, ws: Any = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            acct = self.active.pop(sess_id, None)
+            if ws is not None:
+                self._by_ws.pop(id(ws), None)
+            if acct is None:
+                return None
+            acct.finish()
+            snap = acct.snapshot()
+            tot = self.users.pop(snap["user"], None) or {"sessions": 0, "duration_sec": 0.0, **{f: 0 for f in _SUM_FIELDS}}
+            tot["sessions"] += 1
+            tot["duration_sec"] = round(tot["duration_sec"] + snap["duration_sec"], 3)
+            for f in _SUM_FIELDS:
+                tot[f] = round(tot[f] + snap[f], 3) if isinstance(snap[f], float) else tot[f] + snap[f]
+            tot["last_end"] = round(self.clock.time(), 3)
+            self.users[snap["user"]] = tot
+            while len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+        return snap
+
+    def snapshot(self, user: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            active: List[Dict[str, Any]] = [a.snapshot() for a in self.active.values()]
+            users = {u: dict(t) for u, t in self.users.items()}
+        if user is not None:
+            active = [a for a in active if a["user"] == user]
+            users = {u: t for u, t in users.items() if u == user}
+        return {"active": active, "users": users}
@@ -0,0 +1,130 @@
+# sim_clock.py
+# Injectable clock for server.py's timing-heavy code + a virtual-time asyncio loop for simulations.
+#
+#   server._CLOCK.monotonic() / .perf_counter() / .time()   # SYSTEM (default): the time module
+#   ClockRef(lambda: server._CLOCK)                          # for objects built before the swap
+#
+#   clock = VirtualClock()
+#   server._CLOCK = clock
+#   run(main(), clock)        # loop.time() == clock.monotonic(); when nothing is runnable the loop
+#                             # jumps straight to its next timer instead of sleeping
+#
+# Virtual time only moves while the loop is idle: CPU spent in callbacks costs no simulated time
+# (measure it with time.process_time()), and asyncio.sleep / wait_for timeouts / call_later fire in
+# order as fast as the CPU allows. Work done on other threads is not waited for when timers are
+# pending (the loop jumps ahead), so simulations should keep everything on the loop thread
+# (tools/stub_recorder.LoopStubRecorder, TXT saving off).
+
+import time
+import asyncio
+import selectors
+from typing import Any, Awaitable, Callable, Optional
+
+
+class SystemClock:
+    """Wall/monotonic time of the process (what server.py uses outside simulations)."""
+    monotonic = staticmethod(time.monotonic)
+    perf_counter = staticmethod(time.perf_counter)
+    time = staticmethod(time.time)
+
+
+SYSTEM = SystemClock()
+
+
+class ClockRef:
+    """Looks the clock up on every call, so objects created at import time follow a later swap."""
+
+    def __init__(self, get: Callable[[], Any]):
+        self._get = get
+
+    def monotonic(self) -> float:
+        return self._get().monotonic()
+
+    def perf_counter(self) -> float:
+        return self._get().perf_counter()
+
+    def time(self) -> float:
+        return self._get().time()
+
+
+class VirtualClock:
+    """Starts at monotonic 0.0 / wall start_wall and only moves on advance()."""
+
+    def __init__(self, start_wall: Optional[float] = None):
+        self._t = 0.0
+        self._wall0 = time.time() if start_wall is None else float(start_wall)
+
+    def monotonic(self) -> float:
+        return self._t
+
+    perf_counter = monotonic
+
+    def time(self) -> float:
+        return self._wall0 + self._t
+
+    def advance(self, sec: float):
+        if sec > 0:
+            self._t += sec
+
+
+class _VirtualSelector(selectors.BaseSelector):
+    """Polls the real selector without blocking; an idle wait with a deadline becomes a clock jump."""
+
+    def __init__(self, clock: VirtualClock):
+        self._clock = clock
+        self._inner = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self._inner.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._inner.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._inner.modify(fileobj, events, data)
+
+    def get_key(self, fileobj):
+        return self._inner.get_key(fileobj)
+
+    def get_map(self):
+        return self._inner.get_map()
+
+    def close(self):
+        self._inner.close()
+
+    def select(self, timeout=None):
+        if timeout is None:
+            # no timers at all: only another thread (call_soon_threadsafe) can wake us
+            return self._inner.select(None)
+        events = self._inner.select(0)
+        if not events and timeout > 0:
+            self._clock.advance(timeout)
+        return events
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock: Optional[VirtualClock] = None):
+        self.clock = clock or VirtualClock()
+        super().__init__(_VirtualSelector(self.clock))
+
+    def time(self) -> float:
+        return self.clock.monotonic()
+
+
+def run(main: Awaitable[Any], clock: Optional[VirtualClock] = None) -> Any:
+    """asyncio.run() on a VirtualTimeLoop."""
+    loop = VirtualTimeLoop(clock)
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            pending = [t for t in asyncio.all_tasks(loop) if not t.done()]
+            for t in pending:
+                t.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
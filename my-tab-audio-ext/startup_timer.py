@@ -0,0 +1,71 @@
+# startup_timer.py
+# Phase timing for server.py start-up (module import -> port listening -> ready for sessions).
+#
+#   _STARTUP = StartupTimer()          # first thing server.py creates
+#   ... import / probe block ...
+#   _STARTUP.mark("ctranslate2")       # closes the phase that began at the previous mark
+#   with _STARTUP.phase("recorder_import"):   # timed on its own (background warm-up thread)
+#       ...
+#   _STARTUP.milestone("listening")    # ms since the timer was created
+#   _STARTUP.summary() / _STARTUP.format()
+#
+# Marks describe the sequential import-time path (what delays the listening port); phases run off
+# that path. For per-module detail run the server once with `python -X importtime server.py`.
+
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+class StartupTimer:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self._last = self.t0
+        self._lock = threading.Lock()
+        self.marks: List[Tuple[str, float]] = []        # sequential import path, ms each
+        self.phases: List[Tuple[str, float]] = []       # off the critical path, ms each
+        self.milestones: Dict[str, float] = {}          # name -> ms since t0
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        with self._lock:
+            self.marks.append((name, (now - self._last) * 1000.0))
+            self._last = now
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases.append((name, (time.perf_counter() - t) * 1000.0))
+
+    def milestone(self, name: str) -> float:
+        ms = (time.perf_counter() - self.t0) * 1000.0
+        with self._lock:
+            self.milestones[name] = ms
+        return ms
+
+    def seconds(self, milestone: str) -> float:
+        return self.milestones.get(milestone, 0.0) / 1000.0
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            marks, phases, ms = list(self.marks), list(self.phases), dict(self.milestones)
+        return {
+            "import_ms": {k: round(v, 1) for k, v in marks},
+            "background_ms": {k: round(v, 1) for k, v in phases},
+            "milestones_ms": {k: round(v, 1) for k, v in ms.items()},
+            "slowest": [k for k, _v in sorted(marks, key=lambda kv: -kv[1])[:3]],
+        }
+
+    def format(self) -> str:
+        s = self.summary()
+        parts = [" ".join(f"{k}={v:.0f}ms" for k, v in s["import_ms"].items())]
+        if s["background_ms"]:
+            parts.append("bg: " + " ".join(f"{k}={v:.0f}ms" for k, v in s["background_ms"].items()))
+        if s["milestones_ms"]:
+            parts.append(" ".join(f"{k}@{v:.0f}ms" for k, v in s["milestones_ms"].items()))
+        return " | ".join(parts)
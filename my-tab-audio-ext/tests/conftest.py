@@ -0,0 +1,9 @@
+# tests/conftest.py
+# The modules live flat next to server.py (tools/ holds the benchmark and simulation scripts).
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tools"))
@@ -0,0 +1,294 @@
+# tests/test_protocol.py
+# Pure pieces of the wire / file formats (no RealtimeSTT, no sockets): stable deltas, bin1,
+# the TXT journal, .vtcap captures, the frozen transcript store and latency histograms.
+
+import gzip
+import json
+import os
+import random
+import subprocess
+import sys
+import zlib
+
+import pytest
+
+import bench_replay
+import latency_hist
+import replay_capture
+import sim_clock
+import traffic_capture
+import txt_journal
+import wire_codec
+from conftest import ROOT
+from transcript_text import StableDeltaEncoder, TranscriptStore
+
+SENT = "So the next thing we want to look at is how the gradient flows through the network, right? "
+
+
+def _snapshots(n: int, seed: int = 7):
+    """Growing stable texts with occasional tail rewrites (like the stabilizer produces)."""
+    rng = random.Random(seed)
+    text = ""
+    for i in range(n):
+        if text and rng.random() < 0.2:
+            text = text[:max(0, len(text) - rng.randint(1, 12))]
+        text += f"word{i} " + ("über " if i % 5 == 0 else "")
+        yield text
+
+
+def _client_apply(st: txt_journal.JournalState, seq: int, delta):
+    st.apply(json.loads(txt_journal.stable_record(seq, 0, delta)))
+
+
+# ---- stable_delta ----
+
+def test_stable_delta_round_trip_with_checkpoints():
+    enc = StableDeltaEncoder(ckpt_every=5)
+    enc.BLOCK = 64          # several CRC marks even for short texts
+    st = txt_journal.JournalState()
+    kinds = set()
+    for seq, snap in enumerate(_snapshots(300), 1):
+        delta = enc.update(snap)
+        kinds.add("full" if "full" in delta else "delta")
+        _client_apply(st, seq, delta)
+        assert st.text == snap
+        assert st.crc == delta["crc"] == zlib.crc32(snap.encode("utf-8"))
+        assert delta["len"] == len(snap)
+    assert kinds == {"full", "delta"}
+    assert st.errors == 0
+
+
+def test_stable_delta_crc_mismatch_then_resync():
+    enc = StableDeltaEncoder(ckpt_every=1000)
+    st = txt_journal.JournalState()
+    snaps = list(_snapshots(40))
+    for seq, snap in enumerate(snaps[:20], 1):
+        _client_apply(st, seq, enc.update(snap))
+
+    lost = enc.update(snaps[20])     # never reaches the client
+    assert "off" in lost
+    _client_apply(st, 22, enc.update(snaps[21] + "rewritten tail "))
+    assert st.errors > 0             # base_crc / crc no longer match: client asks for a resync
+
+    enc.request_checkpoint()         # server side of {"event":"resync"}
+    ckpt = enc.update(snaps[22])
+    assert ckpt["ckpt"] is True and ckpt["full"] == snaps[22]
+    st.errors = 0
+    _client_apply(st, 23, ckpt)
+    for seq, snap in enumerate(snaps[23:], 24):
+        _client_apply(st, seq, enc.update(snap))
+    assert st.text == snaps[-1] and st.errors == 0
+
+
+def test_stable_delta_rebase_keeps_absolute_offsets():
+    ts = TranscriptStore(2048, 1024)
+    enc = StableDeltaEncoder(ckpt_every=1000)
+    st = txt_journal.JournalState()
+    full = ""
+    live = ""
+    for seq, i in enumerate(range(800), 1):
+        full += f"w{i} "
+        live = full[ts.base:]
+        cut = ts.freeze(live)
+        live = live[cut:]
+        enc.rebase(ts.base, ts.frozen)
+        _client_apply(st, seq, enc.update(live, prefix=ts.frozen))
+        assert st.text == full
+    assert ts.base > 0 and st.errors == 0
+
+
+# ---- bin1 ----
+
+@pytest.mark.parametrize("obj", [
+    {"type": "stable", "seq": 3, "t_ms": 1760000000456, "full": SENT * 50 + "ü€😀", "ckpt": True,
+     "len": 4500, "crc": 4294967295, "cap_ms": 1760000000123.5},
+    {"type": "stable", "seq": 4, "off": 200, "append": "x" * 2000, "len": 2200, "base_crc": 0, "crc": 1,
+     "extra": {"nested": [1, -2, 3.5, None, True, False, "s"]}},
+])
+def test_wire_codec_round_trip(obj):
+    data = wire_codec.encode(obj)
+    assert isinstance(data, bytes)
+    assert wire_codec.decode(data) == obj
+
+
+def test_wire_codec_only_long_stables_go_binary():
+    short = {"type": "stable", "seq": 1, "full": "x" * 100}
+    long_ = {"type": "stable", "seq": 1, "full": "x" * wire_codec.MIN_TEXT_CHARS}
+    assert not wire_codec.prefer_binary(short)
+    assert wire_codec.prefer_binary(long_)
+    assert wire_codec.prefer_binary(short, min_chars=50)
+    assert not wire_codec.prefer_binary({"type": "patch", "insert": "x" * 5000})
+    assert not wire_codec.prefer_binary({"type": "status", "detail": {}})
+    assert wire_codec.dictionary()["types"] == ["stable"]
+
+
+def test_wire_codec_rejects_unknown_key_ids():
+    data = bytearray(wire_codec.encode({"type": "stable", "seq": 1, "x": 1}))
+    i = data.index(b"\x08\x01\x00") + 2       # dict, 1 pair, key id 0
+    data[i] = 5
+    with pytest.raises(ValueError):
+        wire_codec.decode(bytes(data))
+
+
+# ---- TXT journal ----
+
+def test_journal_replay_sessions_patches_and_torn_tail(tmp_path):
+    enc = StableDeltaEncoder(ckpt_every=4)
+    path = tmp_path / "en_journal.jsonl"
+    snaps = list(_snapshots(30))
+    lines = [txt_journal.header_record(1000, "s0", "u")]
+    lines += [txt_journal.stable_record(1, 1001, enc.update("old session text "))]
+    enc = StableDeltaEncoder(ckpt_every=4)
+    lines.append(txt_journal.header_record(2000, "s1", "u"))
+    for seq, snap in enumerate(snaps, 1):
+        lines.append(txt_journal.stable_record(seq, 2000 + seq, enc.update(snap)))
+    lines.append(txt_journal.patch_record(2100, 0, "draft words"))
+    lines.append(txt_journal.patch_record(2101, 5, "text"))
+    lines.append(txt_journal.final_record(2102))
+    path.write_text("\n".join(lines) + "\n" + '{"k":"s","seq":99,"full":"tor', encoding="utf-8")
+
+    st = txt_journal.replay(str(path))
+    assert st.text == snaps[-1] and st.errors == 0
+    assert st.draft == "draft text" and st.ended and st.seq == len(snaps)
+
+    mid = txt_journal.replay(str(path), until_t_ms=2010)
+    assert mid.text == snaps[9] and not mid.ended
+
+
+def test_journal_index_round_trip(tmp_path):
+    p = tmp_path / "en_journal.idx"
+    p.write_text(txt_journal.index_line(10, 1000, 0, 5) + "\n" + "garbage\n"
+                 + txt_journal.index_line(20, 2000, 4096, 9) + "\n", encoding="utf-8")
+    assert txt_journal.read_index(str(p)) == [(10, 1000, 0, 5), (20, 2000, 4096, 9)]
+    assert txt_journal.read_index(str(tmp_path / "missing.idx")) == []
+
+
+# ---- traffic capture ----
+
+def _write_capture(path, max_bytes=1 << 20):
+    cap = traffic_capture.CaptureWriter(str(path), {"path": "/?caps=ts1&ticket=SECRET"}, max_bytes=max_bytes)
+    cap.inbound('{"type":"auth","token":"SECRET"}')
+    for i in range(200):
+        cap.inbound(bytes([i % 256]) * 960)
+        cap.outbound('{"type":"patch","insert":"w%d"}' % i)
+    cap.outbound(b"\x00binary")
+    cap.close("disconnected")
+    cap._thread.join(5.0)
+    return cap
+
+
+def test_capture_write_read_and_redaction(tmp_path):
+    p = tmp_path / "a.vtcap"
+    _write_capture(p)
+    hdr, recs = traffic_capture.read_capture(str(p))
+    assert hdr["path"] == "/?caps=ts1"
+    kinds = [k for _t, k, _p in recs]
+    assert kinds[0] == traffic_capture.IN_TEXT and b"SECRET" not in recs[0][2]
+    assert kinds.count(traffic_capture.IN_BIN) == 200 and kinds.count(traffic_capture.OUT_TEXT) == 200
+    assert recs[-2][1] == traffic_capture.OUT_BIN and recs[-1] == (recs[-1][0], traffic_capture.END, b"disconnected")
+    assert all(a[0] <= b[0] for a, b in zip(recs, recs[1:]))
+
+
+def test_capture_truncated_tail_and_size_cap(tmp_path):
+    p = tmp_path / "a.vtcap"
+    _write_capture(p)
+    _hdr, full = traffic_capture.read_capture(str(p))
+
+    # crash mid-write: the gzip stream and the last record are cut off
+    raw = gzip.decompress(p.read_bytes())
+    cut = tmp_path / "cut.vtcap"
+    cut.write_bytes(gzip.compress(raw[:len(raw) * 2 // 3])[:-10])
+    _hdr, part = traffic_capture.read_capture(str(cut))
+    assert 0 < len(part) < len(full)
+    assert part == full[:len(part)]
+
+    capped = tmp_path / "capped.vtcap"
+    cap = _write_capture(capped, max_bytes=20000)
+    assert cap.truncated
+    _hdr, recs = traffic_capture.read_capture(str(capped))
+    assert recs[-1][1] == traffic_capture.END and recs[-1][2] == b"disconnected truncated"
+    assert sum(len(x) for _t, _k, x in recs[:-1]) <= 20000
+
+    with pytest.raises(ValueError):
+        bad = tmp_path / "bad.vtcap"
+        bad.write_bytes(gzip.compress(b"nope"))
+        traffic_capture.read_capture(str(bad))
+
+
+def test_replay_on_virtual_time_is_deterministic(tmp_path):
+    clock = sim_clock.VirtualClock(start_wall=1760000000.0)
+    src = tmp_path / "src.vtcap"
+    cap = traffic_capture.CaptureWriter(str(src), {"path": "/?caps=ts1,patch_batch"}, clock=clock)
+    cap.inbound(json.dumps({"event": "start", "sample_rate": 48000, "dtype": "i16", "caps": ["ts1", "patch_batch"]}))
+    clip = bench_replay.synth_audio(6.0, 48000)
+    for o in range(0, clip.size - 960, 960):
+        clock.advance(0.02)
+        cap.inbound(bench_replay.TS1_MAGIC + bench_replay._F64_LE.pack(clock.time() * 1000.0) + clip[o:o + 960].tobytes())
+    cap.inbound(json.dumps({"event": "stop"}))
+    cap.close("disconnected")
+    cap._thread.join(5.0)
+
+    runs = []
+    for i in range(2):
+        out = tmp_path / f"r{i}.vtcap"
+        subprocess.run([sys.executable, os.path.join(ROOT, "tools", "replay_capture.py"), "replay", str(src),
+                        "--save", str(out)], capture_output=True, timeout=300, check=True)
+        runs.append(traffic_capture.read_capture(str(out))[1])
+    types = replay_capture.summarize(runs[0])["out_types"]
+    assert types.get("patch", 0) > 5 and types.get("stable", 0) > 5
+    assert replay_capture.diff_outbound(runs[0], runs[1])["identical"]
+    assert [t for t, _k, _p in runs[0]] == [t for t, _k, _p in runs[1]]
+
+
+# ---- TranscriptStore ----
+
+def test_transcript_store_frozen_offsets_across_chunks():
+    ts = TranscriptStore(2048, 1024)
+    ts.CHUNK_CHARS = 3000                   # several compressed chunks + a pending tail
+    full = ""
+    live = ""
+    for i in range(3000):
+        w = f"wörd{i} "
+        full += w
+        live += w
+        live = live[ts.freeze(live):]
+        assert ts.frozen() + live == full
+    assert ts.base == len(full) - len(live) and len(ts._chunks) >= 2
+    assert ts.frozen().endswith(" ")
+    assert ts.words == ts.frozen().count(" ")
+    for a, b in [(0, 1), (0, ts.base), (2999, 3001), (5000, 12000), (ts.base - 7, ts.base + 50)]:
+        assert ts.frozen(a, b) == full[a:min(b, ts.base)]
+    assert ts.frozen(10, 5) == ""
+    assert ts.full_text(live) == full
+    assert ts.stats()["freezes"] == ts.freezes > 0
+
+
+# ---- latency histograms ----
+
+def test_latency_percentiles_within_bucket_error():
+    h = latency_hist.LatencyHistogram()
+    for ms in range(1, 1001):
+        h.record(float(ms))
+    h.record(-1.0)
+    h.record(float("nan"))
+    assert h.n == 1000 and h.max_ms == 1000.0
+    for q, want in [(0.5, 500), (0.9, 900), (0.99, 990)]:
+        assert abs(h.percentile(q) - want) / want < 0.07
+    assert abs(h.percentile(1.0) - 1000.0) < 1.0
+    assert h.cumulative([0.5, 10.0, 2000.0]) == [0, 10, 1000]
+    merged = h.copy().merge(h)
+    assert merged.n == 2000 and merged.summary()["p50"] == h.summary()["p50"]
+    assert latency_hist.LatencyHistogram().summary() == {"n": 0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+
+
+def test_windowed_histogram_rotates_on_its_clock():
+    clock = sim_clock.VirtualClock()
+    w = latency_hist.WindowedHistogram(30.0, clock=clock)
+    w.record(5.0)
+    clock.advance(31.0)
+    w.record(50.0)
+    assert w.summary()["n"] == 2                  # previous half still in the window
+    clock.advance(31.0)
+    assert w.summary()["n"] == 1
+    clock.advance(100.0)                          # idle gap empties both halves
+    assert w.summary()["n"] == 0 and w.summary(window=False)["n"] == 2
@@ -0,0 +1,61 @@
+# tests/test_transcript_text.py
+import os
+import sys
+import json
+import subprocess
+
+from conftest import ROOT
+from transcript_text import TranscriptStore, norm_spaces
+
+
+def _words(i0: int, n: int) -> str:
+    return " ".join(f"w{i}" for i in range(i0, i0 + n))
+
+
+def test_live_of_cuts_at_the_frozen_boundary():
+    ts = TranscriptStore(2048, 1024)
+    raw = _words(0, 600)
+    live = ts.live_of(raw, "stable")
+    cut = ts.freeze(live)
+    assert cut > 0 and ts.base == cut
+    assert ts.frozen() == live[:cut]
+    assert ts.frozen(10, 20) == live[10:20]
+    assert ts.live_of(raw + " w600", "update") == live[cut:] + " w600"
+    assert ts.full_text(live[cut:]) == live
+
+
+def test_live_of_restarted_text_becomes_a_new_live_tail():
+    ts = TranscriptStore(2048, 1024)
+    live = ts.live_of(_words(0, 600), "stable")
+    cut = ts.freeze(live)
+    frozen = ts.frozen()
+
+    # the recognizer started a new utterance: the frozen prefix is gone from its text
+    new = "  fresh   utterance " + _words(1000, 5)
+    assert ts.live_of(new, "update") == norm_spaces(new)
+    assert ts.live_of(new, "stable") == norm_spaces(new)
+    assert ts.mismatches == 2
+
+    # it keeps growing and freezing on top of the old frozen text
+    grown = new + " " + _words(2000, 600)
+    live2 = ts.live_of(grown, "stable")
+    assert live2 == norm_spaces(grown)
+    cut2 = ts.freeze(live2)
+    assert cut2 > 0 and ts.base == cut + cut2
+    assert ts.frozen() == frozen + live2[:cut2]
+    assert ts.live_of(grown + " tail", "update") == live2[cut2:] + " tail"
+    assert ts.mismatches == 2
+
+
+def test_patches_and_stables_keep_flowing_after_a_restart_past_a_freeze():
+    # stub utterances of 200 s (~2.9k chars) freeze at 2048 chars, then restart without the frozen prefix
+    cmd = [sys.executable, os.path.join(ROOT, "tools", "sim_stream.py"), "--minutes", "8", "--checkpoints", "8",
+           "--utterance-sec", "200", "--json",
+           "--env", "TRANSCRIPT_LIVE_MAX_CHARS=2048", "--env", "TRANSCRIPT_LIVE_KEEP_CHARS=1024"]
+    out = subprocess.run(cmd, capture_output=True, text=True, timeout=300, check=True).stdout
+    rows = json.loads(out)["rows"]
+    assert len(rows) == 8
+    assert all(r["stables"] > 200 for r in rows)
+    # the second utterance outgrows the kept tail again -> live patches resume
+    assert sum(r["patches"] for r in rows[4:]) > 100
+    assert rows[-1]["stable_chars"] > rows[3]["stable_chars"]
@@ -0,0 +1,143 @@
+# tools/bench_load.py
+# Capacity planning: K concurrent WebSocket clients against one server.py, for increasing K.
+#
+#   python tools/bench_load.py --levels 1,2,4,8 --seconds 30            # spawned server, stub recorder
+#   python tools/bench_load.py --levels 1,2 --recorder real --env STT_COMPUTE_TYPE=int8 --env STT_MODEL=tiny.en
+#   python tools/bench_load.py --url ws://host:8765 --metrics host:9765 --levels 1,4 --csv out.csv
+#
+# Every client streams --seconds of paced 16-bit PCM (a WAV or generated audio) in chunks of the size
+# hello advertises (hint_client_frame_48k), clients starting --ramp-ms apart. Per level the table shows:
+# sessions that streamed, BUSY/queue rejections, idle timeouts, merged send->patch latency percentiles
+# over all clients, server CPU % (stt_process_cpu_seconds_total over the level's wall time) and
+# queue/trim drops. server.py holds one active session, so levels > 1 currently measure how rejections
+# behave; the table turns into a saturation curve as soon as more sessions are admitted.
+
+import os
+import sys
+import csv
+import json
+import time
+import asyncio
+import argparse
+import secrets
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_replay as br  # noqa: E402
+import latency_hist  # noqa: E402
+
+_COUNTERS = ["stt_process_cpu_seconds_total", "stt_queue_drops_total", "stt_buffer_trimmed_seconds_total",
+             "stt_sessions_total", "stt_sessions_rejected_total"]
+
+
+async def _run_level(url: str, k: int, pcm, sr: int, speed: float, caps: str, ramp_ms: float,
+                     chunk_ms) -> List[br.ClientStats]:
+    async def one(i: int) -> br.ClientStats:
+        await asyncio.sleep(i * ramp_ms / 1000.0)
+        return await br.stream_session(url, pcm, sr, chunk_ms, speed, caps)
+    return list(await asyncio.gather(*(one(i) for i in range(k))))
+
+
+def _wait_idle(metrics: str, token: str, timeout: float = 20.0):
+    """Wait until no session is open (previous level fully closed) so levels do not overlap."""
+    deadline = time.monotonic() + timeout
+    while metrics and time.monotonic() < deadline:
+        code, body = br.http_get(metrics, "/sessions", token)
+        if code != 200 or not json.loads(body).get("active"):
+            return
+        time.sleep(0.2)
+
+
+def _level_row(k: int, clients: List[br.ClientStats], m0: Dict[str, float], m1: Dict[str, float],
+               wall: float) -> Dict[str, Any]:
+    lat = latency_hist.LatencyHistogram()
+    streamed = rejected = idle = failed = 0
+    for c in clients:
+        lat.merge(c.latency)
+        if c.closed == "rejected" or "BUSY" in c.errors:
+            rejected += 1
+        elif c.closed == "connect-failed":
+            failed += 1
+        else:
+            streamed += 1
+        if "IDLE_TIMEOUT" in c.errors:
+            idle += 1
+    d = {n: m1.get(n, 0.0) - m0.get(n, 0.0) for n in _COUNTERS}
+    s = lat.summary()
+    return {
+        "clients": k, "streamed": streamed, "rejected": rejected, "idle_timeouts": idle, "connect_failed": failed,
+        "patches": sum(c.recv_msgs.get("patch", 0) for c in clients),
+        "p50_ms": s["p50"], "p90_ms": s["p90"], "p99_ms": s["p99"], "max_ms": s["max"],
+        "cpu_pct": round(d["stt_process_cpu_seconds_total"] / wall * 100.0, 1) if wall > 0 else None,
+        "queue_drops": int(d["stt_queue_drops_total"]),
+        "trimmed_sec": round(d["stt_buffer_trimmed_seconds_total"], 3),
+        "wall_sec": round(wall, 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--levels", default="1,2,4,8", help="comma-separated client counts")
+    ap.add_argument("--seconds", type=float, default=20.0, help="audio per client (ignored with --wav)")
+    ap.add_argument("--wav", default="", help="16-bit PCM WAV every client streams")
+    ap.add_argument("--speed", type=float, default=1.0)
+    ap.add_argument("--chunk-ms", type=float, default=None, help="default: hello hint_client_frame_48k")
+    ap.add_argument("--ramp-ms", type=float, default=50.0, help="delay between client starts")
+    ap.add_argument("--caps", default="ts1,patch_batch")
+    ap.add_argument("--recorder", choices=["stub", "real"], default="stub")
+    ap.add_argument("--env", action="append", default=[], help="extra server env K=V")
+    ap.add_argument("--url", default="")
+    ap.add_argument("--metrics", default="")
+    ap.add_argument("--token", default=os.getenv("ADMIN_TOKEN", ""), help="Bearer for /sessions of an --url server")
+    ap.add_argument("--server-log", default="")
+    ap.add_argument("--csv", default="", help="write the table here")
+    ap.add_argument("--json", action="store_true")
+    a = ap.parse_args()
+
+    levels = [int(x) for x in a.levels.split(",") if x.strip()]
+    if a.wav:
+        pcm, sr = br.read_wav(a.wav)
+    else:
+        sr = 48000
+        pcm = br.synth_audio(a.seconds, sr)
+
+    proc = None
+    url, metrics = a.url, a.metrics
+    if not url:
+        env = dict(kv.split("=", 1) for kv in a.env)
+        if a.recorder == "real":
+            env.setdefault("STT_RECORDER_FACTORY", "")
+        a.token = env.setdefault("ADMIN_TOKEN", a.token or secrets.token_hex(8))   # enables /sessions
+        proc, url, metrics = br.spawn_server(env, a.server_log or None, ready_timeout=300.0)
+
+    rows: List[Dict[str, Any]] = []
+    try:
+        for k in levels:
+            _wait_idle(metrics, a.token)
+            m0 = br.prom_values(br.http_get(metrics, "/metrics")[1], _COUNTERS) if metrics else {}
+            t0 = time.monotonic()
+            clients = asyncio.run(_run_level(url, k, pcm, sr, a.speed, a.caps, a.ramp_ms, a.chunk_ms))
+            wall = time.monotonic() - t0
+            _wait_idle(metrics, a.token)
+            m1 = br.prom_values(br.http_get(metrics, "/metrics")[1], _COUNTERS) if metrics else {}
+            row = _level_row(k, clients, m0, m1, wall)
+            rows.append(row)
+            if not a.json:
+                print(f"K={k:<3} streamed={row['streamed']:<3} rejected={row['rejected']:<3} idle={row['idle_timeouts']:<2} "
+                      f"p50={row['p50_ms']:<8} p99={row['p99_ms']:<8} cpu={row['cpu_pct']}% "
+                      f"qdrops={row['queue_drops']} trimmed={row['trimmed_sec']}s wall={row['wall_sec']}s", flush=True)
+    finally:
+        br.stop_server(proc)
+
+    if a.csv and rows:
+        with open(a.csv, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=list(rows[0]))
+            w.writeheader()
+            w.writerows(rows)
+    if a.json:
+        print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
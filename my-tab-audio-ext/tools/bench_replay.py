@@ -0,0 +1,376 @@
+# tools/bench_replay.py
+# Server overhead benchmark: stream a WAV file over a real WebSocket into server.py running with the
+# scripted stub recorder (tools/stub_recorder.py), so ingest, resample, pacing, stabilizer and patch
+# emission are measured without a GPU or RealtimeSTT.
+#
+#   python tools/bench_replay.py talk.wav                 # 1x, spawns server.py with the stub recorder
+#   python tools/bench_replay.py talk.wav --speed 4 --no-pace
+#   python tools/bench_replay.py --synth 60               # 60 s of generated audio instead of a WAV
+#   python tools/bench_replay.py talk.wav --url ws://host:8765 --metrics host:9765   # existing server
+#
+# Reports server CPU per audio second (session accounting on the side port), client-observed latency
+# from sending a chunk to receiving a patch/stable that covers it (caps "ts1" cap_ms echo), the
+# server's own stage latencies (last status), audio dropped and bytes/messages in both directions.
+
+import os
+import sys
+import json
+import time
+import wave
+import socket
+import struct
+import asyncio
+import argparse
+import secrets
+import subprocess
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import wire_codec  # noqa: E402
+import latency_hist  # noqa: E402
+
+TS1_MAGIC = b"VTs1"
+_F64_LE = struct.Struct("<d")
+
+STUB_FACTORY = "tools.stub_recorder:StubRecorder"
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Audio
+# ──────────────────────────────────────────────────────────────────────────────
+def read_wav(path: str) -> Tuple[np.ndarray, int]:
+    """int16 mono samples + rate (first channel of multi-channel files)."""
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise SystemExit(f"{path}: only 16-bit PCM WAV is supported")
+        sr, ch = w.getframerate(), w.getnchannels()
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+    if ch > 1:
+        pcm = pcm[::ch]
+    return pcm.copy(), sr
+
+
+def synth_audio(seconds: float, sr: int = 48000, seed: int = 1) -> np.ndarray:
+    """Speech-like test signal: noise bursts under a slow envelope (not silence, not a pure tone)."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / float(sr)
+    env = 0.5 + 0.5 * np.sin(2 * np.pi * 3.0 * t) * np.sin(2 * np.pi * 0.2 * t)
+    x = rng.standard_normal(t.size) * 0.15 * env + 0.1 * np.sin(2 * np.pi * 180.0 * t)
+    return (np.clip(x, -1.0, 1.0) * 32767).astype("<i2")
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Server process
+# ──────────────────────────────────────────────────────────────────────────────
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(env: Dict[str, str], log_path: Optional[str] = None, ready_timeout: float = 60.0):
+    """Start server.py (stub recorder unless env overrides it); returns (proc, ws_url, metrics_addr)."""
+    ws_port, m_port = free_port(), free_port()
+    full = dict(os.environ)
+    full.update({
+        "STT_RECORDER_FACTORY": STUB_FACTORY, "REQUIRE_GPU": "0", "STT_DEVICE": "cpu",
+        "WS_HOST": "127.0.0.1", "WS_PORT": str(ws_port), "METRICS_HOST": "127.0.0.1", "METRICS_PORT": str(m_port),
+        "TXT_SAVE_ENABLE": "0", "LOG_LEVEL": "INFO", "LOG_TO_FILE": "0", "WARMUP_SILENCE_SEC": "0",
+    })
+    full.update(env)
+    out = open(log_path, "ab") if log_path else subprocess.DEVNULL
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py")], cwd=ROOT, env=full,
+                            stdout=out, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + ready_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"server.py exited with {proc.returncode} (see {log_path or 'server log'})")
+        try:
+            with socket.create_connection(("127.0.0.1", ws_port), timeout=0.2):
+                return proc, f"ws://127.0.0.1:{ws_port}", f"127.0.0.1:{m_port}"
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit("server.py did not open its port in time")
+
+
+def stop_server(proc):
+    if proc is None or proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def http_get(addr: str, path: str, token: str = "") -> Tuple[int, str]:
+    req = urllib.request.Request(f"http://{addr}{path}")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=5) as r:
+            return r.status, r.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode("utf-8", "replace")
+    except OSError as e:
+        return 0, repr(e)
+
+
+def prom_values(text: str, names: List[str]) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for ln in text.splitlines():
+        if ln.startswith("#") or " " not in ln:
+            continue
+        k, _sp, v = ln.rpartition(" ")
+        if k in names:
+            out[k] = float(v)
+    return out
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Client
+# ──────────────────────────────────────────────────────────────────────────────
+class ClientStats:
+    def __init__(self):
+        self.sent_bytes = 0
+        self.sent_chunks = 0
+        self.audio_sec = 0.0
+        self.recv_bytes = 0
+        self.recv_msgs: Dict[str, int] = {}
+        self.latency = latency_hist.LatencyHistogram()      # chunk sent -> patch/stable covering it
+        self.errors: List[str] = []
+        self.last_status: Dict[str, Any] = {}
+        self.t_open = 0.0
+        self.t_first_patch = 0.0
+        self.wall_sec = 0.0
+        self.closed = ""
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "audio_sec": round(self.audio_sec, 3), "wall_sec": round(self.wall_sec, 3),
+            "sent_bytes": self.sent_bytes, "sent_chunks": self.sent_chunks,
+            "recv_bytes": self.recv_bytes, "recv_msgs": dict(self.recv_msgs),
+            "first_patch_ms": round((self.t_first_patch - self.t_open) * 1000.0, 1) if self.t_first_patch else None,
+            "latency_ms": self.latency.summary(), "errors": list(self.errors), "closed": self.closed,
+        }
+
+
+def _decode(msg) -> Optional[Dict[str, Any]]:
+    try:
+        return wire_codec.decode(msg) if isinstance(msg, (bytes, bytearray)) else json.loads(msg)
+    except Exception:
+        return None
+
+
+async def stream_session(url: str, pcm: np.ndarray, sr: int, chunk_ms: Optional[float] = 20.0, speed: float = 1.0,
+                         caps: str = "ts1,patch_batch", drain_sec: float = 15.0,
+                         stats: Optional[ClientStats] = None, open_timeout: float = 10.0) -> ClientStats:
+    """
+    Stream int16 mono pcm as binary frames paced at speed x real time; collect what comes back.
+    chunk_ms=None sizes chunks from the hello hint (hint_client_frame_48k, scaled to sr).
+    """
+    st = stats or ClientStats()
+    sep = "&" if "?" in url else "?"
+    st.t_open = time.monotonic()
+    try:
+        ws = await asyncio.wait_for(websockets.connect(f"{url}{sep}caps={caps}", max_size=None), open_timeout)
+    except Exception as e:
+        st.errors.append(f"connect: {e!r}")
+        st.closed = "connect-failed"
+        return st
+
+    def _on_msg(msg) -> Optional[Dict[str, Any]]:
+        st.recv_bytes += len(msg)
+        obj = _decode(msg)
+        if obj is None:
+            return None
+        typ = str(obj.get("type", "?"))
+        st.recv_msgs[typ] = st.recv_msgs.get(typ, 0) + 1
+        if typ in {"patch", "stable"}:
+            cap = obj.get("cap_ms")
+            if isinstance(cap, (int, float)):
+                st.latency.record(time.time() * 1000.0 - cap)
+            if typ == "patch" and not st.t_first_patch:
+                st.t_first_patch = time.monotonic()
+        elif typ == "status":
+            st.last_status.update(obj.get("detail") or {})
+        elif typ == "error":
+            st.errors.append(str(obj.get("code") or obj.get("error")))
+        return obj
+
+    # first message: hello (or BUSY / auth error right away)
+    hint = 960
+    try:
+        first = _on_msg(await asyncio.wait_for(ws.recv(), open_timeout))
+        if first and first.get("type") == "hello":
+            hint = int((first.get("detail") or {}).get("hint_client_frame_48k") or hint)
+        elif first and first.get("type") == "error":
+            await ws.close()
+            st.closed = "rejected"
+            st.wall_sec = time.monotonic() - st.t_open
+            return st
+    except asyncio.TimeoutError:
+        st.errors.append("no-hello")
+    except websockets.exceptions.ConnectionClosed as e:
+        st.closed = f"closed {getattr(e, 'code', '')}".strip()
+        st.wall_sec = time.monotonic() - st.t_open
+        return st
+    if chunk_ms is None:
+        chunk_ms = hint / 48.0
+    chunk = max(1, int(sr * chunk_ms / 1000.0))
+
+    async def _reader():
+        try:
+            async for msg in ws:
+                _on_msg(msg)
+        except websockets.exceptions.ConnectionClosed as e:
+            st.closed = f"closed {getattr(e, 'code', '')}".strip()
+        else:
+            st.closed = st.closed or "closed"
+
+    reader = asyncio.create_task(_reader())
+    try:
+        await ws.send(json.dumps({"event": "start", "sample_rate": sr, "dtype": "i16", "caps": caps.split(",")}))
+        step = chunk_ms / 1000.0 / max(1e-6, speed)
+        t_next = time.monotonic()
+        for off in range(0, pcm.size, chunk):
+            if reader.done():
+                break
+            body = pcm[off:off + chunk].tobytes()
+            frame = TS1_MAGIC + _F64_LE.pack(time.time() * 1000.0) + body if "ts1" in caps else body
+            await ws.send(frame)
+            st.sent_bytes += len(frame)
+            st.sent_chunks += 1
+            st.audio_sec += (len(body) // 2) / float(sr)
+            t_next += step
+            delay = t_next - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if not reader.done():
+            await ws.send(json.dumps({"event": "stop"}))
+        await asyncio.wait_for(asyncio.shield(reader), drain_sec)
+    except asyncio.TimeoutError:
+        st.closed = st.closed or "drain-timeout"
+    except websockets.exceptions.ConnectionClosed as e:
+        st.closed = f"closed {getattr(e, 'code', '')}".strip()
+    finally:
+        st.wall_sec = time.monotonic() - st.t_open
+        await ws.close()
+        reader.cancel()
+    return st
+
+
+def server_summary(metrics_addr: str, token: str = "", wait_sec: float = 10.0) -> Dict[str, Any]:
+    """Per-user accounting totals (GET /sessions) once the session closed, plus drop counters (/metrics)."""
+    acct: Dict[str, Any] = {}
+    deadline = time.monotonic() + wait_sec
+    while time.monotonic() < deadline:
+        code, body = http_get(metrics_addr, "/sessions", token)
+        if code in (401, 404):   # /sessions is only served with ADMIN_TOKEN set
+            break
+        if code == 200:
+            snap = json.loads(body)
+            if not snap.get("active") and snap.get("users"):
+                acct = snap["users"]
+                break
+        time.sleep(0.2)
+    _code, prom = http_get(metrics_addr, "/metrics")
+    drops = prom_values(prom, ["stt_queue_drops_total", "stt_buffer_trims_total",
+                               "stt_buffer_trimmed_seconds_total", "stt_frames_fed_total",
+                               "stt_patches_sent_total", "stt_stables_sent_total"])
+    return {"users": acct, "metrics": drops}
+
+
+def report(st: ClientStats, srv: Dict[str, Any], speed: float) -> Dict[str, Any]:
+    users = srv.get("users") or {}
+    tot: Dict[str, Any] = {}
+    for t in users.values():
+        for k, v in t.items():
+            if isinstance(v, (int, float)):
+                tot[k] = tot.get(k, 0) + v
+    audio = tot.get("audio_in_sec") or st.audio_sec
+    return {
+        "speed": speed,
+        "client": st.as_dict(),
+        "server": {
+            "cpu_sec": tot.get("cpu_sec"),
+            "cpu_ms_per_audio_sec": round(tot["cpu_sec"] / audio * 1000.0, 2) if tot.get("cpu_sec") and audio else None,
+            "audio_in_sec": tot.get("audio_in_sec"), "audio_fed_sec": tot.get("audio_fed_sec"),
+            "dropped_queue_sec": tot.get("dropped_queue_sec"), "dropped_trim_sec": tot.get("dropped_trim_sec"),
+            "inference_sec": tot.get("inference_sec"), "bytes_out": tot.get("bytes_out"),
+            "metrics": srv.get("metrics"),
+            "latency_ms": st.last_status.get("latency"),
+        },
+    }
+
+
+def _print(rep: Dict[str, Any]):
+    c, s = rep["client"], rep["server"]
+    lat = c["latency_ms"]
+    print(f"audio {c['audio_sec']:.1f}s at {rep['speed']}x in {c['wall_sec']:.1f}s wall | closed: {c['closed']}")
+    print(f"server cpu {s['cpu_sec']}s = {s['cpu_ms_per_audio_sec']} ms per audio second"
+          f" | fed {s['audio_fed_sec']}s | dropped queue {s['dropped_queue_sec']}s trim {s['dropped_trim_sec']}s")
+    print(f"client latency (send -> patch/stable) n={lat['n']} p50={lat['p50']} p90={lat['p90']} "
+          f"p99={lat['p99']} max={lat['max']} ms | first patch {c['first_patch_ms']} ms")
+    for stage, h in (s.get("latency_ms") or {}).items():
+        if h.get("n"):
+            print(f"  server {stage:<16} n={h['n']:<6} p50={h['p50']:<8} p90={h['p90']:<8} p99={h['p99']:<8} max={h['max']}")
+    print(f"sent {c['sent_bytes']} B in {c['sent_chunks']} chunks | received {c['recv_bytes']} B {c['recv_msgs']}")
+    if c["errors"]:
+        print(f"errors: {c['errors']}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("wav", nargs="?", help="16-bit PCM WAV (any rate; first channel used)")
+    ap.add_argument("--synth", type=float, default=0.0, help="generate N seconds of 48 kHz audio instead")
+    ap.add_argument("--speed", type=float, default=1.0, help="send at N x real time")
+    ap.add_argument("--chunk-ms", type=float, default=None, help="client frame (default: hello hint_client_frame_48k)")
+    ap.add_argument("--caps", default="ts1,patch_batch")
+    ap.add_argument("--no-pace", action="store_true", help="server FORCE_REALTIME_PACE=0 (needed for speed > 1 without trims)")
+    ap.add_argument("--env", action="append", default=[], help="extra server env K=V (e.g. STUB_INFER_MS=80)")
+    ap.add_argument("--url", default="", help="use a running server instead of spawning one")
+    ap.add_argument("--metrics", default="", help="side port host:port of --url server")
+    ap.add_argument("--token", default=os.getenv("ADMIN_TOKEN", ""), help="Bearer for /sessions of an --url server")
+    ap.add_argument("--server-log", default="", help="append spawned server output here")
+    ap.add_argument("--json", action="store_true")
+    a = ap.parse_args()
+
+    if a.wav:
+        pcm, sr = read_wav(a.wav)
+    elif a.synth > 0:
+        sr = 48000
+        pcm = synth_audio(a.synth, sr)
+    else:
+        ap.error("give a WAV file or --synth SECONDS")
+
+    proc = None
+    url, metrics = a.url, a.metrics
+    if not url:
+        env = dict(kv.split("=", 1) for kv in a.env)
+        if a.no_pace:
+            env["FORCE_REALTIME_PACE"] = "0"
+        a.token = env.setdefault("ADMIN_TOKEN", a.token or secrets.token_hex(8))   # enables /sessions
+        proc, url, metrics = spawn_server(env, a.server_log or None)
+    try:
+        st = asyncio.run(stream_session(url, pcm, sr, a.chunk_ms, a.speed, a.caps))
+        srv = server_summary(metrics, a.token) if metrics else {}
+    finally:
+        stop_server(proc)
+
+    rep = report(st, srv, a.speed)
+    if a.json:
+        print(json.dumps(rep, indent=2))
+    else:
+        _print(rep)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# tools/bench_tail.py
+# Consuming a growing TXT_SAVE feed: naive "re-read whole file every poll" vs txt_tail.TailFollower.
+#
+#   python tools/bench_tail.py [--lines 20000] [--rate 400] [--poll 0.05]
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from txt_tail import TailFollower  # noqa: E402
+
+LINE = "So the next thing we want to look at is how the gradient flows through the network."
+
+
+def _writer(path: str, n: int, rate: float, done: threading.Event):
+    with open(path, "a", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(f"{time.time():.6f}\t{LINE}\n")
+            f.flush()
+            time.sleep(1.0 / rate)
+    done.set()
+
+
+def _lag_ms(line: str) -> float:
+    return (time.time() - float(line.partition("\t")[0])) * 1000.0
+
+
+async def _naive(path: str, n: int, poll: float, lags: list):
+    seen = 0
+    bytes_read = 0
+    reads = 0
+    while seen < n:
+        with open(path, "r", encoding="utf-8") as f:
+            data = f.read()
+        reads += 1
+        bytes_read += len(data.encode("utf-8"))
+        lines = [ln for ln in data.split("\n")[:-1]]
+        for ln in lines[seen:]:
+            lags.append(_lag_ms(ln))
+        seen = max(seen, len(lines))
+        if seen < n:
+            await asyncio.sleep(poll)
+    return bytes_read, reads
+
+
+async def _follow(path: str, n: int, poll: float, lags: list, inotify: bool):
+    seen = 0
+    async with TailFollower(path, from_start=True, skip_comments=False, poll_sec=poll,
+                            use_inotify=inotify) as tail:
+        async for ln in tail:
+            lags.append(_lag_ms(ln))
+            seen += 1
+            if seen >= n:
+                break
+    return tail.bytes_read, tail.wakeups
+
+
+async def _run(kind: str, n: int, rate: float, poll: float):
+    d = tempfile.mkdtemp()
+    path = os.path.join(d, "en_feed_current_bench.txt")
+    open(path, "w").close()
+    done = threading.Event()
+    th = threading.Thread(target=_writer, args=(path, n, rate, done), daemon=True)
+
+    lags: list = []
+    c0 = time.process_time()
+    th.start()
+    if kind == "naive":
+        nbytes, wakes = await _naive(path, n, poll, lags)
+    else:
+        nbytes, wakes = await _follow(path, n, poll, lags, inotify=(kind == "inotify"))
+    th.join()
+    cpu = time.process_time() - c0
+    lags.sort()
+    p50 = lags[len(lags) // 2]
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    return cpu, nbytes, os.path.getsize(path), wakes, p50, p99
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=20000)
+    ap.add_argument("--rate", type=float, default=400.0, help="lines/s written")
+    ap.add_argument("--poll", type=float, default=0.05)
+    a = ap.parse_args()
+
+    print(f"{'reader':<8} {'cpu s':>7} {'bytes read':>12} {'file bytes':>11} {'wakeups':>8} {'lag p50':>8} {'lag p99':>8}")
+    for kind in ("naive", "poll", "inotify"):
+        cpu, nbytes, size, wakes, p50, p99 = asyncio.run(_run(kind, a.lines, a.rate, a.poll))
+        print(f"{kind:<8} {cpu:>7.2f} {nbytes:>12} {size:>11} {wakes:>8} {p50:>7.1f}ms {p99:>7.1f}ms")
+    print("(cpu includes the writer thread, identical in all runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# tools/bench_txt_commit.py
+# Per-stable cost of the TXT_SAVE sentence commit on a growing transcript:
+#   old: split_sentences_and_tail(full) on every stable (O(transcript))
+#   new: SentenceCommitter.update(full) (scans only after the committed boundary)
+#
+#   python tools/bench_txt_commit.py [--hours 3] [--stable-every 0.5]
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transcript_text  # noqa: E402
+
+WORDS = ("so the model we trained last week actually converges much faster when the learning rate "
+         "is warmed up properly and that is what we are going to look at next").split()
+
+
+def _stream(hours: float, stable_every: float, wpm: float = 150.0):
+    rnd = random.Random(7)
+    n_stables = int(hours * 3600 / stable_every)
+    words_per_stable = wpm / 60.0 * stable_every
+    full = ""
+    carry = 0.0
+    for _ in range(n_stables):
+        carry += words_per_stable
+        while carry >= 1.0:
+            carry -= 1.0
+            w = rnd.choice(WORDS)
+            if rnd.random() < 0.07:
+                w += "."
+            full = (full + " " + w) if full else w
+        yield full
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--hours", type=float, default=3.0)
+    ap.add_argument("--stable-every", type=float, default=0.5)
+    ap.add_argument("--report-every-min", type=float, default=30.0)
+    a = ap.parse_args()
+
+    split = transcript_text.split_sentences_and_tail
+    committer = transcript_text.SentenceCommitter()
+    written = 0
+    per_report = int(a.report_every_min * 60 / a.stable_every)
+
+    t_old = t_new = 0.0
+    n = 0
+    print(f"{'minute':>7} {'chars':>9} {'old us/stable':>14} {'new us/stable':>14}")
+    for full in _stream(a.hours, a.stable_every):
+        t0 = time.perf_counter()
+        sents, _tail = split(full)
+        target = max(0, len(sents) - 1)
+        if target > written:
+            _ = sents[written:target]
+            written = target
+        t1 = time.perf_counter()
+        committer.update(full)
+        t2 = time.perf_counter()
+
+        t_old += t1 - t0
+        t_new += t2 - t1
+        n += 1
+        if n % per_report == 0:
+            print(f"{n * a.stable_every / 60:>7.0f} {len(full):>9} {t_old / per_report * 1e6:>14.1f} {t_new / per_report * 1e6:>14.1f}")
+            t_old = t_new = 0.0
+
+
+if __name__ == "__main__":
+    main()
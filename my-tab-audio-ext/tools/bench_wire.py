@@ -0,0 +1,64 @@
+# tools/bench_wire.py
+# Encode/decode cost and size of stable frames: JSON text vs wire_codec "bin1", and which one the
+# server sends (wire_codec.prefer_binary with WIRE_BIN_MIN_CHARS).
+#
+#   python tools/bench_wire.py [--n 20000]
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wire_codec  # noqa: E402
+
+SENT = "So the next thing we want to look at is how the gradient flows through the network, right? "
+
+
+def _samples():
+    stable_delta = {"type": "stable", "seq": 88, "t_ms": 1760000000456, "off": 41000, "append": SENT[:60],
+                    "len": 41060, "base_crc": 3735928559, "crc": 1234567890, "cap_ms": 1760000000123.5}
+    out = [("stable_delta", stable_delta)]
+    for n in (256, 1024, 4096, 40960):
+        text = (SENT * (n // len(SENT) + 1))[:n]
+        out.append((f"stable_full_{n // 1024}k" if n >= 1024 else f"stable_full_{n}",
+                    {"type": "stable", "seq": 88, "t_ms": 1760000000456, "full": text, "ckpt": True,
+                     "len": n, "crc": 1234567890, "cap_ms": 1760000000123.5}))
+    return out
+
+
+def _bench(fn, arg, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn(arg)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000)
+    ap.add_argument("--min-chars", type=int, default=wire_codec.MIN_TEXT_CHARS, help="server WIRE_BIN_MIN_CHARS")
+    a = ap.parse_args()
+
+    print(f"{'message':<16} {'json B':>8} {'bin B':>8} {'json enc us':>12} {'bin enc us':>11} "
+          f"{'json dec us':>12} {'bin dec us':>11}  sent as")
+    for name, obj in _samples():
+        n = a.n if len(obj.get("full") or "") < 4096 else max(200, a.n // 50)
+        js = json.dumps(obj, ensure_ascii=False)
+        bn = wire_codec.encode(obj)
+        assert wire_codec.decode(bn) == obj, name
+
+        enc_j = _bench(lambda o: json.dumps(o, ensure_ascii=False).encode("utf-8"), obj, n)
+        enc_b = _bench(wire_codec.encode, obj, n)
+        dec_j = _bench(json.loads, js, n)
+        dec_b = _bench(wire_codec.decode, bn, n)
+        sent = "bin1" if wire_codec.prefer_binary(obj, a.min_chars) else "json"
+        print(f"{name:<16} {len(js.encode('utf-8')):>8} {len(bn):>8} {enc_j:>12.2f} {enc_b:>11.2f} "
+              f"{dec_j:>12.2f} {dec_b:>11.2f}  {sent}")
+    print("(patch and status frames are always JSON)")
+
+
+if __name__ == "__main__":
+    main()
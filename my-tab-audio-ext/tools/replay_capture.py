@@ -0,0 +1,342 @@
+# tools/replay_capture.py
+# Inspect, replay and diff traffic captures written by server.py (TRAFFIC_CAPTURE_DIR, traffic_capture.py).
+#
+#   python tools/replay_capture.py info captures/x.vtcap
+#   python tools/replay_capture.py replay captures/x.vtcap                 # virtual time, in-process stub
+#   python tools/replay_capture.py replay captures/x.vtcap --speed 4 --save /tmp/r.vtcap
+#   python tools/replay_capture.py replay captures/x.vtcap --wall          # spawned stub server.py, real time
+#   python tools/replay_capture.py replay captures/x.vtcap --url ws://127.0.0.1:8765   # running server
+#   python tools/replay_capture.py diff a.vtcap b.vtcap
+#
+# replay sends the captured inbound frames (same chunking, bursts, JSON/binary mix, handshake query)
+# on the captured schedule divided by --speed (or --asap), collects what the server sends back and
+# diffs it against the captured outbound messages. ts1 capture stamps are shifted by the replay's
+# time offset so latency stages stay meaningful. Outputs are compared after dropping volatile fields
+# (timestamps, status/hello details, pong times).
+#
+# By default server.handler runs in this process on a sim_clock.VirtualTimeLoop with
+# stub_recorder:LoopStubRecorder (like tools/sim_stream.py): frames arrive at their captured virtual
+# times and the stub's passes are loop timers, so a replay is deterministic -- the same capture, --speed
+# and STUB_* env give identical output, and --save files of two runs diff as identical. --speed changes
+# where the stub's passes fall relative to the audio, so runs at different speeds differ. Against a
+# capture recorded on wall time, and with --wall / --url (threaded recognizer, real scheduling) the
+# diff is approximate: expect the same transcript with differently split patches/stables.
+
+import os
+import sys
+import json
+import time
+import struct
+import asyncio
+import difflib
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+import websockets
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+import bench_replay as br  # noqa: E402
+import traffic_capture as tc  # noqa: E402
+import latency_hist  # noqa: E402
+import sim_clock  # noqa: E402
+
+TS1_MAGIC = b"VTs1"
+_F64_LE = struct.Struct("<d")
+
+# fields that differ between runs even when behaviour is identical
+_VOLATILE = {"t_ms", "cap_ms", "t0", "t1", "t2"}
+_DETAIL_ONLY_TYPE = {"status", "hello", "pong"}
+
+Records = List[Tuple[float, int, bytes]]
+
+
+def _obj(kind: int, payload: bytes) -> Optional[Dict[str, Any]]:
+    return br._decode(payload if kind == tc.OUT_BIN else payload.decode("utf-8", "replace"))
+
+
+def normalized_outbound(recs: Records) -> List[str]:
+    out = []
+    for _t, kind, payload in recs:
+        if kind not in (tc.OUT_TEXT, tc.OUT_BIN):
+            continue
+        obj = _obj(kind, payload)
+        if obj is None:
+            out.append("<undecodable>")
+            continue
+        typ = obj.get("type")
+        if typ in _DETAIL_ONLY_TYPE:
+            continue
+        out.append(json.dumps({k: v for k, v in obj.items() if k not in _VOLATILE}, sort_keys=True, ensure_ascii=False))
+    return out
+
+
+def summarize(recs: Records) -> Dict[str, Any]:
+    by_kind: Dict[str, List[int]] = {}
+    types: Dict[str, int] = {}
+    for _t, kind, payload in recs:
+        by_kind.setdefault(tc.KIND_NAMES.get(kind, str(kind)), []).append(len(payload))
+        if kind in (tc.OUT_TEXT, tc.OUT_BIN):
+            obj = _obj(kind, payload)
+            typ = str(obj.get("type")) if obj else "?"
+            types[typ] = types.get(typ, 0) + 1
+    ins = [t for t, k, _p in recs if k in (tc.IN_TEXT, tc.IN_BIN)]
+    burst = 0
+    j = 0
+    for i, t in enumerate(ins):       # most inbound frames within any 100 ms
+        while ins[j] < t - 0.1:
+            j += 1
+        burst = max(burst, i - j + 1)
+    sizes = sorted(by_kind.get("in_bin", []))
+    end = [p.decode("utf-8", "replace") for _t, k, p in recs if k == tc.END]
+    return {
+        "duration_sec": round(recs[-1][0], 3) if recs else 0.0,
+        "frames": {k: len(v) for k, v in by_kind.items()},
+        "bytes": {k: sum(v) for k, v in by_kind.items()},
+        "in_bin_size": {"min": sizes[0], "p50": sizes[len(sizes) // 2], "max": sizes[-1]} if sizes else None,
+        "max_inbound_per_100ms": burst,
+        "out_types": types,
+        "end": end[0] if end else None,
+    }
+
+
+def diff_outbound(a: Records, b: Records, show: int = 8) -> Dict[str, Any]:
+    na, nb = normalized_outbound(a), normalized_outbound(b)
+    sm = difflib.SequenceMatcher(a=na, b=nb, autojunk=False)
+    diffs = []
+    for op, i1, i2, j1, j2 in sm.get_opcodes():
+        if op == "equal":
+            continue
+        diffs.append({"op": op, "a_at": i1, "a": na[i1:i2][:2], "b_at": j1, "b": nb[j1:j2][:2]})
+        if len(diffs) >= show:
+            break
+    return {"messages": [len(na), len(nb)], "similarity": round(sm.ratio(), 4), "identical": na == nb,
+            "first_diffs": diffs}
+
+
+def _restamp(frame: bytes, shift_ms: float) -> bytes:
+    if frame[:4] == TS1_MAGIC and len(frame) >= 12:
+        return frame[:4] + _F64_LE.pack(_F64_LE.unpack_from(frame, 4)[0] + shift_ms) + frame[12:]
+    return frame
+
+
+async def replay(hdr: Dict[str, Any], recs: Records, url: str, speed: float = 1.0, asap: bool = False,
+                 quiet_sec: float = 3.0, save: str = "") -> Tuple[Records, Dict[str, Any]]:
+    """Send the captured inbound frames; returns (replay records in capture format, timing stats)."""
+    got: Records = []
+    lat = latency_hist.LatencyHistogram()
+    out_cap = tc.CaptureWriter(save, dict(hdr, replay_of=hdr.get("sess_id"), speed=speed)) if save else None
+    ws = await websockets.connect(url.rstrip("/") + (hdr.get("path") or "/"), max_size=None)
+    t0 = time.monotonic()
+    last_rx = [t0]
+
+    async def _reader():
+        try:
+            async for msg in ws:
+                now = time.monotonic()
+                last_rx[0] = now
+                kind = tc.OUT_BIN if isinstance(msg, (bytes, bytearray)) else tc.OUT_TEXT
+                payload = bytes(msg) if kind == tc.OUT_BIN else msg.encode("utf-8")
+                got.append((now - t0, kind, payload))
+                if out_cap is not None:
+                    out_cap.outbound(msg)
+                obj = _obj(kind, payload)
+                if obj and obj.get("type") in {"patch", "stable"} and isinstance(obj.get("cap_ms"), (int, float)):
+                    lat.record(time.time() * 1000.0 - obj["cap_ms"])
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    reader = asyncio.create_task(_reader())
+    # original recv wall time of record t is t0_wall + t: shift ts1 stamps by how much later we send it
+    t0_wall_orig = float(hdr.get("t0_wall") or 0.0)
+    sent = 0
+    try:
+        for t, kind, payload in recs:
+            if kind not in (tc.IN_TEXT, tc.IN_BIN):
+                continue
+            if not asap:
+                delay = t0 + t / max(1e-6, speed) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if reader.done():
+                break
+            if kind == tc.IN_BIN:
+                data: Any = _restamp(payload, time.time() * 1000.0 - (t0_wall_orig + t) * 1000.0)
+            else:
+                data = payload.decode("utf-8")
+            if out_cap is not None:
+                out_cap.inbound(data)
+            await ws.send(data)
+            sent += 1
+        # let the server finish (EOS tail, final stable) or go quiet
+        while not reader.done() and time.monotonic() - last_rx[0] < quiet_sec:
+            await asyncio.sleep(0.1)
+    except websockets.exceptions.ConnectionClosed:
+        pass
+    finally:
+        await ws.close()
+        try:
+            await asyncio.wait_for(reader, 2.0)
+        except asyncio.TimeoutError:
+            reader.cancel()
+        if out_cap is not None:
+            out_cap.close("replay")
+    got.append((time.monotonic() - t0, tc.END, b"replay"))
+    return got, {"sent": sent, "wall_sec": round(time.monotonic() - t0, 3), "latency_ms": lat.summary()}
+
+
+async def replay_virtual(server, clock: sim_clock.VirtualClock, hdr: Dict[str, Any], recs: Records,
+                         speed: float = 1.0, asap: bool = False, quiet_sec: float = 3.0, save: str = "",
+                         max_drain_sec: float = 60.0) -> Tuple[Records, Dict[str, Any]]:
+    """replay() against server.handler on the running VirtualTimeLoop (server._CLOCK is clock)."""
+    from sim_stream import SimWebSocket
+
+    loop = asyncio.get_running_loop()
+    got: Records = []
+    lat = latency_hist.LatencyHistogram()
+    out_cap = (tc.CaptureWriter(save, dict(hdr, replay_of=hdr.get("sess_id"), speed=speed), clock=clock)
+               if save else None)
+    t0 = loop.time()
+    wall0 = time.perf_counter()
+    last_rx = [t0]
+
+    def _on_send(msg):
+        last_rx[0] = loop.time()
+        kind = tc.OUT_BIN if isinstance(msg, (bytes, bytearray)) else tc.OUT_TEXT
+        payload = bytes(msg) if kind == tc.OUT_BIN else msg.encode("utf-8")
+        got.append((last_rx[0] - t0, kind, payload))
+        if out_cap is not None:
+            out_cap.outbound(msg)
+        obj = _obj(kind, payload)
+        if obj and obj.get("type") in {"patch", "stable"} and isinstance(obj.get("cap_ms"), (int, float)):
+            lat.record(clock.time() * 1000.0 - obj["cap_ms"])
+
+    ws = SimWebSocket(hdr.get("path") or "/", _on_send, 0.02)
+    srv = asyncio.create_task(server.handler(ws))
+    t0_wall_orig = float(hdr.get("t0_wall") or 0.0)
+    sent = 0
+    for t, kind, payload in recs:
+        if kind not in (tc.IN_TEXT, tc.IN_BIN):
+            continue
+        if not asap:
+            delay = t0 + t / max(1e-6, speed) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if srv.done():
+            break
+        if kind == tc.IN_BIN:
+            data: Any = _restamp(payload, clock.time() * 1000.0 - (t0_wall_orig + t) * 1000.0)
+        else:
+            data = payload.decode("utf-8")
+        if out_cap is not None:
+            out_cap.inbound(data)
+        ws.client_send(data)
+        sent += 1
+        await asyncio.sleep(0)      # let the handler take it before the next frame at the same time
+    t_end = loop.time()
+    while not srv.done() and loop.time() - last_rx[0] < quiet_sec and loop.time() - t_end < max_drain_sec:
+        await asyncio.sleep(0.1)
+    await ws.close()
+    try:
+        await asyncio.wait_for(srv, 30.0)
+    except asyncio.TimeoutError:
+        srv.cancel()
+    if out_cap is not None:
+        out_cap.close("replay")
+        out_cap._thread.join(10.0)
+    got.append((loop.time() - t0, tc.END, b"replay"))
+    return got, {"sent": sent, "sim_sec": round(loop.time() - t0, 3),
+                 "wall_sec": round(time.perf_counter() - wall0, 3), "latency_ms": lat.summary()}
+
+
+def _replay_in_process(hdr: Dict[str, Any], recs: Records, env: Dict[str, str], speed: float, asap: bool,
+                       save: str) -> Tuple[Records, Dict[str, Any]]:
+    os.environ.update({"STT_RECORDER_FACTORY": "stub_recorder:LoopStubRecorder", "REQUIRE_GPU": "0",
+                       "STT_DEVICE": "cpu", "LOG_LEVEL": "WARNING", "TXT_SAVE_ENABLE": "0",
+                       "LOG_TO_FILE": "0", "WARMUP_SILENCE_SEC": "0",
+                       "TRAFFIC_CAPTURE_DIR": "", "REQUIRE_AUTH": "0"})
+    os.environ.update(env)
+    import server  # noqa: E402  (reads its config from the environment at import)
+
+    server._ensure_warmup().result(timeout=120)   # recorder class before the virtual loop starts
+    clock = sim_clock.VirtualClock(start_wall=float(hdr.get("t0_wall") or 0.0) or None)
+    server._CLOCK = clock
+    return sim_clock.run(replay_virtual(server, clock, hdr, recs, speed, asap, save=save), clock)
+
+
+def _last_out_t(recs: Records) -> float:
+    ts = [t for t, k, _p in recs if k in (tc.OUT_TEXT, tc.OUT_BIN)]
+    return ts[-1] if ts else 0.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("info")
+    p.add_argument("capture")
+    p = sub.add_parser("replay")
+    p.add_argument("capture")
+    p.add_argument("--speed", type=float, default=1.0)
+    p.add_argument("--asap", action="store_true", help="ignore captured timing")
+    p.add_argument("--url", default="", help="running server (default: in-process stub on virtual time)")
+    p.add_argument("--wall", action="store_true", help="spawn server.py with the stub recorder, real time")
+    p.add_argument("--env", action="append", default=[], help="extra server env K=V")
+    p.add_argument("--save", default="", help="write the replay's traffic as a capture (for diff)")
+    p.add_argument("--server-log", default="")
+    p.add_argument("--json", action="store_true")
+    p = sub.add_parser("diff")
+    p.add_argument("a")
+    p.add_argument("b")
+    a = ap.parse_args()
+
+    if a.cmd == "info":
+        hdr, recs = tc.read_capture(a.capture)
+        print(json.dumps({"header": hdr, **summarize(recs)}, indent=2, ensure_ascii=False))
+        return
+    if a.cmd == "diff":
+        (_ha, ra), (_hb, rb) = tc.read_capture(a.a), tc.read_capture(a.b)
+        print(json.dumps({"a": summarize(ra), "b": summarize(rb), "diff": diff_outbound(ra, rb)},
+                         indent=2, ensure_ascii=False))
+        return
+
+    hdr, recs = tc.read_capture(a.capture)
+    env = dict(kv.split("=", 1) for kv in a.env)
+    if "force_realtime_pace" in hdr:
+        env.setdefault("FORCE_REALTIME_PACE", "1" if hdr["force_realtime_pace"] else "0")
+    if not a.url and not a.wall:
+        got, timing = _replay_in_process(hdr, recs, env, a.speed, a.asap, a.save)
+    else:
+        proc = None
+        url = a.url
+        if not url:
+            proc, url, _metrics = br.spawn_server(env, a.server_log or None)
+        try:
+            got, timing = asyncio.run(replay(hdr, recs, url, a.speed, a.asap, save=a.save))
+        finally:
+            br.stop_server(proc)
+
+    rep = {
+        "timing": dict(timing, captured_last_out_sec=round(_last_out_t(recs), 3),
+                       replay_last_out_sec=round(_last_out_t(got), 3)),
+        "captured": summarize(recs), "replayed": summarize(got), "diff": diff_outbound(recs, got),
+    }
+    if a.json:
+        print(json.dumps(rep, indent=2, ensure_ascii=False))
+        return
+    d, tm = rep["diff"], rep["timing"]
+    took = f"{tm['sim_sec']}s simulated ({tm['wall_sec']}s wall)" if "sim_sec" in tm else f"{tm['wall_sec']}s"
+    print(f"sent {tm['sent']} frames in {took} | last output at {tm['replay_last_out_sec']}s "
+          f"(captured {tm['captured_last_out_sec']}s)")
+    print(f"outbound types captured {rep['captured']['out_types']} replayed {rep['replayed']['out_types']}")
+    lat = tm["latency_ms"]
+    print(f"replay latency send->patch/stable n={lat['n']} p50={lat['p50']} p99={lat['p99']} max={lat['max']} ms")
+    print(f"transcript messages {d['messages'][0]} vs {d['messages'][1]}: similarity {d['similarity']}"
+          f"{' (identical)' if d['identical'] else ''}")
+    for x in d["first_diffs"]:
+        print(f"  {x['op']} @{x['a_at']}/{x['b_at']}: {x['a']} -> {x['b']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# tools/sim_stream.py
+# Virtual-time simulation of one long streaming session through server.handler (in-process, no sockets).
+#
+#   python tools/sim_stream.py --minutes 60                    # an hour of audio, as fast as the CPU allows
+#   python tools/sim_stream.py --minutes 480 --checkpoints 16 --json
+#   python tools/sim_stream.py --minutes 30 --chunk-ms 100 --env FORCE_REALTIME_PACE=0 --env STUB_REWRITE_P=0.4
+#   python tools/sim_stream.py --minutes 60 --utterance-sec 8  # short utterances: bounded live text
+#
+# server.py runs on a sim_clock.VirtualTimeLoop with server._CLOCK set to the loop's VirtualClock, so
+# the pacer, patch rate limiter, MIN_REWRITE_INTERVAL_MS, idle timeout, status timers and TXT throttles
+# all see simulated time. The recognizer is stub_recorder.LoopStubRecorder (STUB_* knobs), by default
+# speaking one utterance for the whole run so the stable transcript keeps growing; the client is
+# an in-memory websocket sending ts1-stamped 16-bit PCM every --chunk-ms of simulated time (a short
+# synthetic clip, looped). Each checkpoint row shows the CPU seconds spent per simulated minute in that
+# interval -- a column that keeps growing is a super-linear cost -- next to messages/bytes sent, the
+# transcript size (stable / shown = stable + live edits), queue/trim drops, client latency percentiles (simulated ms) and RSS.
+# CPU time is real; latency only includes simulated delays (pacing, STUB_INFER_MS, --rtt-ms).
+
+import os
+import sys
+import json
+import time
+import types
+import asyncio
+import argparse
+from typing import Any, Callable, Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+import websockets  # noqa: E402
+
+import bench_replay as br  # noqa: E402
+import latency_hist  # noqa: E402
+import sim_clock  # noqa: E402
+
+try:
+    import psutil  # type: ignore
+except Exception:
+    psutil = None
+
+_COUNTERS = ["stt_queue_drops_total", "stt_buffer_trimmed_seconds_total"]
+
+
+class SimWebSocket:
+    """The part of websockets' server connection that server.handler uses, in memory."""
+
+    def __init__(self, path: str, on_send: Callable[[Any], None], rtt_sec: float):
+        self.remote_address = ("sim", 1)
+        self.path = path
+        self.request = types.SimpleNamespace(path=path)
+        self.transport = None
+        self.closed: Optional[tuple] = None
+        self._in: asyncio.Queue = asyncio.Queue()
+        self._on_send = on_send
+        self._rtt_sec = rtt_sec
+
+    # ---- server side ----
+    async def recv(self):
+        msg = await self._in.get()
+        if msg is None:
+            raise websockets.exceptions.ConnectionClosedOK(None, None)
+        return msg
+
+    async def send(self, data):
+        if self.closed is not None:
+            raise websockets.exceptions.ConnectionClosedOK(None, None)
+        self._on_send(data)
+
+    async def ping(self):
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        loop.call_later(self._rtt_sec, lambda: waiter.done() or waiter.set_result(self._rtt_sec))
+        return waiter
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        if self.closed is None:
+            self.closed = (code, reason)
+            self._in.put_nowait(None)
+
+    # ---- client side ----
+    def client_send(self, msg):
+        if self.closed is None:
+            self._in.put_nowait(msg)
+
+
+class _Client:
+    def __init__(self, clock: sim_clock.VirtualClock):
+        self.clock = clock
+        self.msgs: Dict[str, int] = {}
+        self.bytes = 0
+        self.errors: List[str] = []
+        self.hint = 960
+        self.hello = asyncio.Event()
+        self.latency = latency_hist.LatencyHistogram()
+        self.stable_len = 0
+        self.shown_len = 0      # full transcript as displayed: stable text, then patches edit its end
+
+    def on_msg(self, msg):
+        self.bytes += len(msg)
+        obj = br._decode(msg)
+        if obj is None:
+            return
+        typ = str(obj.get("type", "?"))
+        self.msgs[typ] = self.msgs.get(typ, 0) + 1
+        if typ == "hello":
+            self.hint = int((obj.get("detail") or {}).get("hint_client_frame_48k") or self.hint)
+            self.hello.set()
+        elif typ == "error":
+            self.errors.append(str(obj.get("code") or obj.get("error")))
+            self.hello.set()
+        elif typ in {"patch", "stable"}:
+            cap = obj.get("cap_ms")
+            if isinstance(cap, (int, float)):
+                self.latency.record(self.clock.time() * 1000.0 - cap)
+            if typ == "stable":
+                # the server rebases its live text on the stable snapshot (last_emitted = snap)
+                n = obj.get("len")
+                if not isinstance(n, int) and isinstance(obj.get("full"), str):
+                    n = len(obj["full"])
+                if isinstance(n, int):
+                    self.stable_len = self.shown_len = n
+            else:
+                self.shown_len = max(0, self.shown_len - int(obj.get("delete") or 0)) + len(obj.get("insert") or "")
+
+
+def _rss_mb() -> Optional[float]:
+    if psutil is None:
+        return None
+    return round(psutil.Process().memory_info().rss / 1048576.0, 1)
+
+
+async def simulate(server, clock: sim_clock.VirtualClock, seconds: float, checkpoints: int,
+                   chunk_ms: Optional[float], caps: str, rtt_ms: float, drain_sec: float,
+                   on_row: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    cl = _Client(clock)
+    ws = SimWebSocket(f"/?caps={caps}", cl.on_msg, rtt_ms / 1000.0)
+    srv = asyncio.create_task(server.handler(ws))
+
+    await asyncio.wait_for(cl.hello.wait(), 60.0)
+    if cl.errors:
+        return {"errors": cl.errors}
+    sr = 48000
+    chunk_ms = chunk_ms or cl.hint / 48.0
+    chunk = max(1, int(sr * chunk_ms / 1000.0))
+    clip = br.synth_audio(10.0, sr)
+    clip = clip[: (clip.size // chunk) * chunk]
+    bodies = [clip[o:o + chunk].tobytes() for o in range(0, clip.size, chunk)]
+    ts1 = "ts1" in caps
+    cl_send = ws.client_send
+    cl_send(json.dumps({"event": "start", "sample_rate": sr, "dtype": "i16", "caps": caps.split(",")}))
+
+    step = chunk / float(sr)
+    n_chunks = int(seconds / step)
+    every = max(1, n_chunks // max(1, checkpoints))
+    prev = {"sim": loop.time(), "cpu": time.process_time(), "wall": time.perf_counter(),
+            "msgs": 0, "bytes": 0, "patch": 0, "stable": 0,
+            "m": br.prom_values(server._METRICS.render(), _COUNTERS)}
+    rows: List[Dict[str, Any]] = []
+
+    def _row(i: int) -> Dict[str, Any]:
+        now = {"sim": loop.time(), "cpu": time.process_time(), "wall": time.perf_counter(),
+               "msgs": sum(cl.msgs.values()), "bytes": cl.bytes,
+               "patch": cl.msgs.get("patch", 0), "stable": cl.msgs.get("stable", 0),
+               "m": br.prom_values(server._METRICS.render(), _COUNTERS)}
+        lat = latency_hist.LatencyHistogram()
+        lat.merge(cl.latency)
+        win = lat.summary()
+        dsim = max(1e-9, now["sim"] - prev["sim"])
+        row = {
+            "audio_min": round(i * step / 60.0, 2),
+            "cpu_per_sim_min": round((now["cpu"] - prev["cpu"]) / dsim * 60.0, 4),
+            "speedup": round(dsim / max(1e-9, now["wall"] - prev["wall"]), 1),
+            "msgs": now["msgs"] - prev["msgs"],
+            "patches": now["patch"] - prev["patch"], "stables": now["stable"] - prev["stable"],
+            "kb_out": round((now["bytes"] - prev["bytes"]) / 1024.0, 1),
+            "stable_chars": cl.stable_len, "shown_chars": cl.shown_len,
+            "queue_drops": int(now["m"].get(_COUNTERS[0], 0) - prev["m"].get(_COUNTERS[0], 0)),
+            "trimmed_sec": round(now["m"].get(_COUNTERS[1], 0) - prev["m"].get(_COUNTERS[1], 0), 3),
+            "p50_ms": win["p50"], "p99_ms": win["p99"], "rss_mb": _rss_mb(),
+        }
+        cl.latency = latency_hist.LatencyHistogram()   # per-interval percentiles
+        prev.update(now)
+        return row
+
+    t_next = loop.time()
+    for i in range(1, n_chunks + 1):
+        if srv.done():
+            break
+        body = bodies[i % len(bodies)]
+        cl_send(_ts1_frame(clock, body) if ts1 else body)
+        if i % every == 0:
+            rows.append(_row(i))
+            on_row(rows[-1])
+        t_next += step
+        delay = t_next - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    cl_send(json.dumps({"event": "stop"}))
+    await asyncio.sleep(drain_sec)
+    await ws.close()
+    try:
+        await asyncio.wait_for(srv, 30.0)
+    except asyncio.TimeoutError:
+        srv.cancel()
+    return {"rows": rows, "recv_msgs": cl.msgs, "errors": cl.errors,
+            "accounts": server._ACCOUNTS.snapshot().get("users")}
+
+
+def _ts1_frame(clock: sim_clock.VirtualClock, body: bytes) -> bytes:
+    return br.TS1_MAGIC + br._F64_LE.pack(clock.time() * 1000.0) + body
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--minutes", type=float, default=60.0, help="simulated audio")
+    ap.add_argument("--checkpoints", type=int, default=12)
+    ap.add_argument("--chunk-ms", type=float, default=None, help="default: hello hint_client_frame_48k")
+    ap.add_argument("--caps", default="ts1,patch_batch")
+    ap.add_argument("--rtt-ms", type=float, default=20.0, help="simulated ping round trip")
+    ap.add_argument("--utterance-sec", type=float, default=0.0,
+                    help="STUB_UTTERANCE_SEC (default: the whole run, so the transcript keeps growing)")
+    ap.add_argument("--drain-sec", type=float, default=5.0)
+    ap.add_argument("--env", action="append", default=[], help="extra server env K=V (before import)")
+    ap.add_argument("--json", action="store_true")
+    a = ap.parse_args()
+
+    os.environ.update({"STT_RECORDER_FACTORY": "stub_recorder:LoopStubRecorder", "REQUIRE_GPU": "0",
+                       "STT_DEVICE": "cpu", "LOG_LEVEL": "WARNING", "TXT_SAVE_ENABLE": "0",
+                       "STUB_UTTERANCE_SEC": str(a.utterance_sec or a.minutes * 60.0 + 60.0)})
+    os.environ.update(dict(kv.split("=", 1) for kv in a.env))
+    import server  # noqa: E402  (reads its config from the environment at import)
+
+    server._ensure_warmup().result(timeout=120)   # recorder class before the virtual loop starts
+    clock = sim_clock.VirtualClock()
+    server._CLOCK = clock
+
+    def _print(row):
+        if not a.json:
+            print("  ".join(f"{k}={v}" for k, v in row.items()), flush=True)
+
+    t0 = time.perf_counter()
+    rep = sim_clock.run(simulate(server, clock, a.minutes * 60.0, a.checkpoints, a.chunk_ms, a.caps,
+                                 a.rtt_ms, a.drain_sec, _print), clock)
+    rep["sim_sec"] = round(clock.monotonic(), 3)
+    rep["wall_sec"] = round(time.perf_counter() - t0, 3)
+    if a.json:
+        print(json.dumps(rep, indent=2, ensure_ascii=False))
+    else:
+        print(f"simulated {rep['sim_sec']}s in {rep['wall_sec']}s wall | recv {rep.get('recv_msgs')} "
+              f"| errors {rep.get('errors')}")
+
+
+if __name__ == "__main__":
+    main()
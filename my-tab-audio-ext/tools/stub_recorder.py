@@ -0,0 +1,194 @@
+# tools/stub_recorder.py
+# Scripted stand-in for RealtimeSTT.AudioToTextRecorder (no model, no GPU) for benchmarks:
+#
+#   STT_RECORDER_FACTORY=tools.stub_recorder:StubRecorder REQUIRE_GPU=0 STT_DEVICE=cpu python server.py
+#
+# feed_audio() only counts samples. A worker thread wakes every STUB_UPDATE_SEC and, if new audio
+# arrived, "transcribes" it: sleeps STUB_INFER_MS in realtime_model_type.transcribe() (GIL released,
+# like CTranslate2), then calls on_realtime_transcription_update with the current utterance
+# (STUB_WPS words per fed audio second, taken from STUB_SCRIPT or a built-in text) and
+# on_realtime_transcription_stabilized with all but the last STUB_UNSTABLE_WORDS words. With
+# probability STUB_REWRITE_P the last word is shown misspelled first, so the stabilizer sees
+# rewrites. A new utterance starts every STUB_UTTERANCE_SEC of audio (RealtimeSTT resets its realtime
+# text after end of speech). Deterministic for a given STUB_SEED and audio length.
+# LoopStubRecorder runs the same script on the asyncio loop's timers (virtual-time simulations).
+
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Callable, List, Optional, Tuple
+
+DEFAULT_SCRIPT = (
+    "So the next thing we want to look at is how the gradient flows through the network. "
+    "If you remember from last week, every layer multiplies the incoming signal by its weights, "
+    "and when we go backwards we multiply by the transpose of those weights instead. "
+    "That is why very deep networks used to be so hard to train: the product of many small numbers "
+    "vanishes, and the early layers barely learn anything at all. Residual connections fix this by "
+    "giving the gradient a short path around each block. Okay, let's look at an example on the board. "
+)
+
+
+def _env_f(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+class _Segment:
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _StubModel:
+    """Stands in for the realtime faster-whisper model (so session accounting can time it)."""
+
+    def __init__(self, infer_sec: float):
+        self.infer_sec = infer_sec
+
+    def transcribe(self, text: str, **_kw):
+        if self.infer_sec > 0:
+            time.sleep(self.infer_sec)
+        return iter([_Segment(text)]), {"language": "en"}
+
+
+class StubRecorder:
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        on_realtime_transcription_update: Optional[Callable[[str], None]] = None,
+        on_realtime_transcription_stabilized: Optional[Callable[[str], None]] = None,
+        **_ignored,
+    ):
+        self.sample_rate = int(sample_rate)
+        self.on_update = on_realtime_transcription_update
+        self.on_stable = on_realtime_transcription_stabilized
+
+        self.update_sec = max(0.01, _env_f("STUB_UPDATE_SEC", 0.2))
+        self.wps = max(0.1, _env_f("STUB_WPS", 2.6))
+        self.utterance_sec = max(1.0, _env_f("STUB_UTTERANCE_SEC", 8.0))
+        self.unstable_words = int(_env_f("STUB_UNSTABLE_WORDS", 2))
+        self.rewrite_p = _env_f("STUB_REWRITE_P", 0.15)
+        self.realtime_model_type = _StubModel(max(0.0, _env_f("STUB_INFER_MS", 40.0)) / 1000.0)
+
+        path = os.getenv("STUB_SCRIPT", "").strip()
+        text = DEFAULT_SCRIPT
+        if path:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        self.words: List[str] = text.split() or DEFAULT_SCRIPT.split()
+        self._rng = random.Random(int(_env_f("STUB_SEED", 1)))
+
+        self._samples = 0
+        self._last_sec = 0.0
+        self._utt_start_sec = 0.0
+        self._utt_word0 = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.updates = 0
+        self.utterances = 0
+
+    # ---- AudioToTextRecorder API used by server.py ----
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="stub-recorder", daemon=True)
+            self._thread.start()
+
+    def feed_audio(self, chunk: bytes, original_sample_rate: int = 16000):
+        with self._lock:
+            self._samples += len(chunk) // 2
+
+    def stop(self):
+        self._stop.set()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    # ---- scripted transcription ----
+    def _word(self, i: int) -> str:
+        return self.words[i % len(self.words)]
+
+    def _step(self) -> Optional[Tuple[str, Optional[str]]]:
+        """One recognizer pass over the audio fed so far -> (realtime text, stabilized text or None)."""
+        with self._lock:
+            audio_sec = self._samples / float(self.sample_rate)
+        if audio_sec <= self._last_sec:
+            return None             # no new audio: RealtimeSTT does not run the model either
+        self._last_sec = audio_sec
+
+        n = int((audio_sec - self._utt_start_sec) * self.wps)
+        words = [self._word(self._utt_word0 + i) for i in range(n)]
+        if words and self._rng.random() < self.rewrite_p:
+            w = words[-1]
+            words[-1] = w[: max(1, len(w) - 2)] + "e"
+        stable = " ".join(words[: len(words) - self.unstable_words]) if len(words) > self.unstable_words else None
+
+        if audio_sec - self._utt_start_sec >= self.utterance_sec:
+            self._utt_word0 += n
+            self._utt_start_sec = audio_sec
+            self.utterances += 1
+        return " ".join(words), stable
+
+    def _emit(self, text: str, stable: Optional[str]):
+        self.updates += 1
+        if self.on_update is not None and text:
+            self.on_update(text)
+        if self.on_stable is not None and stable is not None:
+            self.on_stable(stable)
+
+    def _run(self):
+        while not self._stop.wait(self.update_sec):
+            step = self._step()
+            if step is None:
+                continue
+            segs, _info = self.realtime_model_type.transcribe(step[0])
+            self._emit("".join(s.text for s in segs), step[1])
+
+
+class LoopStubRecorder(StubRecorder):
+    """
+    StubRecorder driven by the running asyncio loop's timers instead of a thread, for virtual-time
+    runs (tools/sim_stream.py): callbacks fire on the loop thread and STUB_INFER_MS passes as loop
+    time before each update is delivered (the next pass starts after it, like the threaded worker).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def start(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._handle = self._loop.call_later(self.update_sec, self._tick)
+
+    def _tick(self):
+        if self._stop.is_set():
+            return
+        step = self._step()
+        if step is None:
+            self._handle = self._loop.call_later(self.update_sec, self._tick)
+        else:
+            self._handle = self._loop.call_later(self.realtime_model_type.infer_sec, self._deliver, step)
+
+    def _deliver(self, step: Tuple[str, Optional[str]]):
+        if self._stop.is_set():
+            return
+        self._emit(*step)
+        self._handle = self._loop.call_later(self.update_sec, self._tick)
+
+    def stop(self):
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+
+    def shutdown(self):
+        self.stop()
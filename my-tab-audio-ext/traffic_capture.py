@@ -0,0 +1,154 @@
+# traffic_capture.py
+# Per-session WebSocket traffic capture for server.py + reader for tools/replay_capture.py.
+#
+#   cap = CaptureWriter("captures/20260101_120000_1.2.3.4_5555.vtcap", {"path": "/?caps=ts1", ...})
+#   cap.inbound(msg)          # str (text frame) or bytes (binary frame), as websocket.recv() returned it
+#   cap.outbound(data)        # what _ws_send() put on the wire
+#   cap.close("disconnected") # flushes on the writer thread
+#   CaptureWriter(path, hdr, clock=server_clock)   # record times on another clock (.monotonic()/.time())
+#
+#   hdr, records = read_capture(path)   # records: [(t_sec, kind, payload), ...]
+#
+# File: gzip (level 1) stream of  MAGIC, u32 header length, header JSON, then records
+#   <B kind><Q t_us since open><I len><payload>
+# kinds: IN_TEXT / IN_BIN / OUT_TEXT / OUT_BIN (payload = frame; text as UTF-8) and END (payload = reason).
+# Writes go through one daemon thread per capture (the event loop only appends to a deque). A capture
+# stops recording payloads once max_bytes is reached (END reason "truncated" is recorded at close).
+# Auth secrets are not written: {"type":"auth"} messages have their token replaced and the ticket
+# query parameter is dropped from the recorded path. Audio IS recorded: keep this opt-in.
+
+import gzip
+import json
+import struct
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Tuple, Union
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+import sim_clock
+
+MAGIC = b"VTcap1\n"
+_REC = struct.Struct("<BQI")
+_U32 = struct.Struct("<I")
+
+IN_TEXT, IN_BIN, OUT_TEXT, OUT_BIN, END = 1, 2, 3, 4, 5
+KIND_NAMES = {IN_TEXT: "in_text", IN_BIN: "in_bin", OUT_TEXT: "out_text", OUT_BIN: "out_bin", END: "end"}
+
+_REDACT_KEYS = ("token", "ticket", "access_token")
+
+
+def redact_path(path: str) -> str:
+    u = urlparse(path or "/")
+    q = [(k, v) for k, v in parse_qsl(u.query, keep_blank_values=True) if k not in _REDACT_KEYS]
+    return u.path + ("?" + urlencode(q) if q else "")
+
+
+def _redact_text(msg: str) -> str:
+    # cheap pre-check: only auth messages carry secrets
+    if '"auth"' not in msg[:200]:
+        return msg
+    try:
+        obj = json.loads(msg)
+    except ValueError:
+        return msg
+    if isinstance(obj, dict) and obj.get("type") == "auth":
+        for k in _REDACT_KEYS:
+            if k in obj:
+                obj[k] = "***"
+        return json.dumps(obj, ensure_ascii=False)
+    return msg
+
+
+class CaptureWriter:
+    def __init__(self, path: str, header: Dict[str, Any], max_bytes: int = 200 * 1024 * 1024,
+                 clock: Any = None):
+        self.path = path
+        self._clock = clock or sim_clock.SYSTEM
+        self.max_bytes = max(0, int(max_bytes))
+        self.bytes = 0
+        self.records = 0
+        self.truncated = False
+        self._t0 = self._clock.monotonic()
+        self._q: Deque[Tuple[int, int, bytes]] = deque()
+        self._cv = threading.Condition()
+        self._closed = False
+        hdr = dict(header)
+        hdr.setdefault("t0_wall", self._clock.time())
+        hdr["path"] = redact_path(hdr.get("path", "/"))
+        self._hdr = json.dumps(hdr, ensure_ascii=False).encode("utf-8")
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    # ---- event loop side ----
+    def _put(self, kind: int, payload: bytes):
+        if self._closed:
+            return
+        if kind != END and (self.truncated or (self.max_bytes and self.bytes + len(payload) > self.max_bytes)):
+            self.truncated = True
+            return
+        self.bytes += len(payload) + _REC.size
+        self.records += 1
+        t_us = int((self._clock.monotonic() - self._t0) * 1e6)
+        with self._cv:
+            self._q.append((kind, t_us, payload))
+            self._cv.notify()
+
+    def inbound(self, msg: Union[str, bytes, bytearray]):
+        if isinstance(msg, str):
+            self._put(IN_TEXT, _redact_text(msg).encode("utf-8"))
+        else:
+            self._put(IN_BIN, bytes(msg))
+
+    def outbound(self, data: Union[str, bytes]):
+        if isinstance(data, str):
+            self._put(OUT_TEXT, data.encode("utf-8"))
+        else:
+            self._put(OUT_BIN, bytes(data))
+
+    def close(self, reason: str = ""):
+        if self._closed:
+            return
+        self._put(END, (reason + (" truncated" if self.truncated else "")).strip().encode("utf-8"))
+        with self._cv:
+            self._closed = True
+            self._cv.notify()
+
+    # ---- writer thread ----
+    def _run(self):
+        with gzip.open(self.path, "wb", compresslevel=1) as f:
+            f.write(MAGIC + _U32.pack(len(self._hdr)) + self._hdr)
+            while True:
+                with self._cv:
+                    while not self._q and not self._closed:
+                        self._cv.wait()
+                    batch = list(self._q)
+                    self._q.clear()
+                    done = self._closed
+                for kind, t_us, payload in batch:
+                    f.write(_REC.pack(kind, t_us, len(payload)))
+                    f.write(payload)
+                if done and not self._q:
+                    return
+
+
+def read_capture(path: str) -> Tuple[Dict[str, Any], List[Tuple[float, int, bytes]]]:
+    """(header, [(t_sec, kind, payload)]); a capture cut short (crash) yields the records before the cut."""
+    recs: List[Tuple[float, int, bytes]] = []
+    with gzip.open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a traffic capture")
+        (n,) = _U32.unpack(f.read(_U32.size))
+        hdr = json.loads(f.read(n).decode("utf-8"))
+        try:
+            while True:
+                head = f.read(_REC.size)
+                if len(head) < _REC.size:
+                    break
+                kind, t_us, ln = _REC.unpack(head)
+                payload = f.read(ln)
+                if len(payload) < ln:
+                    break
+                recs.append((t_us / 1e6, kind, payload))
+        except EOFError:
+            pass
+    return hdr, recs
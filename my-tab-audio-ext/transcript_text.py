@@ -0,0 +1,297 @@
+# transcript_text.py
+# Transcript text structures shared by server.py and the tools (no server imports, no I/O):
+#   - split_sentences_and_tail / SentenceCommitter: sentence commit for the TXT_SAVE feed
+#   - StableDeltaEncoder: stable snapshots -> append-at-offset deltas with CRCs + checkpoints
+#   - TranscriptStore: frozen (zlib) prefix + bounded live tail of one session's transcript
+
+import re
+import zlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def norm_spaces(s: str) -> str:
+    return " ".join((s or "").strip().split())
+
+
+def lcp_len(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+# history sentences splitter
+SENT_RE = re.compile(r'[^.!?…]*[.!?…]+(?:["”’\']+)?(?:\s+|$)')
+
+
+def split_sentences_and_tail(text: str):
+    sents = []
+    last_end = 0
+    for m in SENT_RE.finditer(text):
+        sents.append(m.group(0))
+        last_end = m.end()
+    tail = text[last_end:]
+    return sents, tail
+
+
+class SentenceCommitter:
+    """
+    Incremental sentence commit for the TXT_SAVE feed (same sentences as split_sentences_and_tail).
+      - keeps the offset of the last committed sentence boundary; each update scans only text after it
+      - while streaming, the last complete sentence stays uncommitted (it may still be rewritten)
+      - a rewrite reaching back before the committed offset is re-anchored on the committed tail;
+        committed text is never re-committed
+    """
+    ANCHOR_CHARS = 48
+    SEARCH_CHARS = 512
+
+    def __init__(self):
+        self.off = 0
+        self.anchor = ""
+        self.rewrites = 0
+        self.lost_anchor = 0
+
+    def _set_anchor(self, full: str):
+        self.anchor = full[max(0, self.off - self.ANCHOR_CHARS):self.off]
+
+    def _check_prefix(self, full: str):
+        a = self.anchor
+        if not a or full[self.off - len(a):self.off] == a:
+            return
+        self.rewrites += 1
+        lo = max(0, self.off - len(a) - self.SEARCH_CHARS)
+        i = full.rfind(a, lo, self.off + self.SEARCH_CHARS)
+        if i >= 0:
+            self.off = i + len(a)
+        else:
+            # committed tail is gone: resume at the last sentence end before the old offset
+            self.lost_anchor += 1
+            cut = min(self.off, len(full))
+            boundary = max(0, cut - self.SEARCH_CHARS)
+            for m in SENT_RE.finditer(full, boundary, cut):
+                boundary = m.end()
+            self.off = boundary
+        self._set_anchor(full)
+
+    def update(self, full: str, final: bool = False, base: int = 0) -> List[str]:
+        """
+        Return newly committed sentences (stripped). final=True also flushes the last sentence + tail.
+        base: absolute offset of full[0] (TranscriptStore live tail); self.off stays absolute.
+        """
+        if base:
+            self.off -= base
+            try:
+                return self.update(full, final)
+            finally:
+                self.off += base
+        self._check_prefix(full)
+
+        sents: List[str] = []
+        ends: List[int] = []
+        for m in SENT_RE.finditer(full, self.off):
+            sents.append(m.group(0))
+            ends.append(m.end())
+
+        if final:
+            last_end = ends[-1] if ends else self.off
+            sents.append(full[last_end:])
+            self.off = len(full)
+        else:
+            sents = sents[:-1]
+            if sents:
+                self.off = ends[len(sents) - 1]
+
+        self._set_anchor(full)
+        return [x.strip() for x in sents if x.strip()]
+
+
+class StableDeltaEncoder:
+    """
+    Turns successive stable snapshots into append-at-offset deltas.
+      - off/append: client keeps text[:off] and appends `append`
+      - base_crc: crc32 (utf-8) of text[:off] so the client can verify its prefix
+      - crc/len: crc32 and length (code points) of the resulting text
+    CRCs are kept at fixed block marks, so each update costs O(changed text + block).
+    After rebase(n) the encoder only holds text[base:] (live tail); update() then takes the tail and
+    offsets/lengths/CRCs stay absolute. Checkpoints need the frozen prefix: pass prefix=callable.
+    """
+    BLOCK = 4096
+
+    def __init__(self, ckpt_every: int):
+        self.ckpt_every = max(1, int(ckpt_every))
+        self.base = 0
+        self.text = ""      # text[base:]
+        self._marks = [0]   # _marks[k] = crc32(full[:base + k*BLOCK])
+        self.deltas_since_ckpt = 0
+        self.force_ckpt = True
+
+    def request_checkpoint(self):
+        self.force_ckpt = True
+
+    def _crc_prefix(self, n: int) -> int:
+        n -= self.base
+        k = min(n // self.BLOCK, len(self._marks) - 1)
+        return zlib.crc32(self.text[k * self.BLOCK:n].encode("utf-8"), self._marks[k])
+
+    def _common_prefix(self, new: str) -> int:
+        old = self.text
+        if new.startswith(old):
+            return len(old)
+        # rewrites are near the tail: skip equal blocks at C speed, then scan one block
+        n = min(len(old), len(new))
+        B = self.BLOCK
+        i = 0
+        while i + B <= n and old[i:i + B] == new[i:i + B]:
+            i += B
+        return i + lcp_len(old[i:i + B], new[i:i + B])
+
+    def _remark(self, k0: int):
+        B = self.BLOCK
+        del self._marks[k0 + 1:]
+        for k in range(k0 + 1, len(self.text) // B + 1):
+            self._marks.append(zlib.crc32(self.text[(k - 1) * B:k * B].encode("utf-8"), self._marks[k - 1]))
+
+    def rebase(self, new_base: int, fetch):
+        """Forget text before new_base; fetch(a, b) returns the frozen text [a:b) (TranscriptStore.frozen)."""
+        n = new_base - self.base
+        if n <= 0:
+            return
+        head = fetch(self.base, new_base)
+        if self.text[:n] != head:
+            # our view is short or diverged from what got frozen: continue from the frozen text
+            self.text = head
+            self._remark(0)
+        crc = self._crc_prefix(new_base)
+        self.text = self.text[n:]
+        self.base = new_base
+        self._marks = [crc]
+        self._remark(0)
+
+    def update(self, new: str, prefix=None) -> Dict[str, Any]:
+        off = self.base + self._common_prefix(new)
+        base_crc = self._crc_prefix(off)
+
+        self.text = new
+        self._remark((off - self.base) // self.BLOCK)
+        n = self.base + len(new)
+        crc = self._crc_prefix(n)
+
+        ckpt = self.force_ckpt or off == 0 or self.deltas_since_ckpt >= self.ckpt_every
+        if ckpt:
+            self.force_ckpt = False
+            self.deltas_since_ckpt = 0
+            full = (prefix() + new) if (self.base and prefix is not None) else new
+            return {"full": full, "ckpt": True, "len": n, "crc": crc}
+
+        self.deltas_since_ckpt += 1
+        return {"off": off, "append": new[off - self.base:], "len": n, "base_crc": base_crc, "crc": crc}
+
+
+class TranscriptStore:
+    """
+    One session's transcript = frozen prefix + live tail.
+      - frozen text only grows, is cut at word boundaries far behind any rewrite, and is kept as
+        zlib chunks; base = its length, so live offsets map to absolute ones by adding base
+      - live_of(raw) cuts RealtimeSTT's full text at the frozen boundary (per-source raw anchor) and
+        normalizes only the tail; a text that no longer starts with the frozen prefix (RealtimeSTT
+        began a new utterance) becomes a fresh live tail after the frozen text (counted in mismatches)
+      - frozen()/full_text() rebuild the whole transcript lazily (final flush, checkpoints)
+    Thread-safe: callbacks freeze under patch_lock, the TXT writer reads frozen ranges concurrently.
+    """
+    ANCHOR_CHARS = 64
+    CHUNK_CHARS = 64 * 1024
+
+    def __init__(self, live_max_chars: int, keep_chars: int):
+        self.live_max = max(0, int(live_max_chars))
+        self.keep = max(1024, min(int(keep_chars), self.live_max // 2 if self.live_max else int(keep_chars)))
+        self.base = 0
+        self.words = 0
+        self.freezes = 0
+        self.mismatches = 0
+        self._chunks: List[Tuple[int, bytes]] = []   # (absolute start, zlib(utf-8))
+        self._pend: List[str] = []                   # frozen text not compressed yet
+        self._pend_start = 0
+        self._pend_len = 0
+        self._anchor = ""
+        self._raw: Dict[str, Tuple[int, str, int]] = {}  # source -> (raw cut, raw anchor, words at cut)
+        self._lock = threading.Lock()
+
+    def live_of(self, raw_text: str, source: str = "") -> Optional[str]:
+        raw_text = raw_text or ""
+        if self.base == 0:
+            return norm_spaces(raw_text)
+        ent = self._raw.get(source)
+        if ent is not None:
+            cut, anchor, words = ent
+            if raw_text[max(0, cut - len(anchor)):cut] == anchor:
+                if words < self.words:
+                    m = re.compile(r"(?:\s*\S+){%d}\s*" % (self.words - words)).match(raw_text, cut)
+                    if m is None:
+                        self._raw.pop(source, None)
+                        return self.live_of(raw_text, source)
+                    cut = m.end()
+                    self._raw[source] = (cut, raw_text[max(0, cut - self.ANCHOR_CHARS):cut], self.words)
+                return norm_spaces(raw_text[cut:])
+        # slow path (first call per source, or the raw text shifted): normalize everything once
+        norm = norm_spaces(raw_text)
+        if norm[max(0, self.base - len(self._anchor)):self.base] != self._anchor or len(norm) < self.base:
+            # the recognizer started over: the whole text is new and continues after the frozen part
+            self.mismatches += 1
+            self._raw[source] = (0, "", self.words)
+            return norm
+        m = re.compile(r"(?:\s*\S+){%d}\s*" % self.words).match(raw_text)
+        if m is not None:
+            cut = m.end()
+            self._raw[source] = (cut, raw_text[max(0, cut - self.ANCHOR_CHARS):cut], self.words)
+        return norm[self.base:]
+
+    def freeze(self, live: str) -> int:
+        """Freeze the head of an over-long live tail; returns how many chars moved out of it."""
+        if not self.live_max or len(live) <= self.live_max:
+            return 0
+        i = live.rfind(" ", 0, len(live) - self.keep)
+        if i <= 0:
+            return 0
+        piece = live[:i + 1]  # frozen text always ends with the separating space
+        with self._lock:
+            if not self._pend:
+                self._pend_start = self.base
+            self._pend.append(piece)
+            self._pend_len += len(piece)
+            if self._pend_len >= self.CHUNK_CHARS:
+                self._chunks.append((self._pend_start, zlib.compress("".join(self._pend).encode("utf-8"), 6)))
+                self._pend = []
+                self._pend_len = 0
+            self._anchor = (self._anchor + piece)[-self.ANCHOR_CHARS:]
+            self.base += len(piece)
+            self.words += piece.count(" ")
+            self.freezes += 1
+        return len(piece)
+
+    def frozen(self, a: int = 0, b: Optional[int] = None) -> str:
+        """Frozen text [a:b) (absolute offsets)."""
+        with self._lock:
+            b = self.base if b is None else min(b, self.base)
+            if a >= b:
+                return ""
+            out = []
+            for i, (start, blob) in enumerate(self._chunks):
+                end = self._chunks[i + 1][0] if i + 1 < len(self._chunks) else (self._pend_start if self._pend else self.base)
+                if end <= a or start >= b:
+                    continue
+                txt = zlib.decompress(blob).decode("utf-8")
+                out.append(txt[max(0, a - start):b - start])
+            if self._pend and b > self._pend_start:
+                txt = "".join(self._pend)
+                out.append(txt[max(0, a - self._pend_start):b - self._pend_start])
+            return "".join(out)
+
+    def full_text(self, live: str) -> str:
+        return (self.frozen() + live) if self.base else live
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"base": int(self.base), "freezes": int(self.freezes), "mismatches": int(self.mismatches),
+                    "frozen_bytes": int(sum(len(b) for _s, b in self._chunks) + self._pend_len)}
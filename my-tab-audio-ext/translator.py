@@ -34,6 +34,9 @@ from typing import List, Optional, Dict, Any, Tuple, Union
 
 import websockets
 
+import mem_diag
+import metrics_http
+
 # ---------- Logging ----------
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 logger = logging.getLogger("rt-translator")
@@ -92,7 +95,9 @@ DRAFT_GARBAGE_MIN_TOKENS = _int_env("DRAFT_GARBAGE_MIN_TOKENS", 4)
 DRAFT_GARBAGE_UNIQUE_RATIO = _float_env("DRAFT_GARBAGE_UNIQUE_RATIO", 0.45)
 DRAFT_GARBAGE_MAX_CONSEC_REP = _int_env("DRAFT_GARBAGE_MAX_CONSEC_REP", 2)
 
+# log rate limiter state: keys are "<conn tag>:<what>", forgotten when the connection closes
 _rate_last: Dict[str, int] = {}
+_RATE_LAST_MAX = 4096
 
 
 def _now_ms_wall() -> int:
@@ -105,11 +110,21 @@ def _rl_ok(key: str, every_ms: int) -> bool:
     now = _now_ms_wall()
     last = _rate_last.get(key, 0)
     if now - last >= every_ms:
+        if len(_rate_last) >= _RATE_LAST_MAX and key not in _rate_last:
+            # safety net for keys not tied to a connection: drop the ones idle for a minute
+            for k in [k for k, t in _rate_last.items() if now - t > 60_000]:
+                del _rate_last[k]
         _rate_last[key] = now
         return True
     return False
 
 
+def _rl_forget(tag: str):
+    prefix = tag + ":"
+    for k in [k for k in _rate_last if k.startswith(prefix)]:
+        del _rate_last[k]
+
+
 def _preview(s: str, n: int = 80) -> str:
     s = (s or "").strip()
     if len(s) <= n:
@@ -121,6 +136,18 @@ def _preview(s: str, n: int = 80) -> str:
 TR_HOST = os.getenv("TR_HOST", "0.0.0.0")
 TR_PORT = int(os.getenv("TR_PORT", "8766"))
 
+# admin side port (metrics_http.SideHTTPServer): GET /memory with "Authorization: Bearer $ADMIN_TOKEN".
+# Off unless both TR_ADMIN_PORT and ADMIN_TOKEN are set.
+TR_ADMIN_HOST = os.getenv("TR_ADMIN_HOST", "127.0.0.1")
+TR_ADMIN_PORT = _int_env("TR_ADMIN_PORT", 0)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "").strip()
+
+# heap diagnostics (mem_diag.py), same knobs as server.py
+MEM_DIAG = _bool_env("MEM_DIAG", False)
+MEM_DIAG_INTERVAL_SEC = _float_env("MEM_DIAG_INTERVAL_SEC", 300.0)
+MEM_DIAG_TOP = _int_env("MEM_DIAG_TOP", 15)
+MEM_DIAG_FRAMES = _int_env("MEM_DIAG_FRAMES", 1)
+
 CT2_MODEL = os.getenv("CT2_MODEL", "").strip()
 TRANSLATOR_FORCE_CPU = os.getenv("TRANSLATOR_FORCE_CPU", "1").strip().lower() in {"1", "true", "yes"}
 CT2_DEVICE = os.getenv("CT2_DEVICE", "cpu").strip().lower()
@@ -1837,6 +1864,24 @@ class StreamState:
         return self.draft_req_id
 
 
+# ---------- Memory diagnostics ----------
+_MEMDIAG = mem_diag.MemoryDiagnostics(MEM_DIAG_INTERVAL_SEC, MEM_DIAG_TOP, MEM_DIAG_FRAMES)
+_MEMDIAG.add_gauge("rate_last_keys", lambda: len(_rate_last))
+
+
+def _retained_of(state: "StreamState", commit_queue: asyncio.Queue, draft_queue: asyncio.Queue) -> Dict[str, int]:
+    return {
+        "vi_full_chars": len(state.vi_full),
+        "raw_full_chars": len(state.raw_full),
+        "seg_buf_chars": len(state.seg.buf),
+        "pending_commits": len(state.pending_commits),
+        "strict_seen_sentences": len(state.strict_seen_sentences),
+        "strict_committed_sentences": len(state.strict_committed_sentences),
+        "commit_queue": commit_queue.qsize(),
+        "draft_queue": draft_queue.qsize(),
+    }
+
+
 # ---------- WS Handler ----------
 _CONN_COUNTER = 0
 
@@ -1853,6 +1898,7 @@ async def handler(websocket, *args):
     draft_queue: asyncio.Queue = asyncio.Queue(maxsize=1)
 
     send_lock = asyncio.Lock()
+    _MEMDIAG.track(tag, lambda: _retained_of(state, commit_queue, draft_queue))
 
     remote = getattr(websocket, "remote_address", None)
     logger.info("[%s][Conn] open from %s", tag, remote)
@@ -2575,6 +2621,8 @@ async def handler(websocket, *args):
         logger.info("[%s][Conn] close | vi_len=%d vi_seq=%d vi_draft_seq=%d en_seq=%d nonprefix=%d commit_drop=%d draft_drop=%d",
                     tag, len(state.vi_full), state.vi_seq, state.vi_draft_seq, state.last_en_seq,
                     state.seg.nonprefix_cnt, state.q_drop, state.draft_drop)
+        _MEMDIAG.untrack(tag)
+        _rl_forget(tag)
 
 
 # ---------- Entrypoint ----------
@@ -2638,6 +2686,20 @@ async def main():
         except Exception as e:
             logger.error("[Warmup] MT init failed: %s", str(e))
 
+    if MEM_DIAG:
+        _MEMDIAG.start()
+    admin_http = None
+    if TR_ADMIN_PORT > 0 and ADMIN_TOKEN:
+        admin_http = metrics_http.SideHTTPServer(TR_ADMIN_HOST, TR_ADMIN_PORT)
+        admin_http.route("/memory", mem_diag.http_route(_MEMDIAG), token=ADMIN_TOKEN)
+        try:
+            await admin_http.start()
+        except OSError as e:
+            logger.warning("[Admin] port %s:%d unavailable: %r", TR_ADMIN_HOST, TR_ADMIN_PORT, e)
+            admin_http = None
+    elif TR_ADMIN_PORT > 0:
+        logger.warning("[Admin] TR_ADMIN_PORT set but ADMIN_TOKEN is empty -> admin port not served")
+
     async with websockets.serve(
         handler,
         TR_HOST,
@@ -0,0 +1,350 @@
+# txt_archive.py
+# Session manifest + inverted index over committed feed lines in TXT_SAVE_DIR (sqlite, stdlib only).
+#
+#   sessions  one row per session_{ts_ms}_{sid} dir (older dirs: seconds): user, sess_id, start/end, bytes, sentences
+#   lines     committed feed sentences (session, seq, t_ms, text)
+#   postings  (term, line) — lowercase word tokens; phrase search = postings intersection + token check
+#
+# Written incrementally by server.py (on the TXT_SAVE writer thread, committed with each write group);
+# WAL mode so other processes can query while the server writes.
+#
+# CLI:
+#   python txt_archive.py list [--user U] [--limit N]
+#   python txt_archive.py search "gradient descent" [--user U] [--limit N]
+#   python txt_archive.py rebuild            # (re)index session dirs missing from the manifest
+
+import os
+import re
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+ARCHIVE_DB_NAME = "archive.sqlite3"
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_SESSION_DIR = re.compile(r"^session_(\d+)_(.+)$")
+
+
+def _tag_ms(ts: int) -> int:
+    """Session dir timestamps are ms; dirs written before that carry seconds."""
+    return ts if ts >= 10 ** 11 else ts * 1000
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id        INTEGER PRIMARY KEY,
+    tag       TEXT UNIQUE NOT NULL,
+    dir       TEXT NOT NULL,
+    user      TEXT NOT NULL DEFAULT '-',
+    sess_id   TEXT NOT NULL DEFAULT '',
+    start_ms  INTEGER NOT NULL,
+    end_ms    INTEGER,
+    bytes     INTEGER NOT NULL DEFAULT 0,
+    sentences INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_start ON sessions(start_ms);
+CREATE INDEX IF NOT EXISTS sessions_user ON sessions(user, start_ms);
+CREATE TABLE IF NOT EXISTS lines (
+    id      INTEGER PRIMARY KEY,
+    session INTEGER NOT NULL,
+    seq     INTEGER NOT NULL,
+    t_ms    INTEGER,
+    text    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lines_session ON lines(session, seq);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    PRIMARY KEY (term, line)
+) WITHOUT ROWID;
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    return [w.lower() for w in _WORD.findall(text or "")]
+
+
+def _contains_run(hay: List[str], needle: List[str]) -> bool:
+    n = len(needle)
+    if n == 0:
+        return False
+    first = needle[0]
+    for i in range(len(hay) - n + 1):
+        if hay[i] == first and hay[i:i + n] == needle:
+            return True
+    return False
+
+
+class ArchiveIndex:
+    """
+    Manifest + inverted index for one TXT_SAVE_DIR.
+
+    Writers (server): begin_session / add_lines / end_session, then commit() per write group.
+    Readers: list_sessions / search / session_lines (any process; open with readonly=True).
+    """
+
+    def __init__(self, root: os.PathLike, readonly: bool = False):
+        self.root = Path(root)
+        self.path = self.root / ARCHIVE_DB_NAME
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._ids: Dict[str, int] = {}       # tag -> sessions.id (open sessions)
+        self._seq: Dict[int, int] = {}       # sessions.id -> last line seq
+
+    # ---- connection ----
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.readonly:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            else:
+                self.root.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _begin(self, db: sqlite3.Connection):
+        if not db.in_transaction:
+            db.execute("BEGIN")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    if self._conn.in_transaction:
+                        self._conn.execute("COMMIT")
+                    self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+
+    # ---- write side ----
+    def begin_session(self, tag: str, directory: str, user: str, sess_id: str, start_ms: int):
+        with self._lock:
+            db = self._db()
+            self._begin(db)
+            db.execute(
+                "INSERT INTO sessions(tag, dir, user, sess_id, start_ms) VALUES (?,?,?,?,?) "
+                "ON CONFLICT(tag) DO UPDATE SET dir=excluded.dir, user=excluded.user, sess_id=excluded.sess_id",
+                (tag, str(directory), user or "-", sess_id or "", int(start_ms)),
+            )
+            sid = db.execute("SELECT id FROM sessions WHERE tag=?", (tag,)).fetchone()[0]
+            self._ids[tag] = sid
+            row = db.execute("SELECT MAX(seq) FROM lines WHERE session=?", (sid,)).fetchone()
+            self._seq[sid] = int(row[0] or 0)
+
+    def add_lines(self, tag: str, t_ms: Optional[int], lines: Iterable[str]):
+        with self._lock:
+            sid = self._ids.get(tag)
+            if sid is None:
+                return
+            db = self._db()
+            self._begin(db)
+            seq = self._seq.get(sid, 0)
+            n = 0
+            nbytes = 0
+            for text in lines:
+                text = (text or "").strip()
+                if not text:
+                    continue
+                seq += 1
+                cur = db.execute("INSERT INTO lines(session, seq, t_ms, text) VALUES (?,?,?,?)", (sid, seq, t_ms, text))
+                line_id = cur.lastrowid
+                db.executemany("INSERT OR IGNORE INTO postings(term, line) VALUES (?,?)",
+                               [(w, line_id) for w in set(tokenize(text))])
+                n += 1
+                nbytes += len(text.encode("utf-8")) + 1
+            if n:
+                self._seq[sid] = seq
+                db.execute("UPDATE sessions SET sentences=sentences+?, bytes=bytes+?, end_ms=? WHERE id=?",
+                           (n, nbytes, t_ms, sid))
+
+    def end_session(self, tag: str, end_ms: int):
+        with self._lock:
+            sid = self._ids.pop(tag, None)
+            if sid is None:
+                return
+            self._seq.pop(sid, None)
+            db = self._db()
+            self._begin(db)
+            db.execute("UPDATE sessions SET end_ms=? WHERE id=?", (int(end_ms), sid))
+
+    def commit(self):
+        with self._lock:
+            if self._conn is not None and self._conn.in_transaction:
+                self._conn.execute("COMMIT")
+
+    def forget_session(self, tag: str):
+        """Drop a session from the manifest and index (retention)."""
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT id FROM sessions WHERE tag=?", (tag,)).fetchone()
+            if row is None:
+                return
+            sid = row[0]
+            self._begin(db)
+            # postings are keyed (term, line): re-tokenize to delete by primary key instead of scanning
+            for line_id, text in db.execute("SELECT id, text FROM lines WHERE session=?", (sid,)).fetchall():
+                db.executemany("DELETE FROM postings WHERE term=? AND line=?", [(w, line_id) for w in set(tokenize(text))])
+            db.execute("DELETE FROM lines WHERE session=?", (sid,))
+            db.execute("DELETE FROM sessions WHERE id=?", (sid,))
+            db.execute("COMMIT")
+
+    def rebuild(self, force: bool = False) -> int:
+        """Index session_* dirs under root that are missing from the manifest (force: reindex all)."""
+        from txt_tail import parse_feed_line
+        from txt_compact import CONTAINER_NAME, SessionContainer
+
+        db = self._db()
+        known = {r[0] for r in db.execute("SELECT tag FROM sessions")}
+        n = 0
+        for d in sorted(self.root.glob("session_*")):
+            m = _SESSION_DIR.match(d.name)
+            if not m or not d.is_dir():
+                continue
+            tag = d.name[len("session_"):]
+            if tag in known and not force:
+                continue
+            feed = d / "en_feed.txt"
+            packed = d / CONTAINER_NAME
+            if feed.exists():
+                with open(feed, "r", encoding="utf-8", errors="replace") as f:
+                    raw = [ln.rstrip("\n") for ln in f]
+            elif packed.exists():
+                # compacted by txt_compact: read the feed stream back
+                with SessionContainer(packed) as c:
+                    raw = list(c.lines("feed"))
+                feed = packed
+            else:
+                continue
+            if tag in known:
+                self.forget_session(tag)
+            user, sess_id = m.group(2), ""
+            lines = []
+            for ln in raw:
+                if ln.startswith("#"):
+                    hm = re.search(r"sess_id=(\S+).*user=(\S+)", ln)
+                    if hm:
+                        sess_id, user = hm.group(1), hm.group(2)
+                    continue
+                if ln:
+                    lines.append(parse_feed_line(ln))
+            start_ms = _tag_ms(int(m.group(1)))
+            self.begin_session(tag, str(d), user, sess_id, start_ms)
+            for t_ms, text in lines:
+                self.add_lines(tag, t_ms, [text])
+            self.end_session(tag, int(feed.stat().st_mtime * 1000))
+            self.commit()
+            n += 1
+        return n
+
+    # ---- read side ----
+    def list_sessions(self, user: Optional[str] = None, since_ms: Optional[int] = None,
+                      until_ms: Optional[int] = None, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        where, args = [], []
+        if user:
+            where.append("user=?")
+            args.append(user)
+        if since_ms is not None:
+            where.append("start_ms>=?")
+            args.append(int(since_ms))
+        if until_ms is not None:
+            where.append("start_ms<?")
+            args.append(int(until_ms))
+        sql = "SELECT tag, dir, user, sess_id, start_ms, end_ms, bytes, sentences FROM sessions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY start_ms DESC, id DESC LIMIT ? OFFSET ?"
+        args += [int(limit), int(offset)]
+        with self._lock:
+            rows = self._db().execute(sql, args).fetchall()
+        keys = ("tag", "dir", "user", "sess_id", "start_ms", "end_ms", "bytes", "sentences")
+        return [dict(zip(keys, r)) for r in rows]
+
+    def search(self, phrase: str, user: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Lines containing `phrase` as a word sequence (case-insensitive), most recently indexed first."""
+        words = tokenize(phrase)
+        if not words:
+            return []
+        with self._lock:
+            db = self._db()
+            # drive the intersection from the rarest term
+            terms = sorted(set(words), key=lambda w: db.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM postings WHERE term=? LIMIT 10000)", (w,)).fetchone()[0])
+            # walk the rarest term's postings newest-first (index order), probe the others; stops at `limit`
+            q = (
+                "SELECT l.id, l.seq, l.t_ms, l.text, s.tag, s.user, s.start_ms FROM postings p "
+                "JOIN lines l ON l.id = p.line JOIN sessions s ON s.id = l.session WHERE p.term=?"
+            )
+            args: List[Any] = [terms[0]]
+            for w in terms[1:]:
+                q += " AND EXISTS (SELECT 1 FROM postings WHERE term=? AND line=p.line)"
+                args.append(w)
+            if user:
+                q += " AND s.user=?"
+                args.append(user)
+            q += " ORDER BY p.line DESC"
+            out = []
+            for line_id, seq, t_ms, text, tag, u, start_ms in db.execute(q, args):
+                if len(words) > 1 and not _contains_run(tokenize(text), words):
+                    continue
+                out.append({"tag": tag, "user": u, "start_ms": start_ms, "seq": seq, "t_ms": t_ms, "text": text})
+                if len(out) >= limit:
+                    break
+        return out
+
+    def session_lines(self, tag: str, start_seq: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT l.seq, l.t_ms, l.text FROM lines l JOIN sessions s ON s.id = l.session "
+                "WHERE s.tag=? AND l.seq>? ORDER BY l.seq LIMIT ?", (tag, int(start_seq), int(limit))).fetchall()
+        return [{"seq": s, "t_ms": t, "text": x} for s, t, x in rows]
+
+
+def _main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Query the TXT_SAVE session archive")
+    ap.add_argument("--dir", default=os.getenv("TXT_SAVE_DIR", "txt_out"))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("list")
+    p.add_argument("--user")
+    p.add_argument("--limit", type=int, default=20)
+    p = sub.add_parser("search")
+    p.add_argument("phrase")
+    p.add_argument("--user")
+    p.add_argument("--limit", type=int, default=20)
+    p = sub.add_parser("rebuild")
+    p.add_argument("--force", action="store_true")
+    a = ap.parse_args(argv)
+
+    root = Path(a.dir).expanduser()
+    if a.cmd == "rebuild":
+        idx = ArchiveIndex(root)
+        t0 = time.perf_counter()
+        n = idx.rebuild(force=a.force)
+        idx.close()
+        print(f"indexed {n} session(s) in {time.perf_counter() - t0:.2f}s")
+        return 0
+
+    idx = ArchiveIndex(root, readonly=True)
+    if not idx.path.exists():
+        print(f"no archive at {idx.path} (run: rebuild)", file=sys.stderr)
+        return 1
+    if a.cmd == "list":
+        for s in idx.list_sessions(user=a.user, limit=a.limit):
+            start = time.strftime("%Y-%m-%d %H:%M", time.localtime(s["start_ms"] / 1000))
+            print(f"{start}  {s['tag']:<32} {s['user']:<16} {s['sentences']:>6} sent {s['bytes']:>9} B")
+    else:
+        for h in idx.search(a.phrase, user=a.user, limit=a.limit):
+            print(f"{h['tag']}#{h['seq']}: {h['text']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
@@ -0,0 +1,419 @@
+# txt_compact.py
+# Compaction + retention for finished TXT_SAVE session dirs.
+#
+# After a session closes, its dir (en_feed.txt, en_latest.txt, en_draft.txt, en_journal.jsonl/.idx) is packed
+# into one seekable container, session.vtz, and the originals are removed:
+#   - en_feed.txt      -> stream "feed" (verbatim lines, incl. "# session_start" header)
+#   - en_journal.jsonl -> stream "journal" (optional, keeps the timeline for replay)
+#   - en_latest.txt    -> dropped when it is the feed joined (+ uncommitted tail, kept in meta["tail"]);
+#                         stored as stream "latest" otherwise
+#   - en_draft.txt, en_journal.idx -> dropped (transient / superseded by the container index)
+#
+# Container (little endian):
+#   b"VTZ1"
+#   blocks      each = one codec-compressed run of "\n"-joined lines (~block_bytes raw)
+#   index       JSON {"v","codec","meta","streams":{name:[[off, clen, first_line, n_lines, t0_ms, t1_ms], ...]}}
+#   footer      u64 index_off, u32 index_len, b"VTZ1"
+# Readers seek to the footer, load the index and decompress only the blocks they touch.
+
+import os
+import io
+import json
+import lzma
+import zlib
+import time
+import queue
+import shutil
+import struct
+import bisect
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("txt-compact")
+
+CONTAINER_NAME = "session.vtz"
+MAGIC = b"VTZ1"
+_FOOTER = struct.Struct("<QI4s")
+
+_CODECS = {
+    "zlib": (lambda b: zlib.compress(b, 6), zlib.decompress),
+    "lzma": (lambda b: lzma.compress(b, preset=6), lzma.decompress),
+}
+
+# files the compactor owns inside a session dir (anything else is left alone)
+_PACKED = ("en_feed.txt", "en_journal.jsonl")
+_DROPPED = ("en_latest.txt", "en_draft.txt", "en_journal.idx")
+
+
+def _line_t_ms(stream: str, line: str) -> Optional[int]:
+    """Best-effort timestamp of a line (feed with TXT_SAVE_LINE_TS, or journal "t")."""
+    if stream == "journal":
+        try:
+            t = json.loads(line).get("t")
+        except (ValueError, AttributeError):
+            return None
+        return int(t) if isinstance(t, int) else None
+    head, sep, _rest = line.partition("\t")
+    if sep and head.isdigit():
+        return int(head)
+    return None
+
+
+def write_container(path: Path, streams: Dict[str, List[str]], meta: Dict[str, Any],
+                    codec: str = "zlib", block_bytes: int = 64 * 1024) -> int:
+    """Write streams into a container at `path` (atomic: tmp + fsync + rename). Returns bytes written."""
+    comp = _CODECS[codec][0]
+    tmp = Path(str(path) + ".tmp")
+    index: Dict[str, List[List[Any]]] = {}
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        off = len(MAGIC)
+        for name, lines in streams.items():
+            blocks: List[List[Any]] = []
+            start = 0
+            while start < len(lines):
+                raw_n = 0
+                end = start
+                while end < len(lines) and (end == start or raw_n < block_bytes):
+                    raw_n += len(lines[end].encode("utf-8")) + 1
+                    end += 1
+                chunk = lines[start:end]
+                data = comp("\n".join(chunk).encode("utf-8"))
+                ts = [t for t in (_line_t_ms(name, x) for x in (chunk[0], chunk[-1])) if t is not None]
+                blocks.append([off, len(data), start, end - start, ts[0] if ts else None, ts[-1] if ts else None])
+                f.write(data)
+                off += len(data)
+                start = end
+            index[name] = blocks
+        idx = json.dumps({"v": 1, "codec": codec, "meta": meta, "streams": index},
+                         ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        f.write(idx)
+        f.write(_FOOTER.pack(off, len(idx), MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    os.replace(tmp, path)
+    return size
+
+
+class SessionContainer:
+    """Random access to a session.vtz: lines(stream, start, stop) only decompresses the blocks it needs."""
+
+    def __init__(self, path: os.PathLike):
+        self.path = Path(path)
+        self._f = open(self.path, "rb")
+        self._f.seek(-_FOOTER.size, io.SEEK_END)
+        idx_off, idx_len, magic = _FOOTER.unpack(self._f.read(_FOOTER.size))
+        if magic != MAGIC:
+            raise ValueError(f"not a session container: {self.path}")
+        self._f.seek(idx_off)
+        idx = json.loads(self._f.read(idx_len))
+        self.codec: str = idx["codec"]
+        self.meta: Dict[str, Any] = idx.get("meta") or {}
+        self.streams: Dict[str, List[List[Any]]] = idx["streams"]
+        self._decomp = _CODECS[self.codec][1]
+        self._firsts = {k: [b[2] for b in v] for k, v in self.streams.items()}
+        self._cache: Tuple[Optional[str], int, List[str]] = (None, -1, [])
+        self.blocks_read = 0
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def line_count(self, stream: str = "feed") -> int:
+        b = self.streams.get(stream) or []
+        return (b[-1][2] + b[-1][3]) if b else 0
+
+    def _block(self, stream: str, k: int) -> List[str]:
+        if self._cache[0] == stream and self._cache[1] == k:
+            return self._cache[2]
+        off, clen = self.streams[stream][k][0], self.streams[stream][k][1]
+        self._f.seek(off)
+        lines = self._decomp(self._f.read(clen)).decode("utf-8").split("\n")
+        self._cache = (stream, k, lines)
+        self.blocks_read += 1
+        return lines
+
+    def lines(self, stream: str = "feed", start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        n = self.line_count(stream)
+        stop = n if stop is None else min(stop, n)
+        if start >= stop:
+            return
+        firsts = self._firsts[stream]
+        k = bisect.bisect_right(firsts, start) - 1
+        i = start
+        while i < stop:
+            blk = self._block(stream, k)
+            base = firsts[k]
+            for ln in blk[i - base:min(len(blk), stop - base)]:
+                yield ln
+            i = base + len(blk)
+            k += 1
+
+    def line(self, i: int, stream: str = "feed") -> str:
+        for ln in self.lines(stream, i, i + 1):
+            return ln
+        raise IndexError(i)
+
+    def block_for_time(self, t_ms: int, stream: str = "journal") -> int:
+        """First line index of the block covering t_ms (blocks without timestamps are skipped)."""
+        best = 0
+        for blk in self.streams.get(stream) or []:
+            if blk[4] is not None and blk[4] <= t_ms:
+                best = blk[2]
+        return best
+
+    def sentences(self) -> Iterator[str]:
+        """Committed feed sentences (header comments and line timestamps stripped)."""
+        for ln in self.lines("feed"):
+            if not ln or ln.startswith("#"):
+                continue
+            head, sep, rest = ln.partition("\t")
+            yield rest if (sep and head.isdigit()) else ln
+
+    def latest_text(self) -> str:
+        """en_latest.txt as it was at session end."""
+        if "latest" in self.streams:
+            return "\n".join(self.lines("latest"))
+        full = " ".join(self.sentences())
+        tail = self.meta.get("tail") or ""
+        return (full + " " + tail).strip() if tail else full
+
+
+def _read_lines(p: Path) -> List[str]:
+    with open(p, "r", encoding="utf-8", errors="replace") as f:
+        data = f.read()
+    if data.endswith("\n"):
+        data = data[:-1]
+    return data.split("\n") if data else []
+
+
+def compact_session(d: Path, codec: str = "zlib", block_bytes: int = 64 * 1024,
+                    keep_journal: bool = True) -> Optional[Dict[str, Any]]:
+    """Pack one finished session dir. Returns stats, or None if there was nothing to do."""
+    d = Path(d)
+    feed_p = d / "en_feed.txt"
+    out = d / CONTAINER_NAME
+    if out.exists() or not feed_p.exists():
+        return None
+
+    before = sum(p.stat().st_size for p in d.iterdir() if p.is_file())
+    streams: Dict[str, List[str]] = {"feed": _read_lines(feed_p)}
+    meta: Dict[str, Any] = {"dir": d.name, "packed_at": int(time.time())}
+
+    latest_p = d / "en_latest.txt"
+    if latest_p.exists():
+        latest = latest_p.read_text(encoding="utf-8", errors="replace").strip()
+        sents = []
+        for ln in streams["feed"]:
+            if ln and not ln.startswith("#"):
+                head, sep, rest = ln.partition("\t")
+                sents.append(rest if (sep and head.isdigit()) else ln)
+        joined = " ".join(sents)
+        if latest.startswith(joined):
+            if latest[len(joined):].strip():
+                meta["tail"] = latest[len(joined):].strip()
+        else:
+            # TXT_SAVE_MAX_CHARS_LATEST clipping or a rewrite after commit: keep it verbatim
+            streams["latest"] = latest.split("\n")
+
+    journal_p = d / "en_journal.jsonl"
+    if keep_journal and journal_p.exists():
+        streams["journal"] = _read_lines(journal_p)
+
+    size = write_container(out, streams, meta, codec=codec, block_bytes=block_bytes)
+    try:
+        fd = os.open(str(d), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+    for name in _PACKED + _DROPPED:
+        try:
+            (d / name).unlink()
+        except FileNotFoundError:
+            pass
+    return {"dir": d.name, "before": before, "after": size, "lines": len(streams["feed"])}
+
+
+def _dir_bytes(d: Path) -> int:
+    n = 0
+    for p in d.iterdir():
+        try:
+            if p.is_file():
+                n += p.stat().st_size
+        except OSError:
+            pass
+    return n
+
+
+def _dir_start_ts(d: Path) -> Optional[int]:
+    parts = d.name.split("_", 2)
+    if len(parts) >= 2 and parts[1].isdigit():
+        ts = int(parts[1])
+        return ts // 1000 if ts >= 10 ** 11 else ts      # ms tags (older dirs: seconds)
+    return None
+
+
+class SessionCompactor:
+    """
+    Background thread: compacts session dirs handed over by the server (release) plus a periodic sweep
+    for leftovers (e.g. after a crash), then applies retention (max age, max total size; oldest first).
+
+    hold(tag)/release(tag) bracket a live session so neither compaction nor retention touches it.
+    on_delete(tag) is called for every session dir removed by retention (archive index cleanup).
+    """
+
+    def __init__(
+        self,
+        root: os.PathLike,
+        codec: str = "zlib",
+        block_bytes: int = 64 * 1024,
+        keep_journal: bool = True,
+        max_total_bytes: int = 0,
+        max_age_sec: float = 0.0,
+        sweep_sec: float = 600.0,
+        grace_sec: float = 300.0,
+        on_delete: Optional[Callable[[str], None]] = None,
+    ):
+        self.root = Path(root)
+        self.codec = codec if codec in _CODECS else "zlib"
+        self.block_bytes = max(4096, int(block_bytes))
+        self.keep_journal = keep_journal
+        self.max_total_bytes = max(0, int(max_total_bytes))
+        self.max_age_sec = max(0.0, float(max_age_sec))
+        self.sweep_sec = max(1.0, float(sweep_sec))
+        self.grace_sec = max(0.0, float(grace_sec))
+        self.on_delete = on_delete
+
+        self._q: "queue.Queue[Optional[Path]]" = queue.Queue()
+        self._active: set = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self.compacted = 0
+        self.deleted = 0
+        self.bytes_saved = 0
+
+    def ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="txt-compact", daemon=True)
+            self._thread.start()
+
+    def hold(self, tag: str):
+        with self._lock:
+            self._active.add(tag)
+
+    def release(self, tag: str, directory: Optional[os.PathLike] = None):
+        with self._lock:
+            self._active.discard(tag)
+        if directory is not None:
+            self.ensure_started()
+            self._q.put(Path(directory))
+
+    def stop(self):
+        self._q.put(None)
+
+    def _is_active(self, d: Path) -> bool:
+        with self._lock:
+            return d.name[len("session_"):] in self._active
+
+    def _compact(self, d: Path):
+        if self._is_active(d):
+            return
+        try:
+            st = compact_session(d, self.codec, self.block_bytes, self.keep_journal)
+        except Exception as e:
+            logger.warning("compact %s failed: %r", d, e)
+            return
+        if st:
+            self.compacted += 1
+            self.bytes_saved += max(0, st["before"] - st["after"])
+            logger.info("compacted %s: %d -> %d bytes (%d lines)", st["dir"], st["before"], st["after"], st["lines"])
+
+    def sweep(self):
+        now = time.time()
+        for d in sorted(self.root.glob("session_*")):
+            if not d.is_dir() or (d / CONTAINER_NAME).exists() or self._is_active(d):
+                continue
+            try:
+                idle = now - max(p.stat().st_mtime for p in d.iterdir())
+            except ValueError:
+                continue  # empty dir
+            except OSError:
+                continue
+            if idle >= self.grace_sec:
+                self._compact(d)
+        self.enforce_retention()
+
+    def enforce_retention(self):
+        if not self.max_total_bytes and not self.max_age_sec:
+            return
+        dirs = []
+        for d in self.root.glob("session_*"):
+            if d.is_dir() and not self._is_active(d):
+                ts = _dir_start_ts(d)
+                dirs.append((ts if ts is not None else int(d.stat().st_mtime), d))
+        dirs.sort()  # oldest first
+
+        doomed: List[Path] = []
+        if self.max_age_sec:
+            cutoff = time.time() - self.max_age_sec
+            doomed = [d for ts, d in dirs if ts < cutoff]
+        if self.max_total_bytes:
+            sizes = {d: _dir_bytes(d) for _ts, d in dirs}
+            total = sum(sizes.values())
+            total -= sum(sizes[d] for d in doomed)
+            for _ts, d in dirs:
+                if total <= self.max_total_bytes:
+                    break
+                if d not in doomed:
+                    doomed.append(d)
+                    total -= sizes[d]
+
+        for d in doomed:
+            try:
+                shutil.rmtree(d)
+            except OSError as e:
+                logger.warning("retention: cannot remove %s: %r", d, e)
+                continue
+            self.deleted += 1
+            if self.on_delete is not None:
+                try:
+                    self.on_delete(d.name[len("session_"):])
+                except Exception:
+                    pass
+            logger.info("retention: removed %s", d.name)
+
+    def _run(self):
+        next_sweep = time.monotonic() + min(self.sweep_sec, 30.0)  # first sweep soon after startup
+        while True:
+            try:
+                d = self._q.get(timeout=max(0.1, next_sweep - time.monotonic()))
+            except queue.Empty:
+                d = ...
+            if d is None:
+                return
+            try:
+                if d is ...:
+                    self.sweep()
+                    next_sweep = time.monotonic() + self.sweep_sec
+                else:
+                    self._compact(d)
+                    self.enforce_retention()
+            except Exception as e:
+                logger.warning("compactor error: %r", e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"codec": self.codec, "compacted": int(self.compacted), "deleted": int(self.deleted),
+                "bytes_saved": int(self.bytes_saved), "active": len(self._active)}
@@ -0,0 +1,140 @@
+# txt_journal.py
+# Append-only transcript journal for TXT_SAVE (replaces rewriting en_latest on every stable).
+#
+# Journal (en_journal.jsonl): one JSON object per line
+#   {"k":"h","v":1,"t":t_ms,"sess":"...","user":"..."}                      session header (replay resets here)
+#   {"k":"s","seq":N,"t":t_ms,"off":O,"app":"...","len":L,"bcrc":C0,"crc":C}  stable: keep text[:off] + app
+#   {"k":"s","seq":N,"t":t_ms,"full":"...","len":L,"crc":C}                 stable checkpoint
+#   {"k":"p","t":t_ms,"del":D,"ins":"..."}                                  draft end-diff (TXT_SAVE_DRAFT)
+#   {"k":"f","t":t_ms}                                                      session end
+# crc = crc32 of the UTF-8 text after the record, bcrc = crc32 of text[:off]; offsets/lengths in code points.
+#
+# Sidecar index (en_journal.idx): "seq<TAB>t_ms<TAB>byte_offset<TAB>len" every N stable records,
+# so readers can jump near a point in time or start tailing from the end.
+
+import json
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+JOURNAL_VERSION = 1
+
+
+def _dumps(obj: Dict[str, Any]) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def header_record(t_ms: int, sess: str, user: str) -> str:
+    return _dumps({"k": "h", "v": JOURNAL_VERSION, "t": int(t_ms), "sess": sess, "user": user})
+
+
+def stable_record(seq: int, t_ms: int, delta: Dict[str, Any]) -> str:
+    """delta comes from StableDeltaEncoder.update(): {off, append, len, base_crc, crc} or {full, ckpt, len, crc}."""
+    rec: Dict[str, Any] = {"k": "s", "seq": int(seq), "t": int(t_ms)}
+    if "full" in delta:
+        rec["full"] = delta["full"]
+    else:
+        rec["off"] = int(delta["off"])
+        rec["app"] = delta["append"]
+        rec["bcrc"] = int(delta["base_crc"])
+    rec["len"] = int(delta["len"])
+    rec["crc"] = int(delta["crc"])
+    return _dumps(rec)
+
+
+def patch_record(t_ms: int, delete: int, insert: str) -> str:
+    return _dumps({"k": "p", "t": int(t_ms), "del": int(delete), "ins": insert})
+
+
+def final_record(t_ms: int) -> str:
+    return _dumps({"k": "f", "t": int(t_ms)})
+
+
+def index_line(seq: int, t_ms: int, byte_off: int, length: int) -> str:
+    return f"{int(seq)}\t{int(t_ms)}\t{int(byte_off)}\t{int(length)}"
+
+
+def read_index(path: str) -> List[Tuple[int, int, int, int]]:
+    out = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for ln in f:
+                parts = ln.rstrip("\n").split("\t")
+                if len(parts) == 4:
+                    try:
+                        out.append(tuple(int(x) for x in parts))  # type: ignore[misc]
+                    except ValueError:
+                        continue
+    except FileNotFoundError:
+        pass
+    return out
+
+
+def iter_records(path: str, start: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (byte_offset, record) from `start`; a torn last line (writer mid-append) is skipped."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        off = start
+        for raw in f:
+            nxt = off + len(raw)
+            if raw.endswith(b"\n"):
+                try:
+                    yield off, json.loads(raw)
+                except ValueError:
+                    pass
+            off = nxt
+
+
+class JournalState:
+    """Replays journal records into the current stable text (and draft)."""
+
+    def __init__(self, verify: bool = True):
+        self.verify = verify
+        self.text = ""
+        self.crc = 0
+        self.draft = ""
+        self.seq = 0
+        self.t_ms = 0
+        self.ended = False
+        self.errors = 0
+
+    def apply(self, rec: Dict[str, Any]) -> None:
+        k = rec.get("k")
+        t = int(rec.get("t") or 0)
+        if k == "h":
+            self.__init__(self.verify)
+        elif k == "s":
+            if "full" in rec:
+                self.text = rec["full"]
+                self.crc = zlib.crc32(self.text.encode("utf-8"))
+            else:
+                off = int(rec.get("off", 0))
+                app = rec.get("app", "")
+                if off == len(self.text):
+                    base_crc = self.crc
+                else:
+                    base_crc = zlib.crc32(self.text[:off].encode("utf-8"))
+                if self.verify and (off > len(self.text) or base_crc != int(rec.get("bcrc", base_crc))):
+                    self.errors += 1
+                self.text = self.text[:off] + app
+                self.crc = zlib.crc32(app.encode("utf-8"), base_crc)
+            if self.verify and int(rec.get("crc", self.crc)) != self.crc:
+                self.errors += 1
+            self.seq = int(rec.get("seq") or self.seq)
+        elif k == "p":
+            d = int(rec.get("del", 0))
+            keep = self.draft[:len(self.draft) - d] if d else self.draft
+            self.draft = keep + rec.get("ins", "")
+        elif k == "f":
+            self.ended = True
+        if t:
+            self.t_ms = t
+
+
+def replay(path: str, until_t_ms: Optional[int] = None, verify: bool = True) -> JournalState:
+    """Rebuild the transcript as of `until_t_ms` (or the end of the journal)."""
+    st = JournalState(verify=verify)
+    for _off, rec in iter_records(path):
+        if until_t_ms is not None and int(rec.get("t") or 0) > until_t_ms:
+            break
+        st.apply(rec)
+    return st
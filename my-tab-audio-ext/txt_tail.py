@@ -0,0 +1,285 @@
+# txt_tail.py
+# Follow TXT_SAVE files (en_feed_current_{sid}.txt, en_journal*.jsonl) from other processes.
+#
+#   - reads only new bytes (tracks byte offset), yields complete lines only
+#   - wakes on inotify (Linux, via libc; no extra dependency), polling fallback elsewhere
+#   - handles truncation (TXT_SAVE_TRUNCATE_CURRENT_ON_START) and replacement (new inode): restarts at 0
+#
+# Usage (the context manager releases the inotify fd / loop reader, also when the loop is left early):
+#   async with TailFollower("txt_out/en_feed_current_user.txt") as tail:
+#       async for line in tail:
+#           t_ms, text = parse_feed_line(line)
+#
+#   async for rec in follow_journal("txt_out/en_journal_current_user.jsonl"):
+#       ...
+
+import os
+import sys
+import json
+import struct
+import asyncio
+import logging
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("txt-tail")
+
+# inotify constants (linux/inotify.h)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EV_HDR = struct.Struct("iIII")
+
+HEAD_FINGERPRINT_BYTES = 64
+
+
+class _Inotify:
+    """Directory watch filtered to one file name; fileno() is readable when that file changed."""
+
+    def __init__(self, directory: str, name: str):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), mask)
+        if wd < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {directory}")
+        self.fd = fd
+        self.name = os.fsencode(name)
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def drain(self) -> bool:
+        """Consume pending events; True if any concerned our file."""
+        hit = False
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except (BlockingIOError, InterruptedError):
+                return hit
+            if not buf:
+                return hit
+            i = 0
+            while i + _EV_HDR.size <= len(buf):
+                _wd, _mask, _cookie, ln = _EV_HDR.unpack_from(buf, i)
+                nm = buf[i + _EV_HDR.size:i + _EV_HDR.size + ln].rstrip(b"\0")
+                if nm == self.name:
+                    hit = True
+                i += _EV_HDR.size + ln
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+def parse_feed_line(line: str) -> Tuple[Optional[int], str]:
+    """Feed line -> (t_ms or None, text). Handles TXT_SAVE_LINE_TS ("t_ms<TAB>text")."""
+    head, sep, rest = line.partition("\t")
+    if sep and head.isdigit():
+        return int(head), rest
+    return None, line
+
+
+class TailFollower:
+    """
+    Async iterator over new complete lines of a growing text file.
+
+    from_start:   start at byte 0 (else at the current end of file)
+    skip_comments: drop "#..." lines (feed session headers)
+    poll_sec:     polling period without inotify; with inotify it is only a safety net
+    coalesce_sec: with inotify, minimum spacing between reads (a burst of appends -> one read)
+    on_reset:     called with a reason ("truncated" | "replaced") when the file restarts
+    """
+
+    def __init__(
+        self,
+        path: str,
+        from_start: bool = True,
+        skip_comments: bool = True,
+        poll_sec: float = 0.25,
+        use_inotify: bool = True,
+        coalesce_sec: float = 0.02,
+        on_reset: Optional[Callable[[str], None]] = None,
+    ):
+        self.path = os.path.abspath(path)
+        self.from_start = from_start
+        self.skip_comments = skip_comments
+        self.poll_sec = max(0.01, float(poll_sec))
+        self.use_inotify = use_inotify and sys.platform.startswith("linux")
+        self.coalesce_sec = max(0.0, float(coalesce_sec))
+        self.on_reset = on_reset
+
+        self.offset = 0
+        self.inode: Optional[Tuple[int, int]] = None
+        self.resets = 0
+        self.bytes_read = 0
+        self.wakeups = 0
+
+        self._partial = b""
+        self._head = b""      # first bytes of the file: a truncate+rewrite past our offset changes them
+        self._pending: deque = deque()
+        self._notify: Optional[_Inotify] = None
+        self._event: Optional[asyncio.Event] = None
+        self._started = False
+        self._closed = False
+        self._last_read = 0.0
+
+    # ---- lifecycle ----
+    def _start(self):
+        self._started = True
+        try:
+            st = os.stat(self.path)
+            self.inode = (st.st_dev, st.st_ino)
+            self.offset = 0 if self.from_start else st.st_size
+        except FileNotFoundError:
+            self.offset = 0
+
+        if self.use_inotify:
+            try:
+                d, n = os.path.split(self.path)
+                self._notify = _Inotify(d or ".", n)
+                self._event = asyncio.Event()
+                asyncio.get_running_loop().add_reader(self._notify.fileno(), self._on_readable)
+            except Exception as e:
+                logger.debug("inotify unavailable (%r) -> polling", e)
+                self._notify = None
+
+    def _on_readable(self):
+        if self._notify is not None and self._notify.drain():
+            self._event.set()
+
+    def close(self):
+        self._closed = True
+        if self._notify is not None:
+            try:
+                asyncio.get_running_loop().remove_reader(self._notify.fileno())
+            except Exception:
+                pass
+            self._notify.close()
+            self._notify = None
+        if self._event is not None:
+            self._event.set()
+
+    # ---- reading ----
+    def _reset(self, reason: str):
+        self.offset = 0
+        self._partial = b""
+        self.resets += 1
+        if self.on_reset is not None:
+            try:
+                self.on_reset(reason)
+            except Exception:
+                pass
+
+    def read_available(self) -> List[str]:
+        """Non-blocking: new complete lines since the last call."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        ino = (st.st_dev, st.st_ino)
+        if self.inode is not None and ino != self.inode:
+            self._reset("replaced")
+        elif st.st_size < self.offset:
+            self._reset("truncated")
+        self.inode = ino
+
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            # fingerprint before the size shortcut: a truncate + rewrite back to the same size
+            # leaves st_size == offset
+            if self.offset > 0 and self._head:
+                head = f.read(len(self._head))
+                if head != self._head:
+                    self._reset("truncated")
+            if st.st_size == self.offset:
+                return []
+            if self.offset == 0 or not self._head:
+                f.seek(0)
+                self._head = f.read(HEAD_FINGERPRINT_BYTES)
+            f.seek(self.offset)
+            data = f.read()
+        self.offset += len(data)
+        self.bytes_read += len(data)
+
+        data = self._partial + data
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            self._partial = data
+            return []
+        self._partial = data[cut + 1:]
+
+        out = []
+        for raw in data[:cut].split(b"\n"):
+            ln = raw.decode("utf-8", errors="replace").rstrip("\r")
+            if not ln:
+                continue
+            if self.skip_comments and ln.startswith("#"):
+                continue
+            out.append(ln)
+        return out
+
+    async def _wait(self):
+        self.wakeups += 1
+        if self._notify is not None and self._event is not None:
+            try:
+                # inotify drives wakeups; the timeout is a safety net (e.g. missed events on network FS)
+                await asyncio.wait_for(self._event.wait(), timeout=max(self.poll_sec, 2.0))
+            except asyncio.TimeoutError:
+                pass
+            self._event.clear()
+            if self.coalesce_sec > 0:
+                # the writer flushes per line; let a burst land before reading it in one go
+                loop = asyncio.get_running_loop()
+                gap = self._last_read + self.coalesce_sec - loop.time()
+                if gap > 0:
+                    await asyncio.sleep(gap)
+        else:
+            await asyncio.sleep(self.poll_sec)
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self
+
+    async def __aenter__(self) -> "TailFollower":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+    async def __anext__(self) -> str:
+        if not self._started:
+            self._start()
+        while not self._pending:
+            if self._closed:
+                self.close()
+                raise StopAsyncIteration
+            self._pending.extend(self.read_available())
+            self._last_read = asyncio.get_running_loop().time()
+            if not self._pending:
+                await self._wait()
+        return self._pending.popleft()
+
+
+async def follow_journal(path: str, from_start: bool = True, **kw: Any) -> AsyncIterator[Dict[str, Any]]:
+    """Follow an en_journal*.jsonl file, yielding parsed records (see txt_journal.py)."""
+    async with TailFollower(path, from_start=from_start, skip_comments=False, **kw) as tail:
+        async for ln in tail:
+            try:
+                yield json.loads(ln)
+            except ValueError:
+                continue
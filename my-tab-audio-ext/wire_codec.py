@@ -0,0 +1,219 @@
+# wire_codec.py
+# Binary wire format "bin1" for large server→client stable frames (full checkpoints, legacy full stables).
+#
+# Negotiated per session (caps "bin1"); the tables below are sent once in hello.detail.wire so clients
+# decode with exactly the schema the server encodes with. Only frames for which prefer_binary() holds
+# go out binary: the win is skipping json.dumps' escape scan over a long transcript string (a 40 KB
+# checkpoint: ~160 µs -> ~9 µs); on small frames this pure-Python encoder is no faster than json.dumps
+# (see tools/bench_wire.py), so patches, deltas and status stay JSON.
+#
+# Frame:
+#   u8      type tag (index in TYPES)
+#   varint  presence bitmask over SCHEMAS[type] (bit i => field i present; last bit => extras dict)
+#   values  one tagged value per present field, in schema order
+#
+# Value (1 tag byte + payload):
+#   0 null | 1 false | 2 true
+#   3 uint varint | 4 negative int (varint of -n-1)
+#   5 float64 LE
+#   6 str  (varint byte length + UTF-8)
+#   7 list (varint count + values)
+#   8 dict (varint count + (key, value) pairs; key = varint 0 + str; ids > 0 are reserved)
+
+import struct
+from typing import Any, Dict, List, Tuple
+
+WIRE_FORMAT = "bin1"
+
+TYPES: List[str] = ["stable"]
+
+SCHEMAS: Dict[str, List[str]] = {
+    "stable": ["seq", "t_ms", "full", "ckpt", "off", "append", "len", "base_crc", "crc", "cap_ms"],
+}
+
+MIN_TEXT_CHARS = 1024   # below this json.dumps is as fast (crossover measured at ~256 chars)
+
+_TYPE_ID = {t: i for i, t in enumerate(TYPES)}
+_SCHEMA_IDX = {t: {k: i for i, k in enumerate(f)} for t, f in SCHEMAS.items()}
+
+_F64 = struct.Struct("<d")
+_VARINT1 = [bytes((i,)) for i in range(128)]
+
+
+def dictionary() -> Dict[str, Any]:
+    """Tables for hello.detail.wire (client decoders are driven by these)."""
+    return {"format": WIRE_FORMAT, "types": list(TYPES), "schemas": {k: list(v) for k, v in SCHEMAS.items()}}
+
+
+def encodable(obj: Dict[str, Any]) -> bool:
+    return obj.get("type") in _TYPE_ID
+
+
+def prefer_binary(obj: Dict[str, Any], min_chars: int = MIN_TEXT_CHARS) -> bool:
+    """True for the frames bin1 is faster for: a stable carrying a long full/append text."""
+    if obj.get("type") not in _TYPE_ID:
+        return False
+    s = obj.get("full")
+    if not isinstance(s, str):
+        s = obj.get("append")
+    return isinstance(s, str) and len(s) >= min_chars
+
+
+def _uvarint(n: int, out: bytearray) -> None:
+    if n < 0x80:
+        out += _VARINT1[n]
+        return
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _value(v: Any, out: bytearray) -> None:
+    t = type(v)
+    if t is int:
+        if v >= 0:
+            out.append(3)
+            if v < 0x80:
+                out += _VARINT1[v]
+            else:
+                _uvarint(v, out)
+        else:
+            out.append(4)
+            _uvarint(-v - 1, out)
+    elif t is str:
+        b = v.encode("utf-8")
+        n = len(b)
+        out.append(6)
+        if n < 0x80:
+            out += _VARINT1[n]
+        else:
+            _uvarint(n, out)
+        out += b
+    elif t is bool:
+        out.append(2 if v else 1)
+    elif t is float:
+        out.append(5)
+        out += _F64.pack(v)
+    elif v is None:
+        out.append(0)
+    elif t is dict:
+        out.append(8)
+        _uvarint(len(v), out)
+        for k, x in v.items():
+            out.append(0)
+            _value(str(k), out)
+            _value(x, out)
+    elif t is list or t is tuple:
+        out.append(7)
+        _uvarint(len(v), out)
+        for x in v:
+            _value(x, out)
+    elif isinstance(v, bool):
+        out.append(2 if v else 1)
+    elif isinstance(v, int):
+        _value(int(v), out)
+    elif isinstance(v, float):
+        _value(float(v), out)
+    elif isinstance(v, dict):
+        _value(dict(v), out)
+    elif isinstance(v, (list, tuple)):
+        _value(list(v), out)
+    else:
+        _value(str(v), out)
+
+
+def encode(obj: Dict[str, Any]) -> bytes:
+    """Encode a stable dict. Caller checks encodable() (or prefer_binary()) first."""
+    typ = obj["type"]
+    idx = _SCHEMA_IDX[typ]
+    fields = SCHEMAS[typ]
+
+    mask = 0
+    extras = None
+    for k in obj:
+        if k == "type":
+            continue
+        i = idx.get(k)
+        if i is None:
+            if extras is None:
+                extras = {}
+            extras[k] = obj[k]
+        else:
+            mask |= 1 << i
+    if extras:
+        mask |= 1 << len(fields)
+
+    out = bytearray((_TYPE_ID[typ],))
+    _uvarint(mask, out)
+    for i, k in enumerate(fields):
+        if mask & (1 << i):
+            _value(obj[k], out)
+    if extras:
+        _value(extras, out)
+    return bytes(out)
+
+
+def _read_uvarint(b: bytes, p: int) -> Tuple[int, int]:
+    n = 0
+    shift = 0
+    while True:
+        c = b[p]
+        p += 1
+        n |= (c & 0x7F) << shift
+        if c < 0x80:
+            return n, p
+        shift += 7
+
+
+def _read_value(b: bytes, p: int) -> Tuple[Any, int]:
+    t = b[p]
+    p += 1
+    if t == 0:
+        return None, p
+    if t == 1:
+        return False, p
+    if t == 2:
+        return True, p
+    if t == 3:
+        return _read_uvarint(b, p)
+    if t == 4:
+        n, p = _read_uvarint(b, p)
+        return -n - 1, p
+    if t == 5:
+        return _F64.unpack_from(b, p)[0], p + 8
+    if t == 6:
+        n, p = _read_uvarint(b, p)
+        return b[p:p + n].decode("utf-8"), p + n
+    if t == 7:
+        n, p = _read_uvarint(b, p)
+        out = []
+        for _ in range(n):
+            v, p = _read_value(b, p)
+            out.append(v)
+        return out, p
+    if t == 8:
+        n, p = _read_uvarint(b, p)
+        d = {}
+        for _ in range(n):
+            kid, p = _read_uvarint(b, p)
+            if kid != 0:
+                raise ValueError(f"bad key id {kid}")
+            k, p = _read_value(b, p)
+            d[k], p = _read_value(b, p)
+        return d, p
+    raise ValueError(f"bad value tag {t}")
+
+
+def decode(b: bytes) -> Dict[str, Any]:
+    typ = TYPES[b[0]]
+    fields = SCHEMAS[typ]
+    mask, p = _read_uvarint(b, 1)
+    obj: Dict[str, Any] = {"type": typ}
+    for i, k in enumerate(fields):
+        if mask & (1 << i):
+            obj[k], p = _read_value(b, p)
+    if mask & (1 << len(fields)):
+        extras, p = _read_value(b, p)
+        obj.update(extras)
+    return obj